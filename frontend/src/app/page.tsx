@@ -1,9 +1,9 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import {
   getArticles,
-  getNetwork,
+  streamNetwork,
   getCompanyAnalysis,
   getSectors,
   agentQuery,
@@ -48,9 +48,13 @@ export default function Home() {
   // State
   const [viewMode, setViewMode] = useState<'selection' | 'analysis'>('selection');
   const [articles, setArticles] = useState<Article[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedArticles, setSelectedArticles] = useState<string[]>([]);
   const [graphData, setGraphData] = useState<GraphData>({ nodes: [], edges: [] });
   const [loading, setLoading] = useState(false);
+  // Incremented per graph load so that batches of a superseded stream are dropped
+  const graphRequest = useRef(0);
   const [activeTab, setActiveTab] = useState<'graph' | 'timeline' | 'analysis' | 'agent'>('graph');
 
   // Agent State
@@ -123,21 +127,38 @@ export default function Home() {
     loadArticles();
   }, [dateRange, selectedTiers, selectedStatus, selectedSectors, entitySearch]);
 
+  const articleFilters = () => ({
+    date_range: dateRange,
+    tiers: selectedTiers.length > 0 ? selectedTiers.map(t => t.replace('Tier ', '')) : undefined,
+    news_status: selectedStatus.length > 0 ? selectedStatus : undefined,
+    sectors: selectedSectors.length > 0 ? selectedSectors : undefined,
+    entity_search: entitySearch || undefined
+  });
+
   const loadArticles = async () => {
     try {
-      const data = await getArticles({
-        date_range: dateRange,
-        tiers: selectedTiers.length > 0 ? selectedTiers.map(t => t.replace('Tier ', '')) : undefined,
-        news_status: selectedStatus.length > 0 ? selectedStatus : undefined,
-        sectors: selectedSectors.length > 0 ? selectedSectors : undefined,
-        entity_search: entitySearch || undefined
-      });
-      setArticles(data);
+      const page = await getArticles(articleFilters());
+      setArticles(page.articles);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error("Failed to load articles", error);
     }
   };
 
+  const loadMoreArticles = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await getArticles({ ...articleFilters(), cursor: nextCursor });
+      setArticles(prev => [...prev, ...page.articles]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error("Failed to load more articles", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const loadSectors = async () => {
     try {
       const data = await getSectors();
@@ -148,21 +169,31 @@ export default function Home() {
   };
 
   const loadGraph = async () => {
+    const request = ++graphRequest.current;
     setLoading(true);
+    setGraphData({ nodes: [], edges: [] });
     try {
-      const data = await getNetwork({
+      // Nodes and edges are rendered batch by batch while the query runs
+      await streamNetwork({
         article_titles: selectedArticles.length > 0 ? selectedArticles : undefined,
         date_range: dateRange,
         tiers: selectedTiers.length > 0 ? selectedTiers : undefined,
         news_status: selectedStatus.length > 0 ? selectedStatus : undefined,
         sectors: selectedSectors.length > 0 ? selectedSectors : undefined,
         entity_search: entitySearch || undefined
+      }, batch => {
+        if (request !== graphRequest.current) return;
+        setGraphData(current => ({
+          nodes: current.nodes.concat(batch.nodes),
+          edges: current.edges.concat(batch.edges)
+        }));
       });
-      setGraphData(data);
     } catch (error) {
       console.error("Failed to load graph", error);
     } finally {
-      setLoading(false);
+      if (request === graphRequest.current) {
+        setLoading(false);
+      }
     }
   };
 
@@ -515,6 +546,17 @@ export default function Home() {
                   </div>
                 ))}
               </div>
+              {nextCursor && (
+                <div className="flex justify-center mt-6">
+                  <button
+                    onClick={loadMoreArticles}
+                    disabled={loadingMore}
+                    className="px-4 py-2 text-sm font-medium rounded-lg border border-slate-200 dark:border-slate-700 text-slate-700 dark:text-slate-300 hover:bg-slate-50 dark:hover:bg-slate-800 disabled:opacity-50 transition-colors"
+                  >
+                    {loadingMore ? 'Loading...' : 'Load more'}
+                  </button>
+                </div>
+              )}
             </div>
           </div>
         ) : (
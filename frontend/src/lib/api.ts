@@ -50,15 +50,23 @@ export interface GraphData {
   edges: GraphEdge[];
 }
 
+export interface ArticlePage {
+  articles: Article[];
+  nextCursor: string | null;
+}
+
+// One page of articles, newest first; pass nextCursor back as `cursor` for the next page
 export const getArticles = async (params?: {
   date_range?: string,
   tiers?: string[],
   news_status?: string[],
   sectors?: string[],
-  entity_search?: string
-}) => {
+  entity_search?: string,
+  limit?: number,
+  cursor?: string
+}): Promise<ArticlePage> => {
   const response = await api.get<Article[]>('/articles', { params });
-  return response.data;
+  return { articles: response.data, nextCursor: response.headers['x-next-cursor'] ?? null };
 };
 
 export const getNetwork = async (params: {
@@ -75,6 +83,52 @@ export const getNetwork = async (params: {
   return response.data;
 };
 
+export type GraphStreamEvent =
+  | ({ type: 'node' } & GraphNode)
+  | ({ type: 'edge' } & GraphEdge)
+  | { type: 'end'; nodes: number; edges: number }
+  | { type: 'error'; detail: string };
+
+// Streams /graph/network as NDJSON: onBatch receives the nodes and edges of each
+// chunk as it arrives, so the graph can start rendering before the query finishes.
+export const streamNetwork = async (
+  params: Parameters<typeof getNetwork>[0],
+  onBatch: (batch: GraphData) => void
+) => {
+  const query = api.defaults.paramsSerializer as (params: Record<string, unknown>) => string;
+  const response = await fetch(`${API_URL}/graph/network?${query({ ...params, stream: true })}`, {
+    headers: { Accept: 'application/x-ndjson' }
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Network stream failed with status ${response.status}`);
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value, { stream: !done });
+    const lines = buffered.split('\n');
+    buffered = done ? '' : lines.pop() ?? '';
+    const batch: GraphData = { nodes: [], edges: [] };
+    for (const line of lines) {
+      if (!line) continue;
+      const event = JSON.parse(line) as GraphStreamEvent;
+      if (event.type === 'node') {
+        batch.nodes.push({ id: event.id, label: event.label, color: event.color });
+      } else if (event.type === 'edge') {
+        batch.edges.push({ source: event.source, target: event.target, label: event.label });
+      } else if (event.type === 'error') {
+        throw new Error(event.detail);
+      }
+    }
+    if (batch.nodes.length || batch.edges.length) {
+      onBatch(batch);
+    }
+    if (done) break;
+  }
+};
+
 export const getSectors = async () => {
   const response = await api.get<string[]>('/sectors');
   return response.data;
@@ -85,6 +139,24 @@ export const getCompanyAnalysis = async (article_titles: string[]) => {
   return response.data;
 };
 
+export interface SentimentCounts {
+  positive: number;
+  negative: number;
+  neutral: number;
+}
+
+export interface SentimentPoint extends SentimentCounts {
+  date: string;
+  total: number;
+  tiers: Record<string, SentimentCounts>;
+}
+
+// Daily sentiment counts for one entity, overall and per publisher tier (dates as YYYY-MM-DD)
+export const getSentimentTimeline = async (params: { entity: string; label?: string; start?: string; end?: string }) => {
+  const response = await api.get<{ entity: string; series: SentimentPoint[] }>('/analysis/sentiment/timeline', { params });
+  return response.data;
+};
+
 export const getArticleMentions = async (title: string) => {
   const response = await api.get<string[]>('/articles/mentions', { params: { title } });
   return response.data;
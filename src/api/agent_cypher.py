@@ -0,0 +1,189 @@
+"""
+Cypher generation cache and guarded execution for /agent/query.
+
+Generating Cypher is an LLM round trip, and the same questions come back again
+and again. CypherCache maps each normalized question (lowercased, whitespace
+collapsed, trailing punctuation dropped) to the Cypher generated for it under the
+current schema version. A repeated question therefore skips the LLM and only pays
+database time. A schema change discards the entries, since new labels or
+relationship types may change the answer.
+
+Only validated Cypher is cached. Before a generated query first runs, `guard`:
+
+- caps its result with a LIMIT (a larger trailing LIMIT is lowered),
+- EXPLAINs it and rejects anything that is not read-only, and any plan with a
+  CartesianProduct estimated above AGENT_MAX_CARTESIAN_ROWS rows.
+
+The route then runs the query in a transaction with AGENT_QUERY_TIMEOUT.
+"""
+import re
+import asyncio
+from collections import OrderedDict
+from src.config import AGENT_CYPHER_CACHE_SIZE, AGENT_MAX_ROWS, AGENT_MAX_CARTESIAN_ROWS
+
+class UnsafeCypherError(ValueError):
+    """Raised when generated Cypher fails the EXPLAIN pre-check."""
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_LIMIT = re.compile(r"\bLIMIT\s+(\d+)\s*$", re.IGNORECASE)
+_UNION = re.compile(r"\bUNION\b", re.IGNORECASE)
+
+def normalize_question(question: str) -> str:
+    """The cache key of a question: lowercased, whitespace collapsed, trailing ?!. removed."""
+    return _TRAILING_PUNCTUATION.sub("", _WHITESPACE.sub(" ", (question or "").strip().lower()))
+
+def clean_cypher(text: str) -> str:
+    """Strips the Markdown fences and trailing semicolon the LLM may wrap its Cypher in."""
+    return text.replace("```cypher", "").replace("```", "").strip().rstrip(";").strip()
+
+def inject_limit(cypher: str, limit: int = AGENT_MAX_ROWS) -> str:
+    """
+    Returns `cypher` returning at most `limit` rows. A trailing LIMIT is kept if
+    smaller and lowered otherwise; UNION queries are wrapped in a subquery so that
+    the limit applies to the whole result rather than the last branch.
+    """
+    if _UNION.search(cypher):
+        return f"CALL {{\n{cypher}\n}}\nRETURN *\nLIMIT {limit}"
+    match = _TRAILING_LIMIT.search(cypher)
+    if match:
+        if int(match.group(1)) <= limit:
+            return cypher
+        return f"{cypher[:match.start()]}LIMIT {limit}"
+    return f"{cypher}\nLIMIT {limit}"
+
+def _plan_operators(plan) -> list:
+    """Flattens a plan tree (the dict from ResultSummary.plan) into (operator, estimated rows) pairs."""
+    if not plan:
+        return []
+    name = plan.get("operatorType", "").split("@")[0]
+    operators = [(name, (plan.get("args") or {}).get("EstimatedRows", 0) or 0)]
+    for child in plan.get("children", []):
+        operators.extend(_plan_operators(child))
+    return operators
+
+def check_explain(summary, max_cartesian_rows: float = AGENT_MAX_CARTESIAN_ROWS):
+    """
+    Raises UnsafeCypherError unless the EXPLAIN summary describes a read-only query
+    without a large cartesian product.
+    """
+    if summary.query_type != "r":
+        raise UnsafeCypherError("Only read-only queries can be run from the agent")
+    for operator, estimated_rows in _plan_operators(summary.plan):
+        if operator == "CartesianProduct" and estimated_rows > max_cartesian_rows:
+            raise UnsafeCypherError(
+                f"The generated query joins unrelated patterns (about {int(estimated_rows)} rows); please rephrase the question"
+            )
+
+async def guard(cypher: str, explain, limit: int = AGENT_MAX_ROWS) -> str:
+    """
+    Returns `cypher` with its LIMIT injected, after checking its plan.
+
+    Args:
+        explain: An async callable returning the EXPLAIN ResultSummary of a query, e.g. AsyncGraphDB.explain.
+    """
+    limited = inject_limit(cypher, limit)
+    check_explain(await explain(limited))
+    return limited
+
+class CypherCache:
+    """
+    LRU cache from normalized question to validated Cypher, per schema version.
+
+    Args:
+        versions: A GraphVersions instance; entries are dropped when the schema_version changes.
+        max_entries (int): Maximum number of questions kept; 0 disables the cache.
+    """
+
+    def __init__(self, versions, max_entries: int = AGENT_CYPHER_CACHE_SIZE):
+        self._versions = versions
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._schema_version = None
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    async def get_or_generate(self, question: str, generate, validate) -> str:
+        """
+        Returns the cached Cypher for `question`, or awaits `generate()`, then
+        `validate(cypher)`, and caches what `validate` returns. Concurrent misses
+        on the same question share one generation. Exceptions are not cached.
+        """
+        if self.max_entries <= 0:
+            return await self._generate(generate, validate)
+        schema_version = (await self._versions.get())["schema_version"]
+        if schema_version != self._schema_version:
+            self._entries.clear()
+            self._schema_version = schema_version
+        key = normalize_question(question)
+
+        cypher = self._entries.get(key)
+        if cypher is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cypher
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            cypher = await self._generate(generate, validate)
+            if schema_version == self._schema_version:
+                self._entries[key] = cypher
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            future.set_result(cypher)
+            return cypher
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when no other request was waiting on it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _generate(self, generate, validate) -> str:
+        self.misses += 1
+        try:
+            return await validate(await generate())
+        except UnsafeCypherError:
+            self.rejected += 1
+            raise
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+            "rejected": self.rejected,
+            "entries": len(self._entries),
+            "schema_version": self._schema_version,
+        }
+
+    def render_prometheus(self, prefix: str = "relatiq_cypher_cache") -> str:
+        """Renders the cache counters in the Prometheus text exposition format."""
+        stats = self.stats()
+        lines = []
+        for name, kind, help_text in (
+            ("hits", "counter", "Agent questions answered with cached Cypher."),
+            ("misses", "counter", "Agent questions sent to the LLM for Cypher."),
+            ("rejected", "counter", "Generated queries rejected by the EXPLAIN pre-check."),
+            ("entries", "gauge", "Questions held in the cache."),
+        ):
+            suffix = f"{name}_total" if kind == "counter" else name
+            lines.append(f"# HELP {prefix}_{suffix} {help_text}")
+            lines.append(f"# TYPE {prefix}_{suffix} {kind}")
+            lines.append(f"{prefix}_{suffix} {stats[name]}")
+        return "\n".join(lines) + "\n"
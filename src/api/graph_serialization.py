@@ -0,0 +1,273 @@
+"""
+Fast serialization of graph responses.
+
+Graph endpoints collect nodes and edges as plain tuples in a GraphBuilder instead
+of building a Pydantic model per element, and encode the result themselves:
+
+- JSON through orjson when it is installed, or MessagePack for clients that send
+  `Accept: application/msgpack` (needs the msgpack package).
+- gzip, or brotli when installed, according to Accept-Encoding.
+- An optional columnar layout (`?format=columnar`): one string table, and nodes
+  and edges as parallel integer arrays. Edges refer to nodes by position, so
+  repeated ids, labels and colors are sent once.
+- Newline-delimited JSON (`?stream=true` or `Accept: application/x-ndjson`): one
+  event per line, sent while the Neo4j result is still being consumed. GraphStream
+  deduplicates nodes by id without keeping the graph in memory.
+"""
+import json
+import gzip
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COLOR_MAP = {
+    "Company": "#ef4444",  # Red-500
+    "Person": "#22c55e",   # Green-500
+    "Sector": "#f59e0b",   # Amber-500
+    "Product": "#a855f7",  # Purple-500
+    "Document": "#64748b"  # Slate-500
+}
+DEFAULT_COLOR = "#3b82f6" # Blue-500
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+NDJSON = "application/x-ndjson"
+FORMATS = ("rows", "columnar")
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+# Bodies at least this large are compressed in the thread pool, so the event loop keeps serving
+THREADPOOL_COMPRESS_BYTES = 64 * 1024
+# NDJSON events written per chunk of a streamed response
+NDJSON_BATCH_SIZE = 100
+
+class GraphBuilder:
+    """Collects a graph's nodes (deduplicated by id) and edges as tuples."""
+
+    __slots__ = ("nodes", "edges", "_positions")
+
+    def __init__(self):
+        self.nodes = [] # (id, name, color)
+        self.edges = [] # (source, target, label)
+        self._positions = {}
+
+    def __len__(self):
+        return len(self.nodes) + len(self.edges)
+
+    def add_node(self, node_id: str, label: str, name: str) -> bool:
+        """Adds a node unless it was already added. Returns True if it is new."""
+        if node_id in self._positions:
+            return False
+        self._positions[node_id] = len(self.nodes)
+        self.nodes.append((node_id, name, COLOR_MAP.get(label, DEFAULT_COLOR)))
+        return True
+
+    def add_edge(self, source: str, target: str, label: str):
+        self.edges.append((source, target, label))
+
+    def to_rows(self) -> dict:
+        """The GraphData layout: {"nodes": [{id, label, color}], "edges": [{source, target, label}]}."""
+        return {"nodes": [node_row(node) for node in self.nodes], "edges": [edge_row(edge) for edge in self.edges]}
+
+def node_row(node: tuple) -> dict:
+    node_id, name, color = node
+    return {"id": node_id, "label": name, "color": color}
+
+def edge_row(edge: tuple) -> dict:
+    source, target, label = edge
+    return {"source": source, "target": target, "label": label}
+
+class GraphStream:
+    """
+    GraphBuilder counterpart for streamed responses: keeps only the ids of the nodes
+    already sent, and queues each new node or edge as an NDJSON event until `drain`.
+    """
+
+    __slots__ = ("_seen", "_pending", "node_count", "edge_count")
+
+    def __init__(self):
+        self._seen = set()
+        self._pending = []
+        self.node_count = 0
+        self.edge_count = 0
+
+    def add_node(self, node_id: str, label: str, name: str) -> bool:
+        if node_id in self._seen:
+            return False
+        self._seen.add(node_id)
+        self._pending.append({"type": "node", **node_row((node_id, name, COLOR_MAP.get(label, DEFAULT_COLOR)))})
+        self.node_count += 1
+        return True
+
+    def add_edge(self, source: str, target: str, label: str):
+        self._pending.append({"type": "edge", **edge_row((source, target, label))})
+        self.edge_count += 1
+
+    def drain(self) -> list:
+        """Removes and returns the events queued since the last call."""
+        pending, self._pending = self._pending, []
+        return pending
+
+    def end(self) -> dict:
+        return {"type": "end", "nodes": self.node_count, "edges": self.edge_count}
+
+def to_columnar(graph: dict) -> dict:
+    """
+    Converts a graph in the rows layout to the columnar one:
+
+        {"format": "columnar", "strings": [...],
+         "nodes": {"id": [s], "label": [s], "color": [s]},
+         "edges": {"source": [n], "target": [n], "label": [s]}}
+
+    where `s` indexes `strings` and `n` indexes the nodes. Edge endpoints that are
+    not in the node list are appended as nodes labelled with their id.
+    """
+    strings = []
+    string_index = {}
+
+    def intern(value) -> int:
+        value = "" if value is None else str(value)
+        position = string_index.get(value)
+        if position is None:
+            position = string_index[value] = len(strings)
+            strings.append(value)
+        return position
+
+    node_ids, node_labels, node_colors = [], [], []
+    positions = {}
+
+    def add_node(node_id, label, color) -> int:
+        positions[node_id] = len(node_ids)
+        node_ids.append(intern(node_id))
+        node_labels.append(intern(label))
+        node_colors.append(intern(color))
+        return positions[node_id]
+
+    for node in graph["nodes"]:
+        if node["id"] not in positions:
+            add_node(node["id"], node["label"], node["color"])
+
+    sources, targets, edge_labels = [], [], []
+    for edge in graph["edges"]:
+        for node_id, column in ((edge["source"], sources), (edge["target"], targets)):
+            position = positions.get(node_id)
+            if position is None:
+                position = add_node(node_id, node_id, DEFAULT_COLOR)
+            column.append(position)
+        edge_labels.append(intern(edge["label"]))
+
+    return {
+        "format": "columnar",
+        "strings": strings,
+        "nodes": {"id": node_ids, "label": node_labels, "color": node_colors},
+        "edges": {"source": sources, "target": targets, "label": edge_labels},
+    }
+
+def _accepted(header: str) -> set:
+    """Returns the values of an Accept or Accept-Encoding header that are not refused with q=0."""
+    values = set()
+    for part in (header or "").split(","):
+        value, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, number = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        if value.strip() and quality > 0:
+            values.add(value.strip().lower())
+    return values
+
+def negotiate_media_type(accept: str) -> str:
+    """MessagePack if the client asks for it and msgpack is installed, JSON otherwise."""
+    accepted = _accepted(accept)
+    if msgpack is not None and (MSGPACK in accepted or "application/x-msgpack" in accepted):
+        return MSGPACK
+    return JSON
+
+def negotiate_encoding(accept_encoding: str):
+    """Returns "br", "gzip" or None."""
+    accepted = _accepted(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def encode(payload, media_type: str = JSON) -> bytes:
+    # Values without a native encoding (e.g. neo4j temporal types in agent rows) are sent as strings
+    if media_type == MSGPACK:
+        return msgpack.packb(payload, use_bin_type=True, default=str)
+    if orjson is not None:
+        return orjson.dumps(payload, default=str)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+def compress(body: bytes, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=5)
+    return body
+
+def wants_ndjson(request, stream: bool = False) -> bool:
+    return stream or NDJSON in _accepted(request.headers.get("accept"))
+
+async def _ndjson_chunks(events, batch_size: int):
+    lines = []
+    try:
+        async for event in events:
+            lines.append(encode(event))
+            if len(lines) >= batch_size:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+    except Exception as e:
+        # Headers are already sent, so the failure is reported in-band as the last event
+        print(f"Streaming error: {e}")
+        lines.append(encode({"type": "error", "detail": str(e)}))
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+def ndjson_response(events, batch_size: int = NDJSON_BATCH_SIZE) -> StreamingResponse:
+    """
+    Streams the dicts produced by the async iterator `events` as newline-delimited
+    JSON, `batch_size` events per chunk. An exception ends the stream with an
+    {"type": "error"} event.
+    """
+    return StreamingResponse(_ndjson_chunks(events, batch_size), media_type=NDJSON)
+
+async def graph_response(request, payload, format: str = "rows") -> Response:
+    """
+    Encodes a graph payload (rows layout, optionally nested in a larger dict under
+    "graph") for `request`, honouring `format`, Accept and Accept-Encoding.
+    """
+    if format == "columnar":
+        if "graph" in payload:
+            payload = {**payload, "graph": to_columnar(payload["graph"])}
+        else:
+            payload = to_columnar(payload)
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    body = encode(payload, media_type)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding")) if len(body) >= MIN_COMPRESS_BYTES else None
+    if encoding:
+        if len(body) >= THREADPOOL_COMPRESS_BYTES:
+            body = await run_in_threadpool(compress, body, encoding)
+        else:
+            body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
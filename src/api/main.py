@@ -1,8 +1,44 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from src.api.routes import router
+from src.api.routes import router, result_cache, graph_projection, cypher_cache
+from src.clients import close_clients
+from src.config import API_WARM_CLIENTS, API_MIGRATE_ON_STARTUP
+from src.graph_db import db, async_db
+from src.query_metrics import query_metrics
+from src.schema import migrate
 
-app = FastAPI(title="Financial News Knowledge Graph API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients are created lazily on first request; optionally connect up front
+    # so that the first request does not pay for it.
+    if API_WARM_CLIENTS:
+        try:
+            await async_db.driver.verify_connectivity()
+        except Exception as e:
+            print(f"Could not connect to Neo4j on startup: {e}")
+    if API_MIGRATE_ON_STARTUP:
+        # Idempotent; a failure is logged and the API still starts
+        try:
+            await asyncio.to_thread(migrate, db.query)
+        except Exception as e:
+            print(f"Schema migration on startup failed: {e}")
+    if graph_projection.enabled:
+        # Routes fall back to Cypher until the projection is loaded
+        try:
+            await asyncio.to_thread(graph_projection.load)
+        except Exception as e:
+            print(f"Could not build the graph projection on startup: {e}")
+    yield
+    close_clients()
+    if result_cache.store is not None:
+        result_cache.store.close()
+    await async_db.close()
+    db.close()
+
+app = FastAPI(title="Financial News Knowledge Graph API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -10,6 +46,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(router)
@@ -17,3 +54,9 @@ app.include_router(router)
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-query Neo4j statistics and result and Cypher cache counters in Prometheus text format."""
+    text = query_metrics.render_prometheus() + result_cache.render_prometheus() + cypher_cache.render_prometheus()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
@@ -0,0 +1,226 @@
+"""
+Result cache for the read endpoints.
+
+The graph only changes when ingestion runs, and every ingestion write bumps the
+GraphMeta data_version (see src/graph_meta.py). Responses are therefore cached
+per endpoint and normalized parameters under the current data version. A version
+change discards the in-process entries, and the entries are evicted least-recently-used
+first once they exceed `max_entries` or `max_bytes`.
+
+With RESULT_CACHE_PATH set, entries are also kept in a SQLite file that all API
+workers on the host share, so a response computed by one worker is a hit for the
+others.
+"""
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from fastapi.encoders import jsonable_encoder
+from src.config import RESULT_CACHE_ENABLED, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_PATH
+
+def make_key(endpoint: str, params: dict, version: int) -> str:
+    """
+    Returns the cache key for a request. None parameters are dropped and list
+    parameters are sorted, since every list filter of the endpoints is a set.
+    """
+    normalized = {
+        name: sorted(value) if isinstance(value, list) else value
+        for name, value in params.items() if value is not None
+    }
+    fingerprint = json.dumps([endpoint, version, normalized], sort_keys=True, default=str)
+    return f"{endpoint}:{hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()}"
+
+class SqliteResultStore:
+    """On-disk store shared by the API workers of one host; evicts least recently used rows beyond `max_bytes`."""
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            return row[0]
+
+    def put(self, key: str, version: int, value: str):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (key, version, value, size, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, version, value, len(value), time.time()),
+            )
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                # Keep the most recently used rows that fit in max_bytes
+                self.conn.execute("""
+                    DELETE FROM results WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC) AS running FROM results
+                        ) WHERE running > ?
+                    )
+                """, (self.max_bytes,))
+            self.conn.commit()
+
+    def drop_other_versions(self, version: int):
+        """Deletes the entries of other data versions (the version restarts if the graph is cleared)."""
+        with self._lock:
+            self.conn.execute("DELETE FROM results WHERE version <> ?", (version,))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+class ResultCache:
+    """
+    In-process LRU cache of endpoint responses, optionally backed by a SqliteResultStore.
+
+    Args:
+        versions: A GraphVersions instance; entries are only valid for the data_version they were computed at.
+        max_entries (int): Maximum number of responses kept in memory.
+        max_bytes (int): Maximum total size of the responses kept in memory, as JSON.
+        store: Optional shared SqliteResultStore.
+    """
+
+    def __init__(self, versions, max_entries: int = RESULT_CACHE_MAX_ENTRIES, max_bytes: int = RESULT_CACHE_MAX_BYTES,
+                 store=None, enabled: bool = RESULT_CACHE_ENABLED):
+        self._versions = versions
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.store = store
+        self.enabled = enabled
+        self._entries = OrderedDict() # key -> (value, size)
+        self._bytes = 0
+        self._version = None
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get_or_compute(self, endpoint: str, params: dict, compute):
+        """
+        Returns the cached response for `endpoint` and `params`, or awaits `compute()`
+        and caches its result. Concurrent misses on the same key share one computation.
+        Exceptions are not cached.
+        """
+        if not self.enabled:
+            return await compute()
+        version = (await self._versions.get())["data_version"]
+        if version != self._version:
+            self._set_version(version)
+            if self.store is not None:
+                await asyncio.to_thread(self.store.drop_other_versions, version)
+        key = make_key(endpoint, params, version)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load_or_compute(key, version, compute)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when no other request was waiting on it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _load_or_compute(self, key: str, version: int, compute):
+        if self.store is not None:
+            text = await asyncio.to_thread(self.store.get, key)
+            if text is not None:
+                self.hits += 1
+                value = json.loads(text)
+                self._put(key, value, len(text))
+                return value
+        self.misses += 1
+        value = await compute()
+        # Plain data goes through the C encoder; only models fall back to jsonable_encoder
+        text = json.dumps(value, separators=(",", ":"), default=jsonable_encoder)
+        if version == self._version:
+            self._put(key, value, len(text))
+        if self.store is not None:
+            await asyncio.to_thread(self.store.put, key, version, text)
+        return value
+
+    def _set_version(self, version: int):
+        self.clear()
+        self._version = version
+
+    def _put(self, key: str, value, size: int):
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "data_version": self._version,
+        }
+
+    def render_prometheus(self, prefix: str = "relatiq_result_cache") -> str:
+        """Renders the cache counters in the Prometheus text exposition format."""
+        stats = self.stats()
+        lines = []
+        for name, kind, help_text in (
+            ("hits", "counter", "Responses served from the cache."),
+            ("misses", "counter", "Responses computed by querying Neo4j."),
+            ("evictions", "counter", "Entries evicted to stay within the size limits."),
+            ("entries", "gauge", "Entries held in memory."),
+            ("bytes", "gauge", "Size of the entries held in memory, as JSON."),
+        ):
+            suffix = f"{name}_total" if kind == "counter" else name
+            lines.append(f"# HELP {prefix}_{suffix} {help_text}")
+            lines.append(f"# TYPE {prefix}_{suffix} {kind}")
+            lines.append(f"{prefix}_{suffix} {stats[name]}")
+        return "\n".join(lines) + "\n"
@@ -1,7 +1,21 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List, Optional, NamedTuple
 from pydantic import BaseModel
-from src.graph_db import db
+from src.graph_db import async_db, db, row_dict
+from src.config import RESULT_CACHE_PATH, ENTITY_SEARCH_TIMEOUT, AGENT_QUERY_TIMEOUT
+from src.graph_meta import GraphVersions
+from src.entity_search import build_search_query, entity_filter_clause, lucene_query
+from src.schema_cache import SchemaCache
+from src.connections import ConnectionFinder
+from src.graph_projection import ProjectionLoader
+from src.sentiment_timeline import TIMELINE_QUERY, timeline_series
+from src.queries import (
+    ARTICLES_PAGE_SIZE, ARTICLES_MAX_PAGE_SIZE, ARTICLE_MENTIONS_QUERY, ARTICLE_CONTENT_QUERY, ANALYSIS_SENTIMENT_QUERY,
+    build_articles_query, build_document_filter_clause, encode_cursor, decode_cursor,
+)
+from src.api.result_cache import ResultCache, SqliteResultStore
+from src.api.agent_cypher import CypherCache, UnsafeCypherError, clean_cypher, guard
+from src.api.graph_serialization import GraphBuilder, GraphStream, FORMATS, MSGPACK, NDJSON, graph_response, ndjson_response, wants_ndjson
 from src.prompt import (
     SUMMARY_PROMPT_TEMPLATE,
     RISK_PROMPT_TEMPLATE,
@@ -11,6 +25,21 @@ from src.prompt import (
 
 router = APIRouter()
 
+# Versions of the graph written by ingestion; cached views below are refreshed when they change
+graph_versions = GraphVersions(async_db.query)
+schema_cache = SchemaCache(async_db.get_schema, graph_versions)
+result_cache = ResultCache(graph_versions, store=SqliteResultStore() if RESULT_CACHE_PATH else None)
+# Validated Cypher per normalized /agent/query question
+cypher_cache = CypherCache(graph_versions)
+# In-memory entity graph (src/graph_projection.py), loaded at startup by src/api/main.py
+graph_projection = ProjectionLoader(db)
+
+async def _projection():
+    """Returns the graph projection at the current data version, or None to query Neo4j instead."""
+    if not graph_projection.enabled:
+        return None
+    return await graph_projection.get((await graph_versions.get())["data_version"])
+
 class Article(BaseModel):
     title: str
     date: str
@@ -33,114 +62,136 @@ class GraphData(BaseModel):
     nodes: List[GraphNode]
     edges: List[GraphEdge]
 
+class NetworkRow(NamedTuple):
+    """One (n)-[r]-(m) row of a network query, projected in Cypher so no Node objects are built."""
+    n_id: str
+    n_label: str
+    n_name: str
+    m_id: str
+    m_label: str
+    m_name: str
+    r_type: str
+
+NETWORK_RETURN = """
+        RETURN elementId(n) AS n_id, COALESCE(labels(n)[0], 'Unknown') AS n_label, COALESCE(n.name, n.id, 'Unknown') AS n_name,
+               elementId(m) AS m_id, COALESCE(labels(m)[0], 'Unknown') AS m_label, COALESCE(m.name, m.id, 'Unknown') AS m_name,
+               type(r) AS r_type"""
+
+def _network_row(record) -> NetworkRow:
+    return NetworkRow(*record.values())
+
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+
 @router.get("/articles", response_model=List[Article])
 async def get_articles(
-    limit: int = 500,
+    response: Response,
+    limit: int = Query(ARTICLES_PAGE_SIZE, ge=1, le=ARTICLES_MAX_PAGE_SIZE),
     date_range: Optional[str] = Query(None),
     tiers: Optional[List[str]] = Query(None),
     news_status: Optional[List[str]] = Query(None),
     sectors: Optional[List[str]] = Query(None),
-    entity_search: Optional[str] = Query(None)
+    entity_search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None)
 ):
-    # Calculate date threshold
-    date_filter_clause = ""
-    params = {"limit": limit, "tiers": tiers, "statuses": news_status, "sectors": sectors, "entity_search": entity_search}
-    
-    if date_range and date_range != "all":
-        from datetime import datetime, timedelta
-        today = datetime.now()
-        if date_range == "7d":
-            delta = timedelta(days=7)
-        elif date_range == "30d":
-            delta = timedelta(days=30)
-        elif date_range == "3m":
-            delta = timedelta(days=90)
-        else:
-            delta = timedelta(days=36500)
-            
-        threshold_date = (today - delta).strftime("%Y-%m-%d")
-        date_filter_clause = "AND d.date >= $threshold_date"
-        params["threshold_date"] = threshold_date
-
-    # Build Query
-    # We need to filter Documents based on their properties AND their relationships to specific nodes (Sectors/Entities)
-    
-    query = f"""
-    MATCH (d:Document)
-    WHERE 1=1
-    {date_filter_clause}
-    AND ($tiers IS NULL OR d.publisher_tier IN $tiers)
-    AND ($statuses IS NULL OR d.news_status IN $statuses)
-    
-    // Filter by Sector (if provided)
-    AND ($sectors IS NULL OR EXISTS {{
-        MATCH (d)-[:MENTIONS]->(n)
-        WHERE (n:Sector AND n.id IN $sectors) 
-           OR EXISTS {{ MATCH (n)-[:BELONGS_TO]->(s:Sector) WHERE s.id IN $sectors }}
-    }})
-    
-    // Filter by Entity Search (if provided)
-    AND ($entity_search IS NULL OR EXISTS {{
-        MATCH (d)-[:MENTIONS]->(n)
-        WHERE toLower(COALESCE(n.name, n.id)) CONTAINS toLower($entity_search)
-    }})
-    
-    RETURN d.title as title, d.date as date, d.publisher as source, d.url as url, d.publisher_tier as tier, d.news_status as status 
-    ORDER BY d.date DESC 
-    LIMIT $limit
     """
-    
-    results = db.query(query, params)
-    articles = []
-    for r in results:
-        try:
-            articles.append(Article(
-                title=r.get('title') or "Untitled",
-                date=str(r.get('date') or ""),
-                source=r.get('source'),
-                url=r.get('url'),
-                tier=r.get('tier'),
-                status=r.get('status')
-            ))
-        except Exception as e:
-            print(f"Error processing article record: {r}, Error: {e}")
-            continue
-    return articles
+    Returns one page of articles, newest first. When there are more, the
+    X-Next-Cursor response header holds the `cursor` to pass for the next page.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query, params = build_articles_query(limit, date_range, tiers, news_status, sectors, entity_search, after)
+
+    async def compute():
+        results = await async_db.query(query, params, name="articles")
+        next_cursor = None
+        if len(results) > limit:
+            last = results[limit - 1]
+            next_cursor = encode_cursor(str(last['sort_date']), str(last['id']))
+        articles = []
+        for r in results[:limit]:
+            try:
+                articles.append(Article(
+                    title=r.get('title') or "Untitled",
+                    date=str(r.get('date') or ""),
+                    source=r.get('source'),
+                    url=r.get('url'),
+                    tier=r.get('tier'),
+                    status=r.get('status')
+                ))
+            except Exception as e:
+                print(f"Error processing article record: {r}, Error: {e}")
+                continue
+        return {"articles": articles, "next_cursor": next_cursor}
+
+    page = await result_cache.get_or_compute("articles", params, compute)
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return page["articles"]
 
 @router.get("/graph/search")
-async def search_nodes(q: str):
+async def search_nodes(
+    q: str,
+    labels: Optional[List[str]] = Query(None),
+    limit: int = Query(20, ge=1, le=200)
+):
     """
-    Searches for graph nodes based on a query string.
+    Searches entities for type-ahead, using the full-text index.
 
     Args:
-        q (str): The query string to search for in node names or IDs.
+        q (str): The text typed so far; words match exactly, as prefixes or with one typo.
+        labels (List[str]): Only return entities with one of these labels, e.g. Company.
+        limit (int): Maximum number of suggestions.
 
     Returns:
-        List[GraphNode]: A list of graph nodes matching the query.
+        List[dict]: {"id", "label", "type", "mentions"} per entity, best match first
+        (index score weighted by the number of mentioning documents).
     """
+    search = build_search_query(q, labels, limit)
+    if search is None:
+        return []
+    query, params = search
 
-    query = """
-    MATCH (n) 
-    WHERE toLower(COALESCE(n.name, n.id)) CONTAINS toLower($q) 
-    AND NOT n:Document 
-    RETURN elementId(n) as id, COALESCE(n.name, n.id) as label, labels(n) as labels 
-    LIMIT 200
-    """
-    results = db.query(query, {"q": q})
-    nodes = []
-    for r in results:
-        lbl = r['labels'][0] if r['labels'] else "Unknown"
-        nodes.append({"id": r['id'], "label": r['label'], "type": lbl})
-    return nodes
+    async def compute():
+        results = await async_db.query(query, params, timeout=ENTITY_SEARCH_TIMEOUT, name="graph_search")
+        return [
+            {"id": r['id'], "label": r['label'], "type": r['labels'][0] if r['labels'] else "Unknown", "mentions": r['mentions']}
+            for r in results
+        ]
+
+    # Each keystroke is a new query; repeated prefixes are served from the result cache
+    return await result_cache.get_or_compute("graph_search", params, compute)
 
 @router.get("/sectors")
 async def get_sectors():
     query = "MATCH (n:Sector) RETURN DISTINCT COALESCE(n.name, n.id) as id ORDER BY id"
-    results = db.query(query)
-    return [r['id'] for r in results]
 
-@router.get("/graph/network", response_model=GraphData)
+    async def compute():
+        results = await async_db.query(query, name="sectors")
+        return [r['id'] for r in results]
+
+    return await result_cache.get_or_compute("sectors", {}, compute)
+
+# /graph/network returns Responses it encodes itself, so its bodies are documented here rather than validated
+NETWORK_RESPONSES = {
+    200: {
+        "model": GraphData,
+        "description": "GraphData for format=rows, or the columnar layout for format=columnar. "
+                       "MessagePack when requested with Accept: application/msgpack.",
+        "content": {
+            MSGPACK: {},
+            NDJSON: {
+                "schema": {"type": "string"},
+                "example": '{"type": "node", ...}\n{"type": "edge", ...}\n{"type": "end"}\n',
+            },
+        },
+    },
+}
+
+@router.get("/graph/network", responses=NETWORK_RESPONSES)
 async def get_network(
+    request: Request,
     article_titles: Optional[List[str]] = Query(None),
     node_types: Optional[List[str]] = Query(None),
     rel_types: Optional[List[str]] = Query(None),
@@ -148,38 +199,30 @@ async def get_network(
     tiers: Optional[List[str]] = Query(None),
     news_status: Optional[List[str]] = Query(None),
     sectors: Optional[List[str]] = Query(None),
-    entity_search: Optional[str] = Query(None)
+    entity_search: Optional[str] = Query(None),
+    format: str = Query("rows", pattern=f"^({'|'.join(FORMATS)})$"),
+    stream: bool = Query(False)
 ):
-    nodes = []
-    edges = []
-    node_ids = set()
+    """
+    Returns the subgraph induced by the matching articles' entities, as GraphData
+    or, with format=columnar, as the columnar layout of src/api/graph_serialization.py.
+    The body is JSON (or MessagePack) and compressed according to the request headers.
 
-    # Calculate date threshold
-    date_filter_clause = ""
-    params = {"labels": node_types, "types": rel_types, "tiers": tiers, "statuses": news_status, "sectors": sectors, "entity_search": entity_search}
-    
-    if date_range and date_range != "all":
-        from datetime import datetime, timedelta
-        today = datetime.now()
-        if date_range == "7d":
-            delta = timedelta(days=7)
-        elif date_range == "30d":
-            delta = timedelta(days=30)
-        elif date_range == "3m":
-            delta = timedelta(days=90)
-        else:
-            delta = timedelta(days=36500) # Default to all if unknown
-            
-        threshold_date = (today - delta).strftime("%Y-%m-%d")
-        date_filter_clause = "AND d.date >= $threshold_date"
-        params["threshold_date"] = threshold_date
+    With stream=true (or Accept: application/x-ndjson) nodes and edges are sent as
+    NDJSON events while the query runs, ending with {"type": "end"}.
+    """
+    params = {"labels": node_types, "types": rel_types, "sectors": sectors}
+    document_filter_clause = build_document_filter_clause(date_range, tiers, news_status, params)
 
-    # Build query based on filters
+    # Build query based on filters. `nodes_query` returns the ids of the same nodes,
+    # for the in-memory projection to build the induced subgraph from.
     if article_titles:
         # Query centered on articles - Induced Subgraph
-        cypher_query = """
+        cypher_nodes = """
         MATCH (d:Document)-[:MENTIONS]->(n)
         WHERE d.title IN $titles
+        """
+        cypher_query = cypher_nodes + """
         WITH collect(DISTINCT n) as nodes
         UNWIND nodes as n
         MATCH (n)-[r]-(m)
@@ -187,52 +230,28 @@ async def get_network(
         AND ($labels IS NULL OR any(l IN labels(n) WHERE l IN $labels))
         AND ($labels IS NULL OR any(l IN labels(m) WHERE l IN $labels))
         AND ($types IS NULL OR type(r) IN $types)
-        RETURN n, r, m
-        """
+        """ + NETWORK_RETURN
         params["titles"] = article_titles
+        limit = None
     else:
         # Advanced Filtered View
         # 1. Filter Documents first
-        # 2. Filter Nodes (Sectors, Entity Search)
-        
-        cypher_query = f"""
-        MATCH (d:Document)
-        WHERE 1=1
-        {date_filter_clause}
-        AND ($tiers IS NULL OR d.publisher_tier IN $tiers)
-        AND ($statuses IS NULL OR d.news_status IN $statuses)
-        
-        MATCH (d)-[r_mentions:MENTIONS]->(n)
-        WHERE ($sectors IS NULL OR (n:Sector AND n.id IN $sectors) OR EXISTS {{ MATCH (n)-[:BELONGS_TO]->(:Sector {{id: $sectors[0]}}) }}) -- Simplified sector check for now, ideally iterate
-        AND ($entity_search IS NULL OR toLower(COALESCE(n.name, n.id)) CONTAINS toLower($entity_search))
-        
-        WITH collect(DISTINCT n) as nodes
-        UNWIND nodes as n
-        MATCH (n)-[r]-(m)
-        WHERE m IN nodes
-        AND ($labels IS NULL OR any(l IN labels(n) WHERE l IN $labels))
-        AND ($labels IS NULL OR any(l IN labels(m) WHERE l IN $labels))
-        AND ($types IS NULL OR type(r) IN $types)
-        RETURN n, r, m
-        LIMIT 500
-        """
-        
-        # Note: The sector logic above is a bit simplified. 
-        # If $sectors is a list, we should check if n belongs to ANY of them.
-        # Correct Cypher for Sector filtering:
-        # AND ($sectors IS NULL OR (n:Sector AND n.id IN $sectors) OR EXISTS { MATCH (n)-[:BELONGS_TO]->(s:Sector) WHERE s.id IN $sectors })
-        
-        cypher_query = f"""
+        # 2. Filter Nodes (Sectors, Entity Search); entity search matches come from the full-text index
+        entity_query = lucene_query(entity_search) if entity_search else None
+        entity_clause = entity_filter_clause(entity_query, params) if entity_query else ""
+        entity_condition = "AND n IN entities" if entity_query else ""
+
+        cypher_nodes = f"""
+        {entity_clause}
         MATCH (d:Document)
         WHERE 1=1
-        {date_filter_clause}
-        AND ($tiers IS NULL OR d.publisher_tier IN $tiers)
-        AND ($statuses IS NULL OR d.news_status IN $statuses)
+        {document_filter_clause}
         
         MATCH (d)-[:MENTIONS]->(n)
         WHERE ($sectors IS NULL OR (n:Sector AND n.id IN $sectors) OR EXISTS {{ MATCH (n)-[:BELONGS_TO]->(s:Sector) WHERE s.id IN $sectors }})
-        AND ($entity_search IS NULL OR toLower(COALESCE(n.name, n.id)) CONTAINS toLower($entity_search))
-        
+        {entity_condition}
+        """
+        cypher_query = cypher_nodes + f"""
         WITH collect(DISTINCT n) as nodes
         UNWIND nodes as n
         MATCH (n)-[r]-(m)
@@ -240,88 +259,61 @@ async def get_network(
         AND ($labels IS NULL OR any(l IN labels(n) WHERE l IN $labels))
         AND ($labels IS NULL OR any(l IN labels(m) WHERE l IN $labels))
         AND ($types IS NULL OR type(r) IN $types)
-        RETURN n, r, m
+        {NETWORK_RETURN}
         LIMIT 500
         """
-
+        limit = 500
+    nodes_query = cypher_nodes + "RETURN DISTINCT elementId(n) AS id"
+
+    async def network_rows():
+        projection = await _projection()
+        if projection is None:
+            async for row in async_db.stream(cypher_query, params, mapper=_network_row, name="graph_network"):
+                yield row
+            return
+        records = await async_db.query(nodes_query, params, name="graph_network_nodes")
+        for row in projection.induced_subgraph([record["id"] for record in records], node_types, rel_types, limit):
+            yield NetworkRow(*row)
+
+    async def compute():
+        # Rows are consumed as they stream in; only the response itself is kept
+        graph = GraphBuilder()
+        async for row in network_rows():
+            graph.add_node(row.n_id, row.n_label, row.n_name)
+            graph.add_node(row.m_id, row.m_label, row.m_name)
+            graph.add_edge(row.n_id, row.m_id, row.r_type)
+        return graph.to_rows()
+
+    if wants_ndjson(request, stream):
+        async def events():
+            graph = GraphStream()
+            async for row in network_rows():
+                graph.add_node(row.n_id, row.n_label, row.n_name)
+                graph.add_node(row.m_id, row.m_label, row.m_name)
+                graph.add_edge(row.n_id, row.m_id, row.r_type)
+                for event in graph.drain():
+                    yield event
+            yield graph.end()
+
+        return ndjson_response(events())
+
+    # `params` holds every filter, including the date cutoff derived from date_range
     try:
-        results = db.query(cypher_query, params)
+        graph = await result_cache.get_or_compute("graph_network", params, compute)
     except Exception as e:
         print(f"Query Error: {e}")
-        return GraphData(nodes=[], edges=[])
-
-    for record in results:
-        if 'nodes' in record and 'relationships' in record: # APOC
-            for n in record['nodes']:
-                if n.element_id not in node_ids:
-                    label = list(n.labels)[0] if n.labels else "Unknown"
-                    label = list(n.labels)[0] if n.labels else "Unknown"
-                    color_map = {
-                        "Company": "#ef4444",  # Red-500
-                        "Person": "#22c55e",   # Green-500
-                        "Sector": "#f59e0b",   # Amber-500
-                        "Product": "#a855f7",  # Purple-500
-                        "Document": "#64748b"  # Slate-500
-                    }
-                    color = color_map.get(label, "#3b82f6") # Blue-500 default
-                    node_label = n.get("name", n.get("id", "Unknown"))
-                    nodes.append(GraphNode(id=n.element_id, label=node_label, color=color))
-                    node_ids.add(n.element_id)
-            for r in record['relationships']:
-                edges.append(GraphEdge(source=r.start_node.element_id, target=r.end_node.element_id, label=r.type))
-        else: # Standard
-            n = record.get('n')
-            m = record.get('m')
-            r = record.get('r')
-            
-            if n and n.element_id not in node_ids:
-                label = list(n.labels)[0] if n.labels else "Unknown"
-                label = list(n.labels)[0] if n.labels else "Unknown"
-                color_map = {
-                    "Company": "#ef4444",
-                    "Person": "#22c55e",
-                    "Sector": "#f59e0b",
-                    "Product": "#a855f7",
-                    "Document": "#64748b"
-                }
-                color = color_map.get(label, "#3b82f6")
-                node_label = n.get("name", n.get("id", "Unknown"))
-                nodes.append(GraphNode(id=n.element_id, label=node_label, color=color))
-                node_ids.add(n.element_id)
-            
-            if m and m.element_id not in node_ids:
-                label = list(m.labels)[0] if m.labels else "Unknown"
-                label = list(m.labels)[0] if m.labels else "Unknown"
-                color_map = {
-                    "Company": "#ef4444",
-                    "Person": "#22c55e",
-                    "Sector": "#f59e0b",
-                    "Product": "#a855f7",
-                    "Document": "#64748b"
-                }
-                color = color_map.get(label, "#3b82f6")
-                node_label = m.get("name", m.get("id", "Unknown"))
-                nodes.append(GraphNode(id=m.element_id, label=node_label, color=color))
-                node_ids.add(m.element_id)
-                
-            if r is not None:
-                edges.append(GraphEdge(source=n.element_id, target=m.element_id, label=r.type))
-
-    return GraphData(nodes=nodes, edges=edges)
+        graph = GraphBuilder().to_rows()
+    return await graph_response(request, graph, format)
 
 @router.get("/analysis/companies")
 async def analyze_companies(article_titles: List[str] = Query(...)):
+    return await result_cache.get_or_compute(
+        "analysis_companies", {"titles": article_titles}, lambda: _analyze_companies(article_titles)
+    )
+
+async def _analyze_companies(article_titles: List[str]):
     # 1. Sentiment Analysis (Companies, Products, Sectors)
-    sentiment_query = """
-    MATCH (d:Document)-[r:MENTIONS]->(n)
-    WHERE d.title IN $titles AND (n:Company OR n:Product OR n:Sector)
-    RETURN 
-        COALESCE(n.name, n.id) as Entity, 
-        labels(n)[0] as Type, 
-        r.sentiment as Sentiment, 
-        count(*) as Count
-    """
-    sentiment_raw = db.query(sentiment_query, {"titles": article_titles})
+    sentiment_raw = await async_db.query(ANALYSIS_SENTIMENT_QUERY, {"titles": article_titles}, name="analysis_sentiment")
     
     # Process into structured data
     entity_stats = {}
@@ -344,56 +336,58 @@ async def analyze_companies(article_titles: List[str] = Query(...)):
             
     sentiment_data = list(entity_stats.values())
     
-    # 2. Connections
-    connections_query = """
-    MATCH (d:Document)-[:MENTIONS]->(c:Company)
-    WHERE d.title IN $titles
-    WITH collect(DISTINCT c) as companies
-    UNWIND companies as c1
-    UNWIND companies as c2
-    MATCH p = (c1)-[*1..3]-(c2)
-    WHERE elementId(c1) < elementId(c2)
-    RETURN COALESCE(c1.name, c1.id) as Company1, COALESCE(c2.name, c2.id) as Company2, [r in relationships(p) | type(r)] as Relationships, length(p) as Distance
-    ORDER BY Distance ASC
-    LIMIT 200
-    """
-    connections_data = db.query(connections_query, {"titles": article_titles})
+    # 2. Connections: bounded bidirectional BFS per pair of companies (src/connections.py)
+    connections_data = await ConnectionFinder(async_db.query).find(article_titles)
     
     return {
         "sentiment": sentiment_data,
-        "connections": [dict(r) for r in connections_data]
+        "connections": connections_data
     }
 
+@router.get("/analysis/sentiment/timeline")
+async def sentiment_timeline(
+    entity: str,
+    label: Optional[str] = Query(None),
+    start: str = Query("0000-01-01", pattern=DATE_PATTERN),
+    end: str = Query("9999-12-31", pattern=DATE_PATTERN)
+):
+    """
+    Returns an entity's daily sentiment counts between `start` and `end` (inclusive),
+    overall and per publisher tier, from the aggregates ingestion maintains
+    (src/sentiment_timeline.py).
+    """
+    params = {"entity": entity, "label": label, "start": start, "end": end}
+
+    async def compute():
+        rows = await async_db.query(TIMELINE_QUERY, params, name="sentiment_timeline")
+        return {"entity": entity, "series": timeline_series(rows)}
+
+    return await result_cache.get_or_compute("sentiment_timeline", params, compute)
+
 @router.get("/articles/mentions")
 async def get_article_mentions(title: str):
-    query = """
-    MATCH (d:Document)-[:MENTIONS]->(n)
-    WHERE d.title = $title
-    RETURN elementId(n) as id
-    """
-    results = db.query(query, {"title": title})
-    return [r['id'] for r in results]
+    async def compute():
+        results = await async_db.query(ARTICLE_MENTIONS_QUERY, {"title": title}, name="article_mentions")
+        return [r['id'] for r in results]
+
+    return await result_cache.get_or_compute("article_mentions", {"title": title}, compute)
 
 @router.get("/article/content")
 async def get_article_content(title: str):
-    query = """
-    MATCH (d:Document)
-    WHERE d.title = $title
-    RETURN d.text as text
-    """
-    results = db.query(query, {"title": title})
+    results = await async_db.query(ARTICLE_CONTENT_QUERY, {"title": title}, name="article_content")
     if results:
         return {"text": results[0].get("text", "")}
     raise HTTPException(status_code=404, detail="Article not found")
 
 # Agent Endpoints
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from src.config import GOOGLE_API_KEY
+from src.clients import LazyClient, create_chat_model
+from src.llm_scheduler import get_scheduler, estimate_tokens, INTERACTIVE
 
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", google_api_key=GOOGLE_API_KEY, temperature=0)
-llm_t2g = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=GOOGLE_API_KEY, temperature=0)
+# Created on first request; retries are handled by the LLM scheduler
+llm = LazyClient("agent_llm", lambda: create_chat_model("gemini-2.5-flash-lite"))
+llm_t2g = LazyClient("text2graph_llm", lambda: create_chat_model("gemini-2.5-flash"))
 class AgentQueryRequest(BaseModel):
     query: str
 
@@ -401,75 +395,79 @@ class AgentInsightRequest(BaseModel):
     article_titles: List[str]
     analysis_type: str = "Summary" # Summary, Risks, Direction
 
+def _collect_graph_elements(value, graph):
+    """Adds the nodes and relationships found in one returned value (or list of values) to a GraphBuilder or GraphStream."""
+    if isinstance(value, list): # Path or list of things
+        for item in value:
+            _collect_graph_elements(item, graph)
+    elif hasattr(value, 'element_id'): # Node or Relationship
+        if hasattr(value, 'labels'): # Node
+            label = next(iter(value.labels), "Unknown")
+            graph.add_node(value.element_id, label, value.get("name", value.get("id", "Unknown")))
+        elif hasattr(value, 'type'): # Relationship
+            graph.add_edge(value.start_node.element_id, value.end_node.element_id, value.type)
+
 @router.post("/agent/query")
-async def agent_query(request: AgentQueryRequest):
-    # 1. Generate Cypher
-    # We need the schema for better generation
-    schema = db.get_schema
-    prompt = PromptTemplate.from_template(TEXT2GRAPH_PROMPT_TEMPLATE)
-    chain = prompt | llm_t2g | StrOutputParser()
-    
+async def agent_query(request: AgentQueryRequest, http_request: Request,
+                      format: str = Query("rows", pattern=f"^({'|'.join(FORMATS)})$"), stream: bool = Query(False)):
+    """
+    Answers a natural-language question by generating and running Cypher. With
+    stream=true (or Accept: application/x-ndjson) the response is NDJSON: a "cypher"
+    event, then "row", "node" and "edge" events as records arrive, then "end".
+
+    Generated Cypher is checked with EXPLAIN, capped with a LIMIT and cached per
+    question (src/api/agent_cypher.py); a rejected query is a 400.
+    """
+    # 1. Generate Cypher, unless this question was answered before
+    async def generate():
+        # We need the schema for better generation
+        schema = await schema_cache.get()
+        prompt = PromptTemplate.from_template(TEXT2GRAPH_PROMPT_TEMPLATE)
+        chain = prompt | llm_t2g.get() | StrOutputParser()
+        cypher = await get_scheduler().run(
+            lambda: chain.ainvoke({"schema": schema, "question": request.query}),
+            traffic=INTERACTIVE, tokens=estimate_tokens(schema, request.query)
+        )
+        return clean_cypher(cypher)
+
     try:
-        cypher = chain.invoke({"schema": schema, "question": request.query})
-        cypher = cypher.replace("```cypher", "").replace("```", "").strip()
-        
-        # 2. Execute Cypher
-        results = db.query(cypher)
+        cypher = await cypher_cache.get_or_generate(request.query, generate, lambda cypher: guard(cypher, async_db.explain))
+
+        if wants_ndjson(http_request, stream):
+            async def events():
+                yield {"type": "cypher", "cypher": cypher}
+                graph = GraphStream()
+                rows = 0
+                async for record in async_db.stream(cypher, mapper=None, timeout=AGENT_QUERY_TIMEOUT, name="agent_cypher"):
+                    rows += 1
+                    yield {"type": "row", "data": row_dict(record)}
+                    for value in record.values():
+                        _collect_graph_elements(value, graph)
+                    for event in graph.drain():
+                        yield event
+                yield {**graph.end(), "rows": rows}
+
+            return ndjson_response(events())
         
+        # 2. Execute Cypher, streaming the records
         # 3. Format Results for Graph (if applicable)
-        nodes = []
-        edges = []
-        node_ids = set()
+        rows = []
+        graph = GraphBuilder()
         
-        # Try to parse as graph data if possible
-        for record in results:
-            # Check for common return patterns
-            for key, value in record.items():
-                if hasattr(value, 'element_id'): # Node or Relationship
-                    if hasattr(value, 'labels'): # Node
-                        if value.element_id not in node_ids:
-                            label = list(value.labels)[0] if value.labels else "Unknown"
-                            label = list(value.labels)[0] if value.labels else "Unknown"
-                            color_map = {
-                                "Company": "#ef4444",
-                                "Person": "#22c55e",
-                                "Sector": "#f59e0b",
-                                "Product": "#a855f7",
-                                "Document": "#64748b"
-                            }
-                            color = color_map.get(label, "#3b82f6")
-                            node_label = value.get("name", value.get("id", "Unknown"))
-                            nodes.append(GraphNode(id=value.element_id, label=node_label, color=color))
-                            node_ids.add(value.element_id)
-                    elif hasattr(value, 'type'): # Relationship
-                        edges.append(GraphEdge(source=value.start_node.element_id, target=value.end_node.element_id, label=value.type))
-                elif isinstance(value, list): # Path or list of things
-                    for item in value:
-                         if hasattr(item, 'element_id'):
-                            if hasattr(item, 'labels'): # Node
-                                if item.element_id not in node_ids:
-                                    label = list(item.labels)[0] if item.labels else "Unknown"
-                                    label = list(item.labels)[0] if item.labels else "Unknown"
-                                    color_map = {
-                                        "Company": "#ef4444",
-                                        "Person": "#22c55e",
-                                        "Sector": "#f59e0b",
-                                        "Product": "#a855f7",
-                                        "Document": "#64748b"
-                                    }
-                                    color = color_map.get(label, "#3b82f6")
-                                    node_label = item.get("name", item.get("id", "Unknown"))
-                                    nodes.append(GraphNode(id=item.element_id, label=node_label, color=color))
-                                    node_ids.add(item.element_id)
-                            elif hasattr(item, 'type'): # Relationship
-                                edges.append(GraphEdge(source=item.start_node.element_id, target=item.end_node.element_id, label=item.type))
-
-        return {
+        async for record in async_db.stream(cypher, mapper=None, timeout=AGENT_QUERY_TIMEOUT, name="agent_cypher"):
+            rows.append(row_dict(record))
+            # Try to parse as graph data if possible
+            for value in record.values():
+                _collect_graph_elements(value, graph)
+
+        return await graph_response(http_request, {
             "cypher": cypher,
-            "data": results, # Raw data for table/text view
-            "graph": {"nodes": nodes, "edges": edges} # Formatted for visualization
-        }
+            "data": rows, # Raw data for table/text view
+            "graph": graph.to_rows() # Formatted for visualization
+        }, format)
         
+    except UnsafeCypherError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -487,7 +485,7 @@ async def agent_insight(request: AgentInsightRequest):
     RETURN d.title as Article, d.text as Text, type(r) as Relation, COALESCE(n.name, n.id) as Entity, labels(n)[0] as Type
     LIMIT 500
     """
-    context_data = db.query(context_query, {"titles": request.article_titles})
+    context_data = await async_db.query(context_query, {"titles": request.article_titles}, name="insight_context")
     article_context = "\n".join([
         f"Article: {row['Text']}"
         for row in context_data
@@ -495,27 +493,40 @@ async def agent_insight(request: AgentInsightRequest):
     
 
     print(article_context)
-    graph_context_query = """
-    MATCH (d:Document)-[:MENTIONS]->(n)
-    WHERE d.title IN $titles
-    WITH collect(DISTINCT n) as nodes
-    UNWIND nodes as n
-    MATCH (n)-[r]-(m)
-    WHERE m IN nodes
-    RETURN n, type(r) as relationship_type, m
-    """
-    graph_context_data = db.query(graph_context_query, {"titles": request.article_titles})
-    # Combine existing article content with the new graph relationships
-    # article_context = "\n\n".join([f"Content:\n{c}" for t, c in articles_map.items()])
-    # if graph_relationships:
-    #     article_context += "\n\nRelevant Graph Relationships:\n" + "\n".join(graph_relationships)
-
+    # Relationships between the mentioned entities, from the graph projection when it is loaded
+    projection = await _projection()
     graph_relationships = []
-    for record in graph_context_data:
-        node_n_name = record['n'].get('name', record['n'].get('id', 'Unknown'))
-        node_m_name = record['m'].get('name', record['m'].get('id', 'Unknown'))
-        relationship_type = record['relationship_type']
-        graph_relationships.append(f"{node_n_name} {relationship_type} {node_m_name},")
+    if projection is not None:
+        mentioned_query = """
+        MATCH (d:Document)-[:MENTIONS]->(n)
+        WHERE d.title IN $titles
+        RETURN DISTINCT elementId(n) AS id
+        """
+        mentioned = await async_db.query(mentioned_query, {"titles": request.article_titles}, name="insight_mentioned")
+        for row in projection.induced_subgraph([record["id"] for record in mentioned]):
+            row = NetworkRow(*row)
+            graph_relationships.append(f"{row.n_name} {row.r_type} {row.m_name},")
+    else:
+        graph_context_query = """
+        MATCH (d:Document)-[:MENTIONS]->(n)
+        WHERE d.title IN $titles
+        WITH collect(DISTINCT n) as nodes
+        UNWIND nodes as n
+        MATCH (n)-[r]-(m)
+        WHERE m IN nodes
+        RETURN n, type(r) as relationship_type, m
+        """
+        graph_context_data = await async_db.query(graph_context_query, {"titles": request.article_titles}, name="insight_graph_context")
+        # Combine existing article content with the new graph relationships
+        # article_context = "\n\n".join([f"Content:\n{c}" for t, c in articles_map.items()])
+        # if graph_relationships:
+        #     article_context += "\n\nRelevant Graph Relationships:\n" + "\n".join(graph_relationships)
+
+        for record in graph_context_data:
+            node_n_name = record['n'].get('name', record['n'].get('id', 'Unknown'))
+            node_m_name = record['m'].get('name', record['m'].get('id', 'Unknown'))
+            relationship_type = record['relationship_type']
+            graph_relationships.append(f"{node_n_name} {relationship_type} {node_m_name},")
 
     relation_ship_node = " ".join(graph_relationships)
 
@@ -536,10 +547,13 @@ async def agent_insight(request: AgentInsightRequest):
         template = SUMMARY_PROMPT_TEMPLATE
 
     prompt = PromptTemplate.from_template(template)
-    chain = prompt | llm | StrOutputParser()
+    chain = prompt | llm.get() | StrOutputParser()
     
     try:
-        insight = chain.invoke({"article_context": article_context, "relation_ship_node": relation_ship_node})
+        insight = await get_scheduler().run(
+            lambda: chain.ainvoke({"article_context": article_context, "relation_ship_node": relation_ship_node}),
+            traffic=INTERACTIVE, tokens=estimate_tokens(article_context, relation_ship_node, output_tokens=2048)
+        )
         return {"insight": insight}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,10 +1,30 @@
+import asyncio
 import streamlit as st
 import pandas as pd
 from streamlit_agraph import agraph, Node, Edge, Config
-from src.graph_db import db
+from src.graph_db import GraphDB
+from src.entity_search import ENTITY_INDEX, lucene_query
+from src.connections import ConnectionFinder
+from src.graph_projection import ProjectionLoader
 
 st.set_page_config(layout="wide", page_title="Financial News Knowledge Graph")
 
+@st.cache_resource
+def get_db():
+    # One lazily connected driver per server process, shared by all reruns and sessions
+    return GraphDB()
+
+db = get_db()
+
+@st.cache_resource
+def get_projection_loader():
+    # In-memory entity graph, refreshed from the GraphMeta change log when ingestion writes
+    return ProjectionLoader(db)
+
+async def query_async(query, params=None, name=None):
+    # ConnectionFinder expects the AsyncGraphDB.query signature
+    return db.query(query, params, name=name)
+
 st.title("Financial News Knowledge Graph")
 
 # Sidebar
@@ -12,7 +32,7 @@ st.sidebar.header("Filters")
 
 # Article Selection
 article_query = "MATCH (d:Document) RETURN d.title as title ORDER BY d.date DESC"
-article_results = db.query(article_query)
+article_results = db.query(article_query, name="app_articles")
 article_titles = [r['title'] for r in article_results]
 # Changed to multiselect
 selected_articles = st.sidebar.multiselect("Select Articles", article_titles, default=[])
@@ -25,8 +45,8 @@ min_degree = st.sidebar.slider("Minimum Degree of Separation", 1, 5, 1)
 # Fetch available labels and types
 labels_query = "CALL db.labels()"
 types_query = "CALL db.relationshipTypes()"
-available_labels = [r['label'] for r in db.query(labels_query) if r['label'] not in ['Document', 'Article']] 
-available_types = [r['relationshipType'] for r in db.query(types_query)]
+available_labels = [r['label'] for r in db.query(labels_query, name="app_labels") if r['label'] not in ['Document', 'Article', 'SchemaMigration', 'GraphMeta', 'GraphChange', 'SentimentDaily']] 
+available_types = [r['relationshipType'] for r in db.query(types_query, name="app_relationship_types")]
 
 selected_labels = st.sidebar.multiselect("Filter Node Types", available_labels, default=available_labels)
 selected_types = st.sidebar.multiselect("Filter Relationship Types", available_types, default=available_types)
@@ -34,7 +54,7 @@ selected_types = st.sidebar.multiselect("Filter Relationship Types", available_t
 # Date Filter
 # Get min/max date from DB
 date_range_query = "MATCH (d:Document) RETURN min(d.date) as min_date, max(d.date) as max_date"
-date_result = db.query(date_range_query)
+date_result = db.query(date_range_query, name="app_date_range")
 if date_result and date_result[0]['min_date']:
     min_date_str = date_result[0]['min_date'].split('T')[0]
     max_date_str = date_result[0]['max_date'].split('T')[0]
@@ -93,16 +113,17 @@ with tab1:
         """
         params = {"titles": selected_articles, "labels": selected_labels, "types": selected_types}
         
-    elif search_query:
+    elif search_query and lucene_query(search_query):
+        # Start from the best full-text matches instead of scanning every node
         cypher_query = f"""
+        CALL db.index.fulltext.queryNodes('{ENTITY_INDEX}', $search, {{limit: 20}}) YIELD node AS n
         MATCH p = (n)-[*1..{min_degree}]-(m)
-        WHERE toLower(n.name) CONTAINS toLower($search)
-        AND all(x IN nodes(p) WHERE any(l IN labels(x) WHERE l IN $labels))
+        WHERE all(x IN nodes(p) WHERE any(l IN labels(x) WHERE l IN $labels))
         AND all(x IN relationships(p) WHERE type(x) IN $types)
         RETURN p
         LIMIT 100
         """
-        params = {"search": search_query, "labels": selected_labels, "types": selected_types}
+        params = {"search": lucene_query(search_query), "labels": selected_labels, "types": selected_types}
     else:
         # Default view
         cypher_query = f"""
@@ -115,23 +136,45 @@ with tab1:
         """
         params = {"labels": selected_labels, "types": selected_types}
 
-    try:
-        results = db.query(cypher_query, params)
-    except Exception as e:
-        st.error(f"Query Error (trying fallback): {e}")
-        if selected_articles:
-            try:
-                results = db.query(cypher_query_fallback, params)
-            except Exception as e2:
-                st.error(f"Fallback Error: {e2}")
-                results = []
-        else:
-            results = []
-    
     nodes = []
     edges = []
     node_ids = set()
 
+    def node_color(label):
+        return "#ff0000" if label == "Company" else "#00ff00" if label == "Person" else "#0000ff"
+
+    projection = get_projection_loader().current() if selected_articles else None
+    if projection is not None:
+        # Same expansion as apoc.path.subgraphAll, on the in-memory projection
+        start_query = """
+        MATCH (d:Document)-[:MENTIONS]->(n)
+        WHERE d.title IN $titles
+        AND labels(n)[0] IN $labels
+        RETURN DISTINCT elementId(n) AS id
+        """
+        start_ids = [r['id'] for r in db.query(start_query, params, name="app_graph_start")]
+        reachable = projection.k_hop(start_ids, min_degree, selected_labels, selected_types)
+        for node_id in reachable:
+            _, label, name = projection.node(node_id)
+            nodes.append(Node(id=node_id, label=name, size=20, color=node_color(label)))
+            node_ids.add(node_id)
+        for n_id, _, _, m_id, _, _, r_type in projection.induced_subgraph(reachable, selected_labels, selected_types, directed=True):
+            edges.append(Edge(source=n_id, target=m_id, label=r_type))
+        results = []
+    else:
+        try:
+            results = db.query(cypher_query, params, name="app_graph")
+        except Exception as e:
+            st.error(f"Query Error (trying fallback): {e}")
+            if selected_articles:
+                try:
+                    results = db.query(cypher_query_fallback, params, name="app_graph_fallback")
+                except Exception as e2:
+                    st.error(f"Fallback Error: {e2}")
+                    results = []
+            else:
+                results = []
+
     for record in results:
         # Handle different return formats (Path vs n,r,m)
         if 'p' in record:
@@ -200,7 +243,7 @@ with tab2:
     ORDER BY d.date DESC
     """
     if start_date and end_date:
-        timeline_data = db.query(timeline_query, {"start": start_date.isoformat(), "end": end_date.isoformat()})
+        timeline_data = db.query(timeline_query, {"start": start_date.isoformat(), "end": end_date.isoformat()}, name="app_timeline")
         df = pd.DataFrame([dict(record) for record in timeline_data])
         if not df.empty:
             df['Date'] = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d')
@@ -222,30 +265,17 @@ with tab3:
         RETURN DISTINCT COALESCE(c.name, c.id) as Company, d.title as Article
         ORDER BY Company
         """
-        companies_data = db.query(companies_query, {"titles": selected_articles})
+        companies_data = db.query(companies_query, {"titles": selected_articles}, name="app_companies")
         if companies_data:
             df_comp = pd.DataFrame([dict(r) for r in companies_data])
             st.write("### Companies Mentioned")
             st.dataframe(df_comp, use_container_width=True)
             
             # 2. Connections between these companies
-            # Find paths between any pair of companies mentioned in the selected articles
-            # Limit path length to avoid explosion
-            connections_query = """
-            MATCH (d:Document)-[:MENTIONS]->(c:Company)
-            WHERE d.title IN $titles
-            WITH collect(DISTINCT c) as companies
-            UNWIND companies as c1
-            UNWIND companies as c2
-            MATCH p = (c1)-[*1..3]-(c2)
-            WHERE elementId(c1) < elementId(c2)
-            RETURN COALESCE(c1.name, c1.id) as Company1, COALESCE(c2.name, c2.id) as Company2, [r in relationships(p) | type(r)] as Relationships, length(p) as Distance
-            ORDER BY Distance ASC
-            LIMIT 50
-            """
-            connections_data = db.query(connections_query, {"titles": selected_articles})
+            # Bounded bidirectional BFS per pair of companies, shortest paths first
+            connections_data = asyncio.run(ConnectionFinder(query_async, limit=50).find(selected_articles))
             if connections_data:
-                df_conn = pd.DataFrame([dict(r) for r in connections_data])
+                df_conn = pd.DataFrame(connections_data)
                 st.write("### Connections Between Companies")
                 st.dataframe(df_conn, use_container_width=True)
             else:
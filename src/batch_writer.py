@@ -0,0 +1,189 @@
+import time
+from hashlib import md5
+from src.config import NEO4J_WRITE_BATCH_SIZE, NEO4J_DATABASE
+from src.graph_meta import record_write
+from src.sentiment_timeline import UPDATE_QUERY as SENTIMENT_AGGREGATES_QUERY, RETRACT_QUERY as SENTIMENT_RETRACT_QUERY
+
+# Documents, their MENTIONS (with sentiment) and entity nodes, one row per article.
+# Mirrors Neo4jGraph.add_graph_documents(include_source=True) so the stored shape is unchanged.
+DOCUMENTS_QUERY = """
+UNWIND $documents AS document
+MERGE (d:Document {id: document.id})
+SET d.text = document.text
+SET d += document.metadata
+// /articles pages on (sort_date, id); undated documents sort last instead of being left out
+SET d.sort_date = coalesce(toString(d.date), '')
+WITH d, document
+UNWIND document.nodes AS row
+CALL apoc.merge.node([row.type], {id: row.id}, row.properties, {}) YIELD node
+MERGE (d)-[m:MENTIONS]->(node)
+SET m.sentiment = COALESCE(row.sentiment, m.sentiment)
+RETURN collect(DISTINCT elementId(node)) AS nodes
+"""
+
+# Document ids are content hashes, so an edited source comes back as a new Document.
+# Finds the Documents an earlier version of the same sources left behind.
+REPLACED_DOCUMENTS_QUERY = """
+UNWIND $documents AS document
+MATCH (old:Document {source: document.metadata.source})
+WHERE NOT old.id IN $document_ids
+RETURN collect(DISTINCT old.id) AS ids
+"""
+
+DELETE_DOCUMENTS_QUERY = """
+MATCH (d:Document) WHERE d.id IN $document_ids
+DETACH DELETE d
+"""
+
+RELATIONSHIPS_QUERY = """
+UNWIND $relationships AS row
+CALL apoc.merge.node([row.source_label], {id: row.source}, {}, {}) YIELD node AS source
+CALL apoc.merge.node([row.target_label], {id: row.target}, {}, {}) YIELD node AS target
+CALL apoc.merge.relationship(source, row.type, {}, row.properties, target) YIELD rel
+RETURN collect(DISTINCT elementId(source)) + collect(DISTINCT elementId(target)) AS nodes
+"""
+
+def _document_rows(data: dict):
+    """Converts one article's extraction results into document and relationship rows."""
+    sentiments = {s.entity_name: s.sentiment for s in data.get("sentiment") or []}
+    documents = []
+    relationships = []
+    for graph_doc in data.get("graph_documents") or []:
+        metadata = dict(graph_doc.source.metadata)
+        if not metadata.get("id"):
+            metadata["id"] = md5(graph_doc.source.page_content.encode("utf-8")).hexdigest()
+        documents.append({
+            "id": metadata["id"],
+            "text": graph_doc.source.page_content,
+            "metadata": metadata,
+            "nodes": [
+                {"id": node.id, "type": node.type, "properties": node.properties or {}, "sentiment": sentiments.get(node.id)}
+                for node in graph_doc.nodes
+            ],
+        })
+        relationships.extend(
+            {
+                "source": rel.source.id,
+                "source_label": rel.source.type,
+                "target": rel.target.id,
+                "target_label": rel.target.type,
+                "type": rel.type.replace(" ", "_").upper(),
+                "properties": rel.properties or {},
+            }
+            for rel in graph_doc.relationships
+        )
+    return documents, relationships
+
+def _written_schema(documents: list, relationships: list):
+    """Returns the node labels and relationship types a batch writes."""
+    labels = {"Document"} if documents else set()
+    types = {"MENTIONS"} if any(document["nodes"] for document in documents) else set()
+    for document in documents:
+        labels.update(node["type"] for node in document["nodes"])
+    for rel in relationships:
+        labels.update((rel["source_label"], rel["target_label"]))
+        types.add(rel["type"])
+    return labels, types
+
+class Neo4jBatchWriter:
+    """
+    Buffers extraction results for many articles and writes them to Neo4j in a few
+    UNWIND-based write transactions, `batch_size` articles per transaction.
+
+    `add` and `drain` are cheap and meant to be called from the event loop; `write`
+    performs blocking driver calls and should run in a worker thread.
+
+    When an EntityIndex is given, entity ids are canonicalized just before writing
+    so that different spellings of one entity MERGE into the same node.
+
+    Each transaction also bumps the data version on the GraphMeta node and records
+    the labels and relationship types it wrote, which tells the API when its cached
+    results and schema are stale, and the entity nodes it touched, which the graph
+    projection refreshes. The daily sentiment aggregates of the written mentions
+    (src/sentiment_timeline.py) are updated in the same transaction.
+
+    Extraction results marked `replace_source` replace the Document written
+    earlier from the same source with other content (its MENTIONS and their
+    sentiment counts included) instead of being added next to it. Only sources that
+    identify one article, such as file paths or explicit article ids, should be
+    marked; entity relationships are shared between articles and are kept.
+
+    Args:
+        driver: A neo4j Driver (or a LazyClient wrapping one).
+        database (str): Database the transactions run against.
+    """
+
+    def __init__(self, driver, database: str = NEO4J_DATABASE, batch_size: int = NEO4J_WRITE_BATCH_SIZE,
+                 entity_index=None):
+        self.driver = driver
+        self.database = database
+        self.batch_size = max(1, batch_size)
+        self.entity_index = entity_index
+        self._pending = []
+
+    def __len__(self):
+        return len(self._pending)
+
+    @property
+    def is_full(self) -> bool:
+        return len(self._pending) >= self.batch_size
+
+    def add(self, data: dict):
+        """Buffers the extraction results of one article."""
+        self._pending.append(data)
+
+    def drain(self) -> list:
+        """Removes and returns everything buffered so far."""
+        pending, self._pending = self._pending, []
+        return pending
+
+    def write(self, batch: list) -> list:
+        """
+        Writes the given extraction results, `batch_size` articles per transaction.
+
+        Returns:
+            list[str]: The sources of the articles written.
+        """
+        written = []
+        for start in range(0, len(batch), self.batch_size):
+            chunk = batch[start:start + self.batch_size]
+            documents = []
+            relationships = []
+            replaceable = []
+            for data in chunk:
+                if self.entity_index is not None:
+                    self.entity_index.canonicalize(data)
+                doc_rows, rel_rows = _document_rows(data)
+                documents.extend(doc_rows)
+                relationships.extend(rel_rows)
+                if data.get("replace_source"):
+                    replaceable.extend(doc_rows)
+
+            started = time.perf_counter()
+            with self.driver.session(database=self.database) as session:
+                session.execute_write(self._write_transaction, documents, relationships, replaceable)
+            print(f"Wrote {len(chunk)} articles ({len(relationships)} relationships) to Neo4j in {time.perf_counter() - started:.2f}s")
+            written.extend(data.get("source", "Manual Input") for data in chunk)
+        return written
+
+    def flush(self) -> list:
+        """Writes everything buffered so far. Returns the sources written."""
+        return self.write(self.drain())
+
+    @staticmethod
+    def _write_transaction(tx, documents, relationships, replaceable: list = ()):
+        nodes = set()
+        if replaceable:
+            # Documents written in this same transaction are never replaced
+            document_ids = [document["id"] for document in documents]
+            replaced = tx.run(REPLACED_DOCUMENTS_QUERY, documents=replaceable, document_ids=document_ids).single()["ids"]
+            if replaced:
+                tx.run(SENTIMENT_RETRACT_QUERY, document_ids=replaced).consume()
+                tx.run(DELETE_DOCUMENTS_QUERY, document_ids=replaced).consume()
+        if documents:
+            nodes.update(tx.run(DOCUMENTS_QUERY, documents=documents).single()["nodes"])
+            tx.run(SENTIMENT_AGGREGATES_QUERY, document_ids=[document["id"] for document in documents]).consume()
+        if relationships:
+            nodes.update(tx.run(RELATIONSHIPS_QUERY, relationships=relationships).single()["nodes"])
+        if documents or relationships:
+            record_write(tx, *_written_schema(documents, relationships), nodes=nodes)
@@ -0,0 +1,88 @@
+"""
+Measures the import (cold start) cost of the main entry modules.
+
+Each module is imported in a fresh interpreter several times and the median
+wall time is reported, together with the slowest imports from `-X importtime`.
+Run it before and after a change to see the effect on startup:
+
+    python -m src.benchmark_startup
+    python -m src.benchmark_startup src.ingest --runs 10 --json startup.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+DEFAULT_MODULES = ["src.graph_db", "src.ingest", "src.api.main"]
+
+def _project_root() -> str:
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def time_import(module: str, runs: int = 5) -> dict:
+    """Imports `module` in `runs` fresh interpreters and returns timing stats in milliseconds."""
+    durations = []
+    error = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", f"import {module}"], cwd=_project_root(), capture_output=True, text=True)
+        durations.append((time.perf_counter() - started) * 1000)
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}"
+            break
+    return {
+        "module": module,
+        "runs": len(durations),
+        "median_ms": round(statistics.median(durations), 1),
+        "min_ms": round(min(durations), 1),
+        "error": error,
+    }
+
+def slowest_imports(module: str, top: int = 10) -> list:
+    """Returns the `top` imports with the highest cumulative time, from `python -X importtime`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=_project_root(), capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            rows.append((int(cumulative), name[1:].rstrip()))
+        except ValueError:
+            continue
+    # Nested imports are indented by importtime; only top-level entries are counted so none is listed twice
+    top_level = [(cumulative, name) for cumulative, name in rows if not name.startswith(" ")]
+    top_level.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(cumulative / 1000, 1)} for cumulative, name in top_level[:top]]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import time of the entry modules.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module.")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to list per module (0 to skip).")
+    parser.add_argument("--json", help="Write the results to this file.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in args.modules:
+        result = time_import(module, args.runs)
+        if args.top and not result["error"]:
+            result["slowest_imports"] = slowest_imports(module, args.top)
+        results.append(result)
+
+        status = f"FAILED ({result['error']})" if result["error"] else f"median {result['median_ms']:.0f} ms, min {result['min_ms']:.0f} ms"
+        print(f"{module}: {status}")
+        for entry in result.get("slowest_imports", []):
+            print(f"    {entry['cumulative_ms']:8.1f} ms  {entry['module']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Wrote {args.json}")
+    return 1 if any(r["error"] for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
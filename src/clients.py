@@ -0,0 +1,105 @@
+"""
+Lazily created Neo4j and Gemini clients.
+
+Importing a module must not open connections or build LLM clients: that slows
+cold starts, test collection and Streamlit reruns, and makes imports fail when
+Neo4j is down. Modules declare their clients as LazyClient objects instead; the
+client is built by its factory on first use and can be swapped for tests:
+
+    graph = LazyClient("neo4j_graph", create_neo4j_graph)
+    graph.query("RETURN 1")              # Connects here
+    graph.override(FakeGraph())          # Inject a stand-in
+    graph.set_factory(lambda: ...)       # Or a different factory
+
+close_clients() closes everything that was created (FastAPI lifespan shutdown).
+"""
+import threading
+from src.config import GOOGLE_API_KEY, NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+
+_registry = []
+
+class LazyClient:
+    """
+    Proxy that creates its client with `factory` on first attribute access.
+
+    Attribute access is forwarded to the client, so a LazyClient can stand in
+    wherever the client itself was used (graph.query, chain.ainvoke, ...).
+    """
+
+    def __init__(self, name: str, factory):
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def __repr__(self):
+        state = "created" if self._instance is not None else "not created"
+        return f"<LazyClient {self._name} ({state})>"
+
+    @property
+    def created(self) -> bool:
+        return self._instance is not None
+
+    def get(self):
+        """Returns the client, creating it on first call."""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def override(self, instance):
+        """Replaces the client with `instance` (e.g. a fake in tests)."""
+        with self._lock:
+            self._instance = instance
+
+    def set_factory(self, factory):
+        """Replaces the factory; the client is re-created on next use."""
+        self.close()
+        with self._lock:
+            self._factory = factory
+
+    def close(self):
+        """Closes the client if it was created. The next use creates a new one."""
+        with self._lock:
+            instance, self._instance = self._instance, None
+        close = getattr(instance, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as e:
+                print(f"Error closing {self._name}: {e}")
+
+    def __getattr__(self, attr):
+        # Only called for attributes not defined on LazyClient itself
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+def close_clients():
+    """Closes every client that has been created."""
+    for client in _registry:
+        client.close()
+
+# --- Factories ---
+# Heavy SDK imports live inside the factories so that they are only paid on first use.
+
+def create_neo4j_graph():
+    from langchain_community.graphs import Neo4jGraph
+    # Note: Neo4jGraph expects url, username, password.
+    return Neo4jGraph(
+        url=NEO4J_URI,
+        username=NEO4J_USERNAME,
+        password=NEO4J_PASSWORD,
+        refresh_schema=False
+    )
+
+def create_chat_model(model: str, temperature: float = 0):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
+        google_api_key=GOOGLE_API_KEY,
+        max_retries=1 # Retries are handled by the LLM scheduler
+    )
@@ -0,0 +1,177 @@
+"""
+Compares the chained (three LLM calls) and fused (one LLM call) extraction modes.
+
+Usage:
+    python -m src.compare_extraction data/batch1 --json comparison.json
+
+For every article both modes are run without the extraction cache, and the script
+reports latency, token usage / estimated cost, and how closely the fused output
+agrees with the chained output (metadata fields, nodes, relationships, sentiment).
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from langchain_core.callbacks import get_usage_metadata_callback
+from src.ingest import extract_info, collect_files, ArticleMetadata
+
+# USD per 1M tokens for gemini-2.5-flash; override on the command line for other models
+DEFAULT_INPUT_PRICE = 0.30
+DEFAULT_OUTPUT_PRICE = 2.50
+
+def _jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def _node_keys(results: dict) -> set:
+    return {
+        (node.id.lower(), node.type)
+        for graph_doc in results["graph_documents"]
+        for node in graph_doc.nodes
+    }
+
+def _relationship_keys(results: dict) -> set:
+    return {
+        (rel.source.id.lower(), rel.type, rel.target.id.lower())
+        for graph_doc in results["graph_documents"]
+        for rel in graph_doc.relationships
+    }
+
+def _sentiment_map(results: dict) -> dict:
+    return {s.entity_name.lower(): s.sentiment for s in results["sentiment"]}
+
+def compare_results(chained: dict, fused: dict) -> dict:
+    """Returns agreement scores (0-1) of the fused results against the chained results."""
+    metadata_fields = list(ArticleMetadata.model_fields)
+    matching_fields = sum(
+        1 for field in metadata_fields
+        if (chained["metadata"].get(field) or "").strip().lower() == (fused["metadata"].get(field) or "").strip().lower()
+    )
+
+    chained_sentiment = _sentiment_map(chained)
+    fused_sentiment = _sentiment_map(fused)
+    shared_entities = chained_sentiment.keys() & fused_sentiment.keys()
+    sentiment_agreement = (
+        sum(1 for e in shared_entities if chained_sentiment[e] == fused_sentiment[e]) / len(shared_entities)
+        if shared_entities else None
+    )
+
+    return {
+        "metadata": matching_fields / len(metadata_fields),
+        "nodes": _jaccard(_node_keys(chained), _node_keys(fused)),
+        "relationships": _jaccard(_relationship_keys(chained), _relationship_keys(fused)),
+        "sentiment": sentiment_agreement,
+        "sentiment_coverage": _jaccard(set(chained_sentiment), set(fused_sentiment)),
+    }
+
+async def run_mode(text: str, source: str, mode: str) -> dict:
+    started = time.perf_counter()
+    with get_usage_metadata_callback() as usage_callback:
+        results = await extract_info(text, source, use_cache=False, mode=mode)
+    latency = time.perf_counter() - started
+
+    input_tokens = sum(u.get("input_tokens", 0) for u in usage_callback.usage_metadata.values())
+    output_tokens = sum(u.get("output_tokens", 0) for u in usage_callback.usage_metadata.values())
+    return {
+        "results": results,
+        "latency": latency,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "errors": [key for key in ("metadata_error", "sentiment_error") if key in results],
+    }
+
+def _cost(run: dict, input_price: float, output_price: float) -> float:
+    return (run["input_tokens"] * input_price + run["output_tokens"] * output_price) / 1_000_000
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+def _fmt(value, spec=".2f"):
+    return "-" if value is None else format(value, spec)
+
+async def compare_files(files, input_price: float = DEFAULT_INPUT_PRICE, output_price: float = DEFAULT_OUTPUT_PRICE) -> list:
+    rows = []
+    for filepath in files:
+        with open(filepath, "r", encoding="utf-8") as file:
+            text = file.read()
+
+        runs = {}
+        for mode in ("chained", "fused"):
+            try:
+                runs[mode] = await run_mode(text, filepath, mode)
+            except Exception as e:
+                print(f"{mode} extraction failed for {filepath}: {e}")
+        if len(runs) < 2:
+            continue
+
+        row = {"file": filepath, "agreement": compare_results(runs["chained"]["results"], runs["fused"]["results"])}
+        for mode, run in runs.items():
+            row[mode] = {
+                "latency": run["latency"],
+                "input_tokens": run["input_tokens"],
+                "output_tokens": run["output_tokens"],
+                "cost": _cost(run, input_price, output_price),
+                "nodes": len(_node_keys(run["results"])),
+                "relationships": len(_relationship_keys(run["results"])),
+                "errors": run["errors"],
+            }
+        rows.append(row)
+
+        agreement = row["agreement"]
+        print(
+            f"{filepath}: latency {row['chained']['latency']:.1f}s -> {row['fused']['latency']:.1f}s | "
+            f"tokens {row['chained']['input_tokens'] + row['chained']['output_tokens']} -> "
+            f"{row['fused']['input_tokens'] + row['fused']['output_tokens']} | "
+            f"agreement metadata={_fmt(agreement['metadata'])} nodes={_fmt(agreement['nodes'])} "
+            f"rels={_fmt(agreement['relationships'])} sentiment={_fmt(agreement['sentiment'])}"
+        )
+    return rows
+
+def print_summary(rows: list):
+    if not rows:
+        print("No articles were compared.")
+        return
+
+    print(f"\nSummary over {len(rows)} articles")
+    print(f"{'':24}{'chained':>12}{'fused':>12}")
+    for label, key, spec in [
+        ("Mean latency (s)", "latency", ".2f"),
+        ("Mean input tokens", "input_tokens", ".0f"),
+        ("Mean output tokens", "output_tokens", ".0f"),
+        ("Mean cost (USD)", "cost", ".5f"),
+        ("Mean nodes", "nodes", ".1f"),
+        ("Mean relationships", "relationships", ".1f"),
+    ]:
+        chained = _mean([row["chained"][key] for row in rows])
+        fused = _mean([row["fused"][key] for row in rows])
+        print(f"{label:24}{_fmt(chained, spec):>12}{_fmt(fused, spec):>12}")
+
+    print("\nMean agreement of fused vs chained")
+    for key in ["metadata", "nodes", "relationships", "sentiment", "sentiment_coverage"]:
+        print(f"  {key:20}{_fmt(_mean([row['agreement'][key] for row in rows]))}")
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare chained and fused extraction modes.")
+    parser.add_argument("paths", nargs="+", help="Directories or glob patterns of .txt articles.")
+    parser.add_argument("--limit", type=int, default=None, help="Compare at most this many articles.")
+    parser.add_argument("--input-price", type=float, default=DEFAULT_INPUT_PRICE, help="USD per 1M input tokens.")
+    parser.add_argument("--output-price", type=float, default=DEFAULT_OUTPUT_PRICE, help="USD per 1M output tokens.")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write per-article results to this file.")
+    args = parser.parse_args(argv)
+
+    files = collect_files(args.paths)[:args.limit]
+    print(f"Comparing extraction modes on {len(files)} files.")
+    rows = await compare_files(files, args.input_price, args.output_price)
+    print_summary(rows)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as file:
+            json.dump(rows, file, indent=2)
+        print(f"Wrote {args.json_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
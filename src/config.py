@@ -7,7 +7,77 @@ NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
 NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+# Async driver used by the API
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "100"))
+NEO4J_CONNECTION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "30")) # Seconds to open a connection
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60")) # Seconds to wait for a pooled connection
+NEO4J_FETCH_SIZE = int(os.getenv("NEO4J_FETCH_SIZE", "500")) # Records pulled per round trip when streaming
+NEO4J_QUERY_TIMEOUT = float(os.getenv("NEO4J_QUERY_TIMEOUT", "30")) # Server-side transaction timeout in seconds; 0 disables
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
+# LLM scheduling: separate budgets for batch ingestion and interactive API traffic (0 = unlimited)
+LLM_INGEST_RPM = float(os.getenv("LLM_INGEST_RPM", "600"))
+LLM_INGEST_TPM = float(os.getenv("LLM_INGEST_TPM", "800000"))
+LLM_INGEST_MAX_CONCURRENCY = int(os.getenv("LLM_INGEST_MAX_CONCURRENCY", "16"))
+LLM_INTERACTIVE_RPM = float(os.getenv("LLM_INTERACTIVE_RPM", "300"))
+LLM_INTERACTIVE_TPM = float(os.getenv("LLM_INTERACTIVE_TPM", "200000"))
+LLM_INTERACTIVE_MAX_CONCURRENCY = int(os.getenv("LLM_INTERACTIVE_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30.0"))
+
+# Ingestion
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "8"))
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "chained") # "chained" or "fused"
+METADATA_RULES_ENABLED = os.getenv("METADATA_RULES_ENABLED", "true").lower() in ("1", "true", "yes")
+METADATA_RULES_MIN_CONFIDENCE = float(os.getenv("METADATA_RULES_MIN_CONFIDENCE", "0.8")) # Rule-based fields below this go to the LLM
+EXTRACTION_CHUNK_SIZE = int(os.getenv("EXTRACTION_CHUNK_SIZE", "4000")) # Characters; 0 disables chunking
+NEO4J_WRITE_BATCH_SIZE = int(os.getenv("NEO4J_WRITE_BATCH_SIZE", "50"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))
+PIPELINE_WRITE_WORKERS = int(os.getenv("PIPELINE_WRITE_WORKERS", "1"))
+PIPELINE_REPORT_INTERVAL = float(os.getenv("PIPELINE_REPORT_INTERVAL", "10"))
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", os.path.join(".cache", "ingest_manifest.db"))
+
+# Entity canonicalization
+ENTITY_CANONICALIZATION = os.getenv("ENTITY_CANONICALIZATION", "true").lower() in ("1", "true", "yes")
+ENTITY_INDEX_PATH = os.getenv("ENTITY_INDEX_PATH", os.path.join(".cache", "entity_index.json"))
+ENTITY_MATCH_THRESHOLD = float(os.getenv("ENTITY_MATCH_THRESHOLD", "0.92"))
+
+# Extraction cache
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", os.path.join(".cache", "extraction"))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Query instrumentation
+QUERY_METRICS_ENABLED = os.getenv("QUERY_METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500")) # 0 disables the slow-query log
+QUERY_PROFILE_SAMPLE_RATE = float(os.getenv("QUERY_PROFILE_SAMPLE_RATE", "0")) # Fraction of read queries run with PROFILE
+
+# API
+API_MIGRATE_ON_STARTUP = os.getenv("API_MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes") # Apply src/schema.py migrations at startup
+API_WARM_CLIENTS = os.getenv("API_WARM_CLIENTS", "false").lower() in ("1", "true", "yes") # Connect to Neo4j at startup instead of first request
+GRAPH_VERSION_CHECK_INTERVAL = float(os.getenv("GRAPH_VERSION_CHECK_INTERVAL", "5")) # Seconds between reads of the GraphMeta versions
+SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", "3600")) # Seconds the Text2Cypher schema is reused even if unchanged
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "") # SQLite file shared by the API workers; empty keeps the cache in-process
+ENTITY_SEARCH_TIMEOUT = float(os.getenv("ENTITY_SEARCH_TIMEOUT", "2")) # Seconds; /graph/search is a type-ahead and must fail fast
+GRAPH_PROJECTION_ENABLED = os.getenv("GRAPH_PROJECTION_ENABLED", "true").lower() in ("1", "true", "yes") # In-memory CSR graph (needs numpy)
+GRAPH_CHANGELOG_SIZE = int(os.getenv("GRAPH_CHANGELOG_SIZE", "1000")) # GraphChange entries kept for incremental projection refreshes
+AGENT_CYPHER_CACHE_SIZE = int(os.getenv("AGENT_CYPHER_CACHE_SIZE", "512")) # Questions whose generated Cypher is reused; 0 disables
+AGENT_MAX_ROWS = int(os.getenv("AGENT_MAX_ROWS", "1000")) # LIMIT injected into generated Cypher
+AGENT_QUERY_TIMEOUT = float(os.getenv("AGENT_QUERY_TIMEOUT", "10")) # Seconds a generated query may run
+AGENT_MAX_CARTESIAN_ROWS = float(os.getenv("AGENT_MAX_CARTESIAN_ROWS", "10000")) # Estimated rows above which a cartesian product is rejected
+
+# Company connection search (src/connections.py)
+CONNECTIONS_MAX_DEPTH = int(os.getenv("CONNECTIONS_MAX_DEPTH", "3")) # Maximum path length in relationships
+CONNECTIONS_PATHS_PER_PAIR = int(os.getenv("CONNECTIONS_PATHS_PER_PAIR", "3"))
+CONNECTIONS_MAX_FRONTIER = int(os.getenv("CONNECTIONS_MAX_FRONTIER", "2000")) # Nodes visited per side of one pair
+CONNECTIONS_MAX_EXPANDED = int(os.getenv("CONNECTIONS_MAX_EXPANDED", "20000")) # Nodes fetched per request
+CONNECTIONS_MAX_DEGREE = int(os.getenv("CONNECTIONS_MAX_DEGREE", "200")) # Documents fetched per node (entity relationships are not capped)
+CONNECTIONS_TIMEOUT = float(os.getenv("CONNECTIONS_TIMEOUT", "5")) # Seconds before the remaining pairs are skipped
+CONNECTIONS_LIMIT = int(os.getenv("CONNECTIONS_LIMIT", "200"))
+
 if not GOOGLE_API_KEY:
     print("Warning: GOOGLE_API_KEY not found in environment variables.")
@@ -0,0 +1,217 @@
+"""
+Connection finding between the companies mentioned in a set of articles.
+
+The Company Analysis views used to match `(c1)-[*1..3]-(c2)` for every pair of
+mentioned companies, which enumerates every path through every hub (documents,
+sectors) and only stopped thanks to its LIMIT. ConnectionFinder instead runs a
+bidirectional BFS per pair, expanding the smaller frontier one level at a time,
+and returns the k shortest distinct paths of each pair. Neighbours are fetched
+from Neo4j in one batched query per BFS level and shared by all pairs, and the
+search is bounded by per-pair and global frontier caps and a deadline, so the
+latency no longer grows with the number of selected articles.
+
+Rows keep the shape of the old query: {Company1, Company2, Relationships, Distance}.
+"""
+import time
+from itertools import combinations, islice
+from src.config import (
+    CONNECTIONS_MAX_DEPTH, CONNECTIONS_PATHS_PER_PAIR, CONNECTIONS_MAX_FRONTIER,
+    CONNECTIONS_MAX_EXPANDED, CONNECTIONS_MAX_DEGREE, CONNECTIONS_TIMEOUT, CONNECTIONS_LIMIT,
+)
+
+COMPANIES_QUERY = """
+MATCH (d:Document)-[:MENTIONS]->(c:Company)
+WHERE d.title IN $titles
+RETURN DISTINCT elementId(c) AS id, COALESCE(c.name, c.id) AS name
+ORDER BY id
+"""
+
+# Relationships between entities are always returned. Only the documents a node is
+# mentioned in are capped at $max_degree, so a company mentioned in many articles
+# cannot flood a frontier or crowd out its own relationships.
+NEIGHBORS_QUERY = """
+UNWIND $ids AS id
+MATCH (n) WHERE elementId(n) = id
+CALL {
+    WITH n
+    MATCH (n)-[r]-(m)
+    WHERE NOT m:Document
+    RETURN elementId(m) AS neighbor, type(r) AS type
+    UNION ALL
+    WITH n
+    MATCH (n)-[r]-(m:Document)
+    RETURN elementId(m) AS neighbor, type(r) AS type
+    LIMIT $max_degree
+}
+RETURN id, collect([neighbor, type]) AS neighbors
+"""
+
+# Node ids per neighbour query
+EXPAND_BATCH_SIZE = 500
+
+class AdjacencyCache:
+    """
+    Neighbour lists fetched on demand and kept for the lifetime of one search, so
+    nodes shared by several pairs are only expanded once.
+
+    Args:
+        query: An async callable with the signature of AsyncGraphDB.query.
+        max_degree (int): Maximum number of documents fetched per node.
+    """
+
+    def __init__(self, query, max_degree: int = CONNECTIONS_MAX_DEGREE):
+        self._query = query
+        self.max_degree = max_degree
+        self._neighbors = {}
+
+    def __len__(self):
+        return len(self._neighbors)
+
+    async def expand(self, node_ids):
+        """Fetches the neighbours of the nodes in `node_ids` that were not fetched yet."""
+        missing = [node_id for node_id in dict.fromkeys(node_ids) if node_id not in self._neighbors]
+        for start in range(0, len(missing), EXPAND_BATCH_SIZE):
+            batch = missing[start:start + EXPAND_BATCH_SIZE]
+            records = await self._query(
+                NEIGHBORS_QUERY, {"ids": batch, "max_degree": self.max_degree}, name="connections_neighbors"
+            )
+            for node_id in batch:
+                self._neighbors[node_id] = []
+            for record in records:
+                self._neighbors[record["id"]] = [(neighbor, rel_type) for neighbor, rel_type in record["neighbors"]]
+
+    def neighbors(self, node_id) -> list:
+        """Returns the (neighbour id, relationship type) pairs of an expanded node."""
+        return self._neighbors.get(node_id, [])
+
+def _walk(parents: dict, node):
+    """Yields the (nodes, relationship types) of the shortest paths from the BFS root to `node`."""
+    if not parents[node]:
+        yield [node], []
+        return
+    for previous, rel_type in parents[node]:
+        for nodes, types in _walk(parents, previous):
+            yield nodes + [node], types + [rel_type]
+
+class ConnectionFinder:
+    """
+    Bounded bidirectional BFS between every pair of companies mentioned in a set of articles.
+
+    Args:
+        query: An async callable with the signature of AsyncGraphDB.query.
+        max_depth (int): Maximum path length, in relationships.
+        paths_per_pair (int): Paths returned per pair of companies (k).
+        max_frontier (int): Nodes one side of a pair may visit before its search stops.
+        max_expanded (int): Nodes fetched from Neo4j over the whole search before it stops.
+        max_degree (int): Documents fetched per node; relationships between entities are not capped.
+        timeout (float): Seconds after which the remaining pairs are skipped.
+        limit (int): Maximum number of rows returned.
+    """
+
+    def __init__(self, query, max_depth: int = CONNECTIONS_MAX_DEPTH, paths_per_pair: int = CONNECTIONS_PATHS_PER_PAIR,
+                 max_frontier: int = CONNECTIONS_MAX_FRONTIER, max_expanded: int = CONNECTIONS_MAX_EXPANDED,
+                 max_degree: int = CONNECTIONS_MAX_DEGREE, timeout: float = CONNECTIONS_TIMEOUT,
+                 limit: int = CONNECTIONS_LIMIT):
+        self._query = query
+        self.max_depth = max_depth
+        self.paths_per_pair = paths_per_pair
+        self.max_frontier = max_frontier
+        self.max_expanded = max_expanded
+        self.max_degree = max_degree
+        self.timeout = timeout
+        self.limit = limit
+
+    async def find(self, article_titles: list) -> list:
+        """
+        Returns the connections between the companies mentioned in `article_titles`,
+        shortest first, as {Company1, Company2, Relationships, Distance} rows.
+        """
+        companies = await self._query(COMPANIES_QUERY, {"titles": article_titles}, name="connections_companies")
+        names = {record["id"]: record["name"] for record in companies}
+        ids = sorted(names)
+        adjacency = AdjacencyCache(self._query, self.max_degree)
+        deadline = time.monotonic() + self.timeout
+        started = time.perf_counter()
+
+        rows = []
+        truncated = False
+        for source, target in combinations(ids, 2):
+            if time.monotonic() > deadline or len(adjacency) >= self.max_expanded:
+                truncated = True
+                break
+            paths, complete = await self._pair_paths(adjacency, source, target, deadline)
+            truncated = truncated or not complete
+            rows.extend(
+                {"Company1": names[source], "Company2": names[target], "Relationships": types, "Distance": len(types)}
+                for types in paths
+            )
+
+        rows.sort(key=lambda row: row["Distance"])
+        if truncated:
+            print(f"Connection search stopped early after {time.perf_counter() - started:.2f}s "
+                  f"({len(adjacency)} nodes expanded, {len(ids)} companies)")
+        return rows[:self.limit]
+
+    async def _pair_paths(self, adjacency: AdjacencyCache, source, target, deadline: float):
+        """
+        Returns the relationship types of the k shortest distinct paths between
+        `source` and `target`, and whether the search ran to max_depth.
+        """
+        distances = ({source: 0}, {target: 0})
+        parents = ({source: []}, {target: []})
+        frontiers = [[source], [target]]
+        depths = [0, 0]
+        complete = True
+
+        while depths[0] + depths[1] < self.max_depth and (frontiers[0] or frontiers[1]):
+            if time.monotonic() > deadline or len(adjacency) >= self.max_expanded:
+                complete = False
+                break
+            # Expand the side with the smaller frontier
+            side = 0 if not frontiers[1] or (frontiers[0] and len(frontiers[0]) <= len(frontiers[1])) else 1
+            await adjacency.expand(frontiers[side])
+            seen, side_parents = distances[side], parents[side]
+            level = depths[side] + 1
+            next_frontier = []
+            for node in frontiers[side]:
+                for neighbor, rel_type in adjacency.neighbors(node):
+                    distance = seen.get(neighbor)
+                    if distance is None:
+                        seen[neighbor] = level
+                        side_parents[neighbor] = [(node, rel_type)]
+                        next_frontier.append(neighbor)
+                    elif distance == level:
+                        side_parents[neighbor].append((node, rel_type))
+            depths[side] = level
+            frontiers[side] = next_frontier
+            if len(seen) > self.max_frontier:
+                # Keep what was reached, but stop growing this side
+                frontiers[side] = []
+                complete = False
+
+        return self._collect_paths(distances, parents), complete
+
+    def _collect_paths(self, distances: tuple, parents: tuple) -> list:
+        """Joins the forward and backward BFS trees at their common nodes, shortest paths first."""
+        forward, backward = distances
+        meetings = sorted(
+            (forward[node] + backward[node], node) for node in forward
+            if node in backward and forward[node] + backward[node] <= self.max_depth
+        )
+        # Enough partial paths per meeting node to find k distinct joined paths
+        per_side = self.paths_per_pair * 4
+        found = {}
+        for _, node in meetings:
+            # Meetings come shortest first, so later ones cannot give shorter paths
+            if len(found) >= self.paths_per_pair:
+                break
+            tails = list(islice(_walk(parents[1], node), per_side))
+            for head_nodes, head_types in islice(_walk(parents[0], node), per_side):
+                for tail_nodes, tail_types in tails:
+                    nodes = head_nodes + tail_nodes[-2::-1]
+                    if len(set(nodes)) != len(nodes):
+                        continue
+                    types = head_types + tail_types[::-1]
+                    found.setdefault((tuple(nodes), tuple(types)), len(types))
+        paths = sorted(found.items(), key=lambda item: item[1])
+        return [list(types) for (_, types), _ in paths[:self.paths_per_pair]]
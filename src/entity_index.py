@@ -0,0 +1,293 @@
+"""
+Entity canonicalization.
+
+LLM extraction spells the same entity in different ways ("Nvidia", "NVIDIA Corp",
+"Nvidia Corporation"). EntityIndex maps every spelling to one canonical id per
+entity type, using a normalized key for exact matches and a blocked fuzzy match
+for near-misses, so that ingestion MERGEs into the existing node instead of
+creating a duplicate.
+
+Usage:
+    python -m src.entity_index merge --dry-run   # Show duplicate groups already in the graph
+    python -m src.entity_index merge             # Merge them into one node each
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+from src.config import ENTITY_INDEX_PATH, ENTITY_MATCH_THRESHOLD
+from src.graph_meta import record_write
+from src.schema import ENTITY_LABELS
+from src.sentiment_timeline import MERGED_ENTITY_QUERY
+
+# Trailing words that do not distinguish one company from another
+COMPANY_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited",
+    "llc", "plc", "ag", "sa", "nv", "se", "gmbh", "holdings", "holding", "group",
+}
+
+# Keys shorter than this only match exactly; fuzzy matching short names (AMD vs AMC) is too risky
+MIN_FUZZY_LENGTH = 5
+
+def normalize_key(name: str, entity_type: str = None) -> str:
+    """Returns the comparison key of an entity name: lowercase, no accents, punctuation or spaces."""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    text = text.replace("&", " and ")
+    text = re.sub(r"'s\b", "", text)
+    tokens = re.findall(r"[a-z0-9]+", text)
+    if entity_type == "Company":
+        while len(tokens) > 1 and tokens[-1] in COMPANY_SUFFIXES:
+            tokens.pop()
+    return "".join(tokens)
+
+class EntityIndex:
+    """
+    In-memory index from (type, normalized key) to canonical entity id.
+
+    Thread-safe, so it can be used from the Neo4j writer threads.
+    """
+
+    def __init__(self, threshold: float = ENTITY_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._canonical = {} # (type, key) -> canonical id
+        self._blocks = {} # (type, key prefix) -> set of keys, candidates for fuzzy matching
+        self._aliases = {} # (type, canonical id) -> set of other spellings
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._aliases)
+
+    def _register(self, entity_type: str, key: str, entity_id: str):
+        self._canonical[(entity_type, key)] = entity_id
+        self._blocks.setdefault((entity_type, key[:3]), set()).add(key)
+        self._aliases.setdefault((entity_type, entity_id), set())
+
+    def _match(self, entity_type: str, key: str):
+        canonical = self._canonical.get((entity_type, key))
+        if canonical is not None or len(key) < MIN_FUZZY_LENGTH:
+            return canonical
+        best_ratio, best_key = 0.0, None
+        for candidate in self._blocks.get((entity_type, key[:3]), ()):
+            if len(candidate) < MIN_FUZZY_LENGTH:
+                continue
+            matcher = SequenceMatcher(None, key, candidate)
+            if matcher.real_quick_ratio() < self.threshold or matcher.quick_ratio() < self.threshold:
+                continue
+            ratio = matcher.ratio()
+            if ratio > best_ratio:
+                best_ratio, best_key = ratio, candidate
+        if best_key is not None and best_ratio >= self.threshold:
+            return self._canonical[(entity_type, best_key)]
+        return None
+
+    def add(self, entity_type: str, entity_id: str, aliases=()):
+        """Registers `entity_id` as a canonical entity (unless it already resolves to one)."""
+        with self._lock:
+            key = normalize_key(entity_id, entity_type)
+            if not key:
+                return
+            canonical = self._canonical.get((entity_type, key))
+            if canonical is None:
+                self._register(entity_type, key, entity_id)
+                canonical = entity_id
+            elif canonical != entity_id:
+                self._aliases[(entity_type, canonical)].add(entity_id)
+            for alias in aliases:
+                alias_key = normalize_key(alias, entity_type)
+                if alias_key and alias != canonical:
+                    self._canonical.setdefault((entity_type, alias_key), canonical)
+                    self._aliases[(entity_type, canonical)].add(alias)
+
+    def resolve(self, entity_type: str, entity_id: str) -> str:
+        """
+        Returns the canonical id for an entity, registering it as a new entity if
+        nothing matches.
+        """
+        with self._lock:
+            key = normalize_key(entity_id, entity_type)
+            if not key:
+                return entity_id
+            canonical = self._match(entity_type, key)
+            if canonical is None:
+                self._register(entity_type, key, entity_id)
+                return entity_id
+            if canonical != entity_id:
+                self._aliases[(entity_type, canonical)].add(entity_id)
+                # Remember the exact spelling so the next lookup skips fuzzy matching
+                self._canonical.setdefault((entity_type, key), canonical)
+            return canonical
+
+    def aliases(self, entity_type: str, entity_id: str) -> list:
+        return sorted(self._aliases.get((entity_type, entity_id), ()))
+
+    def canonicalize(self, data: dict) -> dict:
+        """
+        Rewrites the node ids of one article's extraction results to canonical ids,
+        in place. Nodes that collapse into the same entity are de-duplicated and
+        relationships that become self-loops are dropped.
+        """
+        renamed = {}
+        for graph_doc in data.get("graph_documents") or []:
+            nodes = {}
+            for node in graph_doc.nodes:
+                canonical = self.resolve(node.type, node.id)
+                renamed[node.id] = canonical
+                node.id = canonical
+                nodes.setdefault((node.id, node.type), node)
+            graph_doc.nodes = list(nodes.values())
+
+            relationships = []
+            for rel in graph_doc.relationships:
+                rel.source.id = self.resolve(rel.source.type, rel.source.id)
+                rel.target.id = self.resolve(rel.target.type, rel.target.id)
+                if (rel.source.id, rel.source.type) != (rel.target.id, rel.target.type):
+                    relationships.append(rel)
+            graph_doc.relationships = relationships
+
+        for entity_sentiment in data.get("sentiment") or []:
+            entity_sentiment.entity_name = renamed.get(entity_sentiment.entity_name, entity_sentiment.entity_name)
+        return data
+
+    # --- Persistence ---
+
+    def load_from_graph(self, query):
+        """
+        Registers every entity already in the graph as canonical.
+
+        Args:
+            query: A callable running Cypher and returning rows, e.g. GraphDB.query or Neo4jGraph.query.
+        """
+        rows = query("""
+        MATCH (n)
+        WHERE n.id IS NOT NULL AND NOT n:Document
+        RETURN labels(n)[0] AS type, n.id AS id, n.aliases AS aliases
+        """)
+        for row in rows:
+            if row["type"] and isinstance(row["id"], str):
+                self.add(row["type"], row["id"], row["aliases"] or ())
+        return self
+
+    def save(self, path: str = ENTITY_INDEX_PATH):
+        entities = [
+            {"type": entity_type, "id": entity_id, "aliases": sorted(aliases)}
+            for (entity_type, entity_id), aliases in sorted(self._aliases.items())
+        ]
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"version": 1, "entities": entities}, file, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = ENTITY_INDEX_PATH, threshold: float = ENTITY_MATCH_THRESHOLD):
+        index = cls(threshold=threshold)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                for entity in json.load(file).get("entities", []):
+                    index.add(entity["type"], entity["id"], entity.get("aliases", ()))
+        return index
+
+# --- Merging existing duplicates ---
+
+def find_duplicate_groups(query, threshold: float = ENTITY_MATCH_THRESHOLD) -> list:
+    """
+    Groups entities already in the graph that resolve to the same canonical entity.
+
+    Returns:
+        list[dict]: {"type", "canonical", "ids"} per group of two or more nodes, where
+        `canonical` is the most-mentioned spelling.
+    """
+    rows = query("""
+    MATCH (n)
+    WHERE n.id IS NOT NULL AND NOT n:Document
+    RETURN labels(n)[0] AS type, n.id AS id, COUNT { (n)<-[:MENTIONS]-() } AS mentions
+    ORDER BY mentions DESC, size(n.id) DESC
+    """)
+    index = EntityIndex(threshold=threshold)
+    groups = {}
+    for row in rows:
+        if row["type"] not in ENTITY_LABELS or not isinstance(row["id"], str):
+            continue
+        canonical = index.resolve(row["type"], row["id"])
+        groups.setdefault((row["type"], canonical), []).append(row["id"])
+    return [
+        {"type": entity_type, "canonical": canonical, "ids": ids}
+        for (entity_type, canonical), ids in groups.items()
+        if len(ids) > 1
+    ]
+
+# The label is interpolated (after merge_query checks it) so that the per-label id constraint is used
+MERGE_QUERY = """
+UNWIND $ids AS id
+MATCH (n:`{label}` {{id: id}})
+WITH n ORDER BY CASE WHEN n.id = $canonical THEN 0 ELSE 1 END
+WITH collect(n) AS nodes
+CALL apoc.refactor.mergeNodes(nodes, {{properties: "discard", mergeRels: true}}) YIELD node
+SET node.id = $canonical, node.aliases = $aliases
+RETURN elementId(node) AS id
+"""
+
+def merge_query(label: str) -> str:
+    """MERGE_QUERY for one entity label. Raises ValueError for a label outside the data model."""
+    if label not in ENTITY_LABELS:
+        raise ValueError(f"Unknown entity type: {label}")
+    return MERGE_QUERY.format(label=label)
+
+def _merge_group(tx, group: dict, aliases: list):
+    record = tx.run(merge_query(group["type"]), ids=group["ids"], canonical=group["canonical"], aliases=aliases).single()
+    if record is None:
+        return
+    # The daily sentiment aggregates are keyed on entity ids, so the aliases' counts move to the canonical id
+    tx.run(MERGED_ENTITY_QUERY, ids=group["ids"], type=group["type"], node=record["id"]).consume()
+    # Bumps the data version so that cached API results are invalidated. The merged
+    # duplicates are deleted, which the graph projection can only pick up by rebuilding.
+    record_write(tx, {group["type"]}, (), nodes=[record["id"]], rebuild=True)
+
+def merge_duplicates(db, threshold: float = ENTITY_MATCH_THRESHOLD, dry_run: bool = False) -> list:
+    """
+    Merges every group of duplicate entities into its canonical node, one write
+    transaction per group. Returns the groups.
+
+    Args:
+        db: A GraphDB instance.
+    """
+    groups = find_duplicate_groups(db.query, threshold)
+    for group in groups:
+        aliases = [i for i in group["ids"] if i != group["canonical"]]
+        print(f"{group['type']}: {group['canonical']} <- {', '.join(aliases)}")
+        if not dry_run:
+            with db.driver.session() as session:
+                session.execute_write(_merge_group, group, aliases)
+    return groups
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entity canonicalization tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    merge_parser = commands.add_parser("merge", help="Merge duplicate entities already in the graph.")
+    merge_parser.add_argument("--dry-run", action="store_true", help="Only print the duplicate groups.")
+    merge_parser.add_argument("--threshold", type=float, default=ENTITY_MATCH_THRESHOLD, help="Fuzzy match threshold (0-1).")
+    commands.add_parser("rebuild", help=f"Rebuild {ENTITY_INDEX_PATH} from the graph.")
+    args = parser.parse_args(argv)
+
+    from src.graph_db import db
+
+    if args.command == "merge":
+        groups = merge_duplicates(db, threshold=args.threshold, dry_run=args.dry_run)
+        action = "Found" if args.dry_run else "Merged"
+        print(f"{action} {len(groups)} groups of duplicate entities.")
+        if args.dry_run:
+            return 0
+
+    # The graph is the source of truth; merged nodes carry their aliases
+    index = EntityIndex(threshold=args.threshold if args.command == "merge" else ENTITY_MATCH_THRESHOLD).load_from_graph(db.query)
+    index.save(ENTITY_INDEX_PATH)
+    print(f"Saved {len(index)} entities to {ENTITY_INDEX_PATH}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
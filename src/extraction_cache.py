@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from src.config import EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_BYTES
+
+class ExtractionCache:
+    """
+    Content-addressed on-disk cache of extraction results.
+
+    Each entry is a JSON file named after a SHA-256 key derived from the article text
+    and everything that influences the LLM output (model, schema, prompt version).
+    Entries are evicted least-recently-used first once the cache exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory: str = EXTRACTION_CACHE_DIR, max_bytes: int = EXTRACTION_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None # Lazily computed total size in bytes
+
+    @staticmethod
+    def make_key(text: str, model: str, allowed_nodes, allowed_relationships, prompt_version: str) -> str:
+        """Returns the cache key for an article extracted with the given configuration."""
+        fingerprint = json.dumps({
+            "text": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            "model": model,
+            "allowed_nodes": sorted(allowed_nodes),
+            "allowed_relationships": sorted(allowed_relationships),
+            "prompt_version": prompt_version,
+        }, sort_keys=True)
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str):
+        """Returns the cached payload for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                payload = json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Discarding unreadable cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        # Touch the entry so eviction treats it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return payload
+
+    def put(self, key: str, payload: dict):
+        """Stores `payload` under `key`, evicting old entries if the cache grows too large."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+
+        # Write to a temporary file first so readers never see a partial entry
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(payload, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        if self._size is not None:
+            self._size += os.path.getsize(path) - previous
+        if self.total_size() > self.max_bytes:
+            self.prune(max_bytes=int(self.max_bytes * 0.9))
+
+    def _remove(self, path: str) -> int:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return 0
+        if self._size is not None:
+            self._size -= size
+        return size
+
+    def entries(self):
+        """Returns (key, size, last_used) for every entry, least recently used first."""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.name[:-len(".json")], stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda e: e[2])
+        return entries
+
+    def total_size(self) -> int:
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self.entries())
+        return self._size
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        self._size = sum(size for _, size, _ in entries)
+        return {
+            "directory": self.directory,
+            "entries": len(entries),
+            "total_bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "oldest": entries[0][2] if entries else None,
+            "newest": entries[-1][2] if entries else None,
+        }
+
+    def prune(self, max_bytes: int = None, older_than: float = None) -> int:
+        """
+        Removes entries until the cache fits in `max_bytes` (least recently used first)
+        and drops every entry not used within the last `older_than` seconds.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - older_than if older_than is not None else None
+        removed = 0
+        for key, size, last_used in entries:
+            too_big = max_bytes is not None and total > max_bytes
+            too_old = cutoff is not None and last_used < cutoff
+            if not (too_big or too_old):
+                continue
+            total -= size
+            self._remove(self._path(key))
+            removed += 1
+        self._size = total
+        return removed
+
+    def clear(self) -> int:
+        return self.prune(max_bytes=0)
+
+def _format_bytes(size: int) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+
+def _format_time(timestamp) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp)) if timestamp else "-"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or prune the extraction cache.")
+    parser.add_argument("--dir", default=EXTRACTION_CACHE_DIR, help="Cache directory.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Show the number of entries and total size.")
+    list_parser = commands.add_parser("list", help="List entries, most recently used first.")
+    list_parser.add_argument("-n", "--limit", type=int, default=50)
+    prune_parser = commands.add_parser("prune", help="Evict entries by size and/or age.")
+    prune_parser.add_argument("--max-bytes", type=int, default=None, help="Shrink the cache to at most this many bytes.")
+    prune_parser.add_argument("--older-than-days", type=float, default=None, help="Remove entries unused for this many days.")
+    commands.add_parser("clear", help="Remove every entry.")
+    args = parser.parse_args(argv)
+
+    cache = ExtractionCache(directory=args.dir)
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"Directory: {stats['directory']}")
+        print(f"Entries:   {stats['entries']}")
+        print(f"Size:      {_format_bytes(stats['total_bytes'])} / {_format_bytes(stats['max_bytes'])}")
+        print(f"Oldest:    {_format_time(stats['oldest'])}")
+        print(f"Newest:    {_format_time(stats['newest'])}")
+    elif args.command == "list":
+        for key, size, last_used in list(reversed(cache.entries()))[:args.limit]:
+            print(f"{key}  {_format_bytes(size):>10}  {_format_time(last_used)}")
+    elif args.command == "prune":
+        if args.max_bytes is None and args.older_than_days is None:
+            parser.error("prune requires --max-bytes and/or --older-than-days")
+        older_than = args.older_than_days * 86400 if args.older_than_days is not None else None
+        removed = cache.prune(max_bytes=args.max_bytes, older_than=older_than)
+        print(f"Removed {removed} entries.")
+    elif args.command == "clear":
+        print(f"Removed {cache.clear()} entries.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,79 @@
-from neo4j import GraphDatabase
+import threading
 from src.config import NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, NEO4J_DATABASE
+from src.config import NEO4J_MAX_POOL_SIZE, NEO4J_CONNECTION_TIMEOUT, NEO4J_ACQUISITION_TIMEOUT, NEO4J_QUERY_TIMEOUT, NEO4J_FETCH_SIZE
+from src.query_metrics import query_metrics
+
+# Row mappers for stream(): turn a neo4j Record into something lighter as soon as it arrives
+
+def row_dict(record) -> dict:
+    """Record as a plain dict; nodes and relationships become property dicts."""
+    return record.data()
+
+def row_tuple(record) -> tuple:
+    """Record values as a tuple, in RETURN order (graph entities are kept as-is)."""
+    return tuple(record.values())
+
+def create_driver():
+    from neo4j import GraphDatabase
+    return GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD), database=NEO4J_DATABASE)
 
 class GraphDB:
-    def __init__(self):
-        self.driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD), database=NEO4J_DATABASE)
+    """
+    Neo4j access for the API and the Streamlit apps.
+
+    The driver is created by `driver_factory` on first use, so constructing a
+    GraphDB (and importing this module) does no I/O. Every query is recorded in
+    query_metrics under `name` (see src/query_metrics.py).
+    """
+
+    def __init__(self, driver_factory=create_driver):
+        self._driver_factory = driver_factory
+        self._driver = None
+        self._lock = threading.Lock()
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            with self._lock:
+                if self._driver is None:
+                    self._driver = self._driver_factory()
+        return self._driver
 
     def close(self):
-        self.driver.close()
+        with self._lock:
+            driver, self._driver = self._driver, None
+        if driver is not None:
+            driver.close()
+
+    def query(self, query, parameters=None, name: str = None):
+        with query_metrics.run(name, query) as run, self.driver.session() as session:
+            result = session.run(run.statement, parameters)
+            records = [record for record in result]
+            run.rows, run.summary = len(records), result.consume()
+            return records
+
+    def stream(self, query, parameters=None, mapper=row_dict, fetch_size: int = NEO4J_FETCH_SIZE, name: str = None):
+        """
+        Yields the rows of a query one at a time, mapped by `mapper`, while the driver
+        pulls `fetch_size` records per round trip. Only one batch of records is held
+        in memory, however large the result.
 
-    def query(self, query, parameters=None):
+        Args:
+            mapper: Callable applied to each Record, e.g. row_dict, row_tuple or a
+                function building a caller-defined structure. None yields the Records.
+        """
+        with query_metrics.run(name, query) as run, self.driver.session(fetch_size=fetch_size) as session:
+            result = session.run(run.statement, parameters)
+            for record in result:
+                run.rows += 1
+                yield mapper(record) if mapper else record
+            run.summary = result.consume()
+
+    def explain(self, query, parameters=None):
+        """Returns the execution plan of a query (as a dict) without running it."""
         with self.driver.session() as session:
-            result = session.run(query, parameters)
-            return [record for record in result]
+            summary = session.run(f"EXPLAIN {query}", parameters).consume()
+            return summary.plan
 
     def clear_database(self):
         """CAUTION: Deletes all nodes and relationships."""
@@ -19,15 +81,9 @@ class GraphDB:
         self.query(query)
 
     def create_constraints(self):
-        """Create constraints to ensure data integrity."""
-        queries = [
-            "CREATE CONSTRAINT IF NOT EXISTS FOR (c:Company) REQUIRE c.name IS UNIQUE",
-            "CREATE CONSTRAINT IF NOT EXISTS FOR (p:Person) REQUIRE p.name IS UNIQUE",
-            "CREATE CONSTRAINT IF NOT EXISTS FOR (t:Topic) REQUIRE t.name IS UNIQUE",
-            "CREATE CONSTRAINT IF NOT EXISTS FOR (a:Article) REQUIRE a.url IS UNIQUE"
-        ]
-        for q in queries:
-            self.query(q)
+        """Applies the schema migrations (constraints and indexes). See src/schema.py."""
+        from src.schema import migrate
+        migrate(self.query)
 
     @property
     def get_schema(self):
@@ -37,18 +93,128 @@ class GraphDB:
         RETURN schema
         """
         try:
-            result = self.query(query)
+            result = self.query(query, name="schema")
+            if result:
+                return result[0]['schema']
+        except Exception:
+            # Fallback if APOC is not available
+            node_labels = self.query("CALL db.labels()", name="schema_labels")
+            rel_types = self.query("CALL db.relationshipTypes()", name="schema_relationship_types")
+            return {
+                "node_labels": [r[0] for r in node_labels],
+                "relationship_types": [r[0] for r in rel_types]
+            }
+        return {}
+
+def create_async_driver(max_pool_size: int = NEO4J_MAX_POOL_SIZE, connection_timeout: float = NEO4J_CONNECTION_TIMEOUT,
+                        acquisition_timeout: float = NEO4J_ACQUISITION_TIMEOUT):
+    from neo4j import AsyncGraphDatabase
+    return AsyncGraphDatabase.driver(
+        NEO4J_URI,
+        auth=(NEO4J_USERNAME, NEO4J_PASSWORD),
+        max_connection_pool_size=max_pool_size,
+        connection_timeout=connection_timeout,
+        connection_acquisition_timeout=acquisition_timeout,
+    )
+
+async def _read_records(tx, query, parameters):
+    result = await tx.run(query, parameters)
+    records = [record async for record in result]
+    return records, await result.consume()
+
+class AsyncGraphDB:
+    """
+    Async counterpart of GraphDB for the FastAPI routes, built on the neo4j async driver.
+
+    Queries run in managed transactions on pooled connections, so a slow query only
+    occupies its own connection instead of blocking the event loop. Pool size and
+    connection timeouts come from the driver factory; `timeout` on each query sets
+    the server-side transaction timeout.
+    """
+
+    def __init__(self, driver_factory=create_async_driver, database: str = NEO4J_DATABASE,
+                 query_timeout: float = NEO4J_QUERY_TIMEOUT):
+        self._driver_factory = driver_factory
+        self._driver = None
+        self.database = database
+        self.query_timeout = query_timeout
+
+    @property
+    def driver(self):
+        # Creating the driver does no I/O, so no lock is needed on the event loop
+        if self._driver is None:
+            self._driver = self._driver_factory()
+        return self._driver
+
+    async def close(self):
+        driver, self._driver = self._driver, None
+        if driver is not None:
+            await driver.close()
+
+    def _unit_of_work(self, work, timeout):
+        from neo4j import unit_of_work
+        timeout = self.query_timeout if timeout is None else timeout
+        return unit_of_work(timeout=timeout)(work) if timeout else work
+
+    async def query(self, query, parameters=None, timeout: float = None, name: str = None):
+        """Runs a read query in a managed read transaction and returns all records."""
+        with query_metrics.run(name, query) as run:
+            async with self.driver.session(database=self.database) as session:
+                records, run.summary = await session.execute_read(self._unit_of_work(_read_records, timeout), run.statement, parameters)
+            run.rows = len(records)
+            return records
+
+    async def stream(self, query, parameters=None, mapper=row_dict, fetch_size: int = NEO4J_FETCH_SIZE, timeout: float = None,
+                     name: str = None):
+        """
+        Async counterpart of GraphDB.stream: yields mapped rows while the driver pulls
+        `fetch_size` records per round trip. Runs as an auto-commit read, because a
+        managed transaction would have to materialize the result before returning.
+        """
+        from neo4j import Query, READ_ACCESS
+        timeout = self.query_timeout if timeout is None else timeout
+        with query_metrics.run(name, query) as run:
+            async with self.driver.session(database=self.database, fetch_size=fetch_size, default_access_mode=READ_ACCESS) as session:
+                result = await session.run(Query(run.statement, timeout=timeout or None), parameters)
+                async for record in result:
+                    run.rows += 1
+                    yield mapper(record) if mapper else record
+                run.summary = await result.consume()
+
+    async def explain(self, query, parameters=None):
+        """Plans a query without running it. Returns the ResultSummary, with `plan` and `query_type`."""
+        async with self.driver.session(database=self.database) as session:
+            result = await session.run(f"EXPLAIN {query}", parameters)
+            return await result.consume()
+
+    async def write(self, query, parameters=None, timeout: float = None, name: str = None):
+        """Runs a query in a managed write transaction and returns all records."""
+        with query_metrics.run(name, query) as run:
+            async with self.driver.session(database=self.database) as session:
+                records, run.summary = await session.execute_write(self._unit_of_work(_read_records, timeout), run.statement, parameters)
+            run.rows = len(records)
+            return records
+
+    async def get_schema(self):
+        """Returns the graph schema."""
+        query = """
+        CALL apoc.meta.schema() YIELD value as schema
+        RETURN schema
+        """
+        try:
+            result = await self.query(query, name="schema")
             if result:
                 return result[0]['schema']
         except Exception:
             # Fallback if APOC is not available
-            node_labels = self.query("CALL db.labels()")
-            rel_types = self.query("CALL db.relationshipTypes()")
+            node_labels = await self.query("CALL db.labels()", name="schema_labels")
+            rel_types = await self.query("CALL db.relationshipTypes()", name="schema_relationship_types")
             return {
                 "node_labels": [r[0] for r in node_labels],
                 "relationship_types": [r[0] for r in rel_types]
             }
         return {}
 
-# Singleton instance
+# Singleton instances; the drivers are only created on the first query
 db = GraphDB()
+async_db = AsyncGraphDB()
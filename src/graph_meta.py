@@ -0,0 +1,91 @@
+"""
+Graph metadata shared between ingestion and the API.
+
+Ingestion bumps `data_version` on a single `(:GraphMeta {id: "graph"})` node in
+every write transaction. It also records the node labels and relationship types it
+writes there and bumps `schema_version` whenever a batch introduces a label or
+type that was not there before. The API reads the versions (a single indexed lookup) to decide
+when its cached views of the graph are stale.
+
+Each write also leaves a `(:GraphChange {version, nodes})` entry listing the
+elementIds of the nodes it touched, so that the in-memory graph projection
+(src/graph_projection.py) can refresh just those nodes. Writes that delete
+nodes, such as merging duplicate entities, set `rebuild` on their entry instead,
+and the projection is rebuilt. Only the last GRAPH_CHANGELOG_SIZE entries are kept.
+"""
+import time
+import asyncio
+from src.config import GRAPH_VERSION_CHECK_INTERVAL, GRAPH_CHANGELOG_SIZE
+
+META_ID = "graph"
+
+# Labels used for bookkeeping and materialized aggregates, not part of the data model shown to users or the LLM
+INTERNAL_LABELS = {"GraphMeta", "GraphChange", "SchemaMigration", "SentimentDaily"}
+
+RECORD_WRITE_QUERY = """
+MERGE (m:GraphMeta {id: $meta_id})
+WITH m, [label IN $labels WHERE NOT label IN coalesce(m.labels, [])] AS new_labels,
+     [type IN $relationship_types WHERE NOT type IN coalesce(m.relationship_types, [])] AS new_types
+SET m.data_version = coalesce(m.data_version, 0) + 1,
+    m.labels = coalesce(m.labels, []) + new_labels,
+    m.relationship_types = coalesce(m.relationship_types, []) + new_types,
+    m.schema_version = coalesce(m.schema_version, 0) + CASE WHEN size(new_labels) + size(new_types) > 0 THEN 1 ELSE 0 END
+RETURN m.data_version AS data_version, m.schema_version AS schema_version
+"""
+
+CHANGE_QUERY = """
+CREATE (:GraphChange {version: $version, nodes: $nodes, rebuild: $rebuild})
+WITH 1 AS created
+MATCH (old:GraphChange) WHERE old.version <= $version - $keep
+DELETE old
+"""
+
+VERSIONS_QUERY = """
+MATCH (m:GraphMeta {id: $meta_id})
+RETURN m.data_version AS data_version, m.schema_version AS schema_version
+"""
+
+def record_write(tx, labels, relationship_types, nodes=(), rebuild: bool = False) -> int:
+    """
+    Records a write, the labels and relationship types it used and the elementIds
+    of the nodes it touched; runs inside the writer's transaction. `rebuild` marks
+    writes that deleted nodes, which the projection cannot apply incrementally.
+
+    Returns:
+        int: The new data version.
+    """
+    row = tx.run(RECORD_WRITE_QUERY, meta_id=META_ID, labels=sorted(labels), relationship_types=sorted(relationship_types)).single()
+    version = row["data_version"]
+    tx.run(CHANGE_QUERY, version=version, nodes=sorted(nodes), rebuild=rebuild, keep=GRAPH_CHANGELOG_SIZE).consume()
+    return version
+
+class GraphVersions:
+    """
+    Reads the GraphMeta versions, at most once every `check_interval` seconds.
+
+    Args:
+        query: An async callable running a read query, e.g. AsyncGraphDB.query.
+        check_interval (float): Seconds a read is reused; 0 reads on every call.
+    """
+
+    def __init__(self, query, check_interval: float = GRAPH_VERSION_CHECK_INTERVAL):
+        self._query = query
+        self.check_interval = check_interval
+        self._versions = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> dict:
+        """Returns {"data_version": int, "schema_version": int}; both 0 before the first ingestion."""
+        if self._versions is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return self._versions
+        async with self._lock:
+            if self._versions is None or time.monotonic() - self._checked_at >= self.check_interval:
+                rows = await self._query(VERSIONS_QUERY, {"meta_id": META_ID}, name="graph_versions")
+                row = rows[0] if rows else {}
+                self._versions = {
+                    "data_version": row.get("data_version") or 0,
+                    "schema_version": row.get("schema_version") or 0,
+                }
+                self._checked_at = time.monotonic()
+        return self._versions
@@ -0,0 +1,384 @@
+"""
+In-memory projection of the entity graph for neighbourhood and subgraph queries.
+
+Induced subgraphs (/graph/network), relationship context (/agent/insight) and
+multi-hop expansion (the Streamlit graph view) used to re-traverse Neo4j on every
+request. GraphProjection keeps the entity graph (every node except documents and
+bookkeeping nodes) in process as NumPy CSR adjacency arrays:
+
+- nodes get integer ids; `element_ids` and `index` map them to and from Neo4j elementIds,
+- `label_codes` and `edge_types` hold label and relationship type codes into
+  `label_names` and `type_names`,
+- the neighbours of node i are `indices[indptr[i]:indptr[i + 1]]`. Every
+  relationship is stored once in each direction, like an undirected `(n)-[r]-(m)`
+  match, and `outgoing` flags the entry that follows its actual direction.
+
+A projection is an immutable snapshot of one data version (see src/graph_meta.py).
+ProjectionLoader builds it once and afterwards only refetches the nodes listed in
+the GraphChange entries written since, so a refresh after ingestion costs a few
+small queries. Entries flagged `rebuild` (writes that deleted nodes) trigger a full rebuild. Callers that get None (projection disabled, numpy missing or a
+failed load) fall back to Cypher.
+
+Labels are matched on each node's first label, which is the only one ingestion gives entities.
+"""
+import asyncio
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from src.config import GRAPH_PROJECTION_ENABLED
+from src.graph_db import row_tuple
+from src.graph_meta import INTERNAL_LABELS, META_ID, VERSIONS_QUERY
+
+# Documents are reached through MENTIONS with indexed Cypher; the projection only holds entities
+EXCLUDED_LABELS = sorted({"Document", "Article"} | INTERNAL_LABELS)
+
+NODES_QUERY = """
+MATCH (n) WHERE none(l IN labels(n) WHERE l IN $excluded)
+RETURN elementId(n) AS id, COALESCE(labels(n)[0], 'Unknown') AS label, COALESCE(n.name, n.id, 'Unknown') AS name
+"""
+
+RELATIONSHIPS_QUERY = """
+MATCH (n)-[r]->(m)
+WHERE none(l IN labels(n) WHERE l IN $excluded) AND none(l IN labels(m) WHERE l IN $excluded)
+RETURN elementId(n) AS source, elementId(m) AS target, type(r) AS type
+"""
+
+CHANGES_QUERY = """
+MATCH (c:GraphChange) WHERE c.version > $since
+RETURN c.version AS version, c.nodes AS nodes, coalesce(c.rebuild, false) AS rebuild
+ORDER BY version
+"""
+
+CHANGED_NODES_QUERY = """
+UNWIND $ids AS id
+MATCH (n) WHERE elementId(n) = id AND none(l IN labels(n) WHERE l IN $excluded)
+RETURN elementId(n) AS id, COALESCE(labels(n)[0], 'Unknown') AS label, COALESCE(n.name, n.id, 'Unknown') AS name
+"""
+
+# Both directions of every relationship of the changed nodes, i.e. their full adjacency rows
+CHANGED_ADJACENCY_QUERY = """
+UNWIND $ids AS id
+MATCH (n)-[r]-(m) WHERE elementId(n) = id AND none(l IN labels(m) WHERE l IN $excluded)
+RETURN elementId(n) AS source, elementId(m) AS target, type(r) AS type, startNode(r) = n AS outgoing
+"""
+
+def _intern(names: list, index: dict, value: str) -> int:
+    code = index.get(value)
+    if code is None:
+        code = index[value] = len(names)
+        names.append(value)
+    return code
+
+def _ranges(starts, ends):
+    """Concatenation of the ranges [starts[i], ends[i]) as one index array."""
+    counts = ends - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return np.arange(total, dtype=np.int64) + offsets
+
+class GraphProjection:
+    """Immutable CSR snapshot of the entity graph at one data version."""
+
+    __slots__ = (
+        "version", "element_ids", "index", "names", "label_names", "label_codes",
+        "type_names", "indptr", "indices", "edge_types", "outgoing",
+    )
+
+    def __init__(self, version, element_ids, names, label_names, label_codes, type_names, rows, columns, types, outgoing):
+        self.version = version
+        self.element_ids = element_ids
+        self.index = {element_id: i for i, element_id in enumerate(element_ids)}
+        self.names = names
+        self.label_names = label_names
+        self.label_codes = np.asarray(label_codes, dtype=np.int32)
+        self.type_names = type_names
+        # Sort the (row, column, type) entries by row into CSR arrays
+        order = np.argsort(rows, kind="stable")
+        self.indices = np.asarray(columns, dtype=np.int32)[order]
+        self.edge_types = np.asarray(types, dtype=np.int32)[order]
+        self.outgoing = np.asarray(outgoing, dtype=bool)[order]
+        self.indptr = np.zeros(len(element_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(element_ids)), out=self.indptr[1:])
+
+    @classmethod
+    def build(cls, nodes, relationships, version: int = 0):
+        """
+        Builds a projection from (elementId, label, name) node rows and
+        (source, target, type) relationship rows. Relationships with an endpoint
+        that is not among the nodes are skipped.
+        """
+        element_ids, names, label_codes = [], [], []
+        label_names, label_index = [], {}
+        index = {}
+        for element_id, label, name in nodes:
+            index[element_id] = len(element_ids)
+            element_ids.append(element_id)
+            names.append(name)
+            label_codes.append(_intern(label_names, label_index, label))
+
+        type_names, type_index = [], {}
+        sources, targets, types = [], [], []
+        for source, target, rel_type in relationships:
+            source, target = index.get(source), index.get(target)
+            if source is None or target is None:
+                continue
+            sources.append(source)
+            targets.append(target)
+            types.append(_intern(type_names, type_index, rel_type))
+
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        types = np.asarray(types, dtype=np.int32)
+        return cls(
+            version, element_ids, names, label_names, label_codes, type_names,
+            np.concatenate([sources, targets]), np.concatenate([targets, sources]), np.concatenate([types, types]),
+            np.arange(2 * len(sources)) < len(sources),
+        )
+
+    def __len__(self):
+        return len(self.element_ids)
+
+    @property
+    def edge_count(self) -> int:
+        """Number of relationships (each is stored twice)."""
+        return len(self.indices) // 2
+
+    def updated(self, nodes, adjacency, version: int):
+        """
+        Returns a new projection in which the nodes in `nodes` ((elementId, label,
+        name) rows) are added or replaced, along with their adjacency rows:
+        `adjacency` holds the (source, target, type, outgoing) rows of every
+        relationship of those nodes, with `source` the changed node and `outgoing`
+        true when the relationship starts there.
+        """
+        element_ids = list(self.element_ids)
+        names = list(self.names)
+        label_codes = self.label_codes.tolist()
+        label_names = list(self.label_names)
+        label_index = {label: code for code, label in enumerate(label_names)}
+        index = dict(self.index)
+        changed = []
+        for element_id, label, name in nodes:
+            i = index.get(element_id)
+            if i is None:
+                i = index[element_id] = len(element_ids)
+                element_ids.append(element_id)
+                names.append(name)
+                label_codes.append(_intern(label_names, label_index, label))
+            else:
+                names[i] = name
+                label_codes[i] = _intern(label_names, label_index, label)
+            changed.append(i)
+
+        # Keep the entries of unchanged rows; changed rows are replaced by `adjacency`
+        rows = np.repeat(np.arange(len(self.element_ids), dtype=np.int64), np.diff(self.indptr))
+        keep = ~np.isin(rows, np.asarray(changed, dtype=np.int64))
+        type_names = list(self.type_names)
+        type_index = {rel_type: code for code, rel_type in enumerate(type_names)}
+        new_rows, new_columns, new_types, new_outgoing = [], [], [], []
+        for source, target, rel_type, outgoing in adjacency:
+            source, target = index.get(source), index.get(target)
+            if source is None or target is None:
+                continue
+            new_rows.append(source)
+            new_columns.append(target)
+            new_types.append(_intern(type_names, type_index, rel_type))
+            new_outgoing.append(outgoing)
+
+        return GraphProjection(
+            version, element_ids, names, label_names, label_codes, type_names,
+            np.concatenate([rows[keep], np.asarray(new_rows, dtype=np.int64)]),
+            np.concatenate([self.indices[keep].astype(np.int64), np.asarray(new_columns, dtype=np.int64)]),
+            np.concatenate([self.edge_types[keep], np.asarray(new_types, dtype=np.int32)]),
+            np.concatenate([self.outgoing[keep], np.asarray(new_outgoing, dtype=bool)]),
+        )
+
+    def node_ids(self, element_ids) -> "np.ndarray":
+        """Integer ids of the given elementIds, skipping those not in the projection."""
+        ids = [self.index[element_id] for element_id in element_ids if element_id in self.index]
+        return np.unique(np.asarray(ids, dtype=np.int64))
+
+    def _codes(self, names: list, values):
+        """Codes of `values` in `names`, or None when `values` is None (no filter)."""
+        if values is None:
+            return None
+        wanted = set(values)
+        return np.asarray([code for code, name in enumerate(names) if name in wanted], dtype=np.int32)
+
+    def _label_mask(self, labels):
+        if labels is None:
+            return np.ones(len(self.element_ids), dtype=bool)
+        return np.isin(self.label_codes, self._codes(self.label_names, labels))
+
+    def _entries(self, nodes):
+        """The (row, column, type, outgoing) entries of the given nodes' adjacency rows."""
+        positions = _ranges(self.indptr[nodes], self.indptr[nodes + 1])
+        rows = np.repeat(nodes, np.diff(self.indptr)[nodes])
+        return rows, self.indices[positions].astype(np.int64), self.edge_types[positions], self.outgoing[positions]
+
+    def node(self, element_id) -> tuple:
+        """Returns (elementId, label, name) of a node in the projection."""
+        i = self.index[element_id]
+        return element_id, self.label_names[self.label_codes[i]], self.names[i]
+
+    def degree(self, element_ids) -> dict:
+        """Number of relationships of each of the given nodes that is in the projection."""
+        degrees = {}
+        for element_id in element_ids:
+            i = self.index.get(element_id)
+            if i is not None:
+                degrees[element_id] = int(self.indptr[i + 1] - self.indptr[i])
+        return degrees
+
+    def induced_subgraph(self, element_ids, labels=None, types=None, limit: int = None, directed: bool = False) -> list:
+        """
+        Returns the relationships between the given nodes as (n_id, n_label, n_name,
+        m_id, m_label, m_name, type) rows, once per direction like
+        `MATCH (n)-[r]-(m) WHERE n IN nodes AND m IN nodes`.
+
+        Args:
+            labels: Only keep nodes whose label is in this list; None keeps all.
+            types: Only keep relationships whose type is in this list; None keeps all.
+            limit (int): Maximum number of rows.
+            directed (bool): Return each relationship once, from its start node to its end node.
+        """
+        members = np.zeros(len(self.element_ids), dtype=bool)
+        members[self.node_ids(element_ids)] = True
+        members &= self._label_mask(labels)
+        rows, columns, edge_types, outgoing = self._entries(np.flatnonzero(members))
+        keep = members[columns]
+        if directed:
+            keep &= outgoing
+        if types is not None:
+            keep &= np.isin(edge_types, self._codes(self.type_names, types))
+        rows, columns, edge_types = rows[keep], columns[keep], edge_types[keep]
+        if limit is not None:
+            rows, columns, edge_types = rows[:limit], columns[:limit], edge_types[:limit]
+        return [self._row(n, m, t) for n, m, t in zip(rows.tolist(), columns.tolist(), edge_types.tolist())]
+
+    def k_hop(self, element_ids, k: int, labels=None, types=None) -> list:
+        """
+        Returns the elementIds of the nodes within `k` relationships of the given
+        ones (included), following only relationships of `types` through nodes of
+        `labels`, like `apoc.path.subgraphNodes` with a label and relationship filter.
+        """
+        allowed = self._label_mask(labels)
+        type_codes = self._codes(self.type_names, types)
+        frontier = self.node_ids(element_ids)
+        frontier = frontier[allowed[frontier]]
+        visited = np.zeros(len(self.element_ids), dtype=bool)
+        visited[frontier] = True
+        for _ in range(k):
+            if len(frontier) == 0:
+                break
+            _, columns, edge_types, _ = self._entries(frontier)
+            keep = allowed[columns] & ~visited[columns]
+            if type_codes is not None:
+                keep &= np.isin(edge_types, type_codes)
+            frontier = np.unique(columns[keep])
+            visited[frontier] = True
+        return [self.element_ids[i] for i in np.flatnonzero(visited).tolist()]
+
+    def _row(self, n: int, m: int, rel_type: int) -> tuple:
+        return (
+            self.element_ids[n], self.label_names[self.label_codes[n]], self.names[n],
+            self.element_ids[m], self.label_names[self.label_codes[m]], self.names[m],
+            self.type_names[rel_type],
+        )
+
+class ProjectionLoader:
+    """
+    Builds the GraphProjection and keeps it at the current data version.
+
+    The loader is synchronous, like GraphDB; the API calls it through `get`, which
+    only leaves the event loop when a refresh is needed.
+
+    Args:
+        db: A GraphDB (src/graph_db.py).
+        enabled (bool): False, or numpy missing, makes every call return None.
+    """
+
+    def __init__(self, db, enabled: bool = GRAPH_PROJECTION_ENABLED):
+        self.db = db
+        self.enabled = enabled and np is not None
+        self.projection = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Builds the projection from scratch. Returns it, or None when disabled."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self.projection = self._build()
+        return self.projection
+
+    def current(self, data_version: int = None):
+        """
+        Returns a projection at least as recent as `data_version` (read from the
+        GraphMeta node when None), refreshing it first if needed. Returns None when
+        the projection is disabled or cannot be loaded.
+        """
+        if not self.enabled:
+            return None
+        projection = self.projection
+        if data_version is None:
+            data_version = self._data_version()
+        if projection is not None and projection.version >= data_version:
+            return projection
+        with self._lock:
+            projection = self.projection
+            if projection is None or projection.version < data_version:
+                try:
+                    projection = self._build() if projection is None else self._refresh(projection)
+                except Exception as e:
+                    print(f"Graph projection refresh failed: {e}")
+                    return None
+                self.projection = projection
+        return projection
+
+    async def get(self, data_version: int):
+        """Async `current` for the API; the refresh runs in a worker thread."""
+        projection = self.projection
+        if projection is not None and projection.version >= data_version:
+            return projection
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self.current, data_version)
+
+    def _data_version(self) -> int:
+        rows = self.db.query(VERSIONS_QUERY, {"meta_id": META_ID}, name="graph_versions")
+        return (rows[0]["data_version"] if rows else None) or 0
+
+    def _build(self) -> GraphProjection:
+        # Read the version first: writes landing during the build are refetched by the next refresh
+        version = self._data_version()
+        params = {"excluded": EXCLUDED_LABELS}
+        nodes = self.db.stream(NODES_QUERY, params, mapper=row_tuple, name="projection_nodes")
+        relationships = self.db.stream(RELATIONSHIPS_QUERY, params, mapper=row_tuple, name="projection_relationships")
+        projection = GraphProjection.build(list(nodes), relationships, version)
+        print(f"Built graph projection at data version {version}: {len(projection)} nodes, {projection.edge_count} relationships")
+        return projection
+
+    def _refresh(self, projection: GraphProjection) -> GraphProjection:
+        version = self._data_version()
+        changes = self.db.query(CHANGES_QUERY, {"since": projection.version}, name="projection_changes")
+        versions = [change["version"] for change in changes]
+        latest = versions[-1] if versions else projection.version
+        if versions != list(range(projection.version + 1, latest + 1)) or latest < version:
+            # The change log no longer reaches back to this projection
+            print(f"Graph change log does not cover versions {projection.version}..{version}; rebuilding the projection")
+            return self._build()
+        if any(change["rebuild"] for change in changes):
+            print(f"Graph change log has deleted nodes since version {projection.version}; rebuilding the projection")
+            return self._build()
+        ids = sorted({element_id for change in changes for element_id in change["nodes"] or []})
+        params = {"ids": ids, "excluded": EXCLUDED_LABELS}
+        nodes = [row_tuple(record) for record in self.db.query(CHANGED_NODES_QUERY, params, name="projection_changed_nodes")]
+        adjacency = [row_tuple(record) for record in self.db.query(CHANGED_ADJACENCY_QUERY, params, name="projection_changed_adjacency")]
+        return projection.updated(nodes, adjacency, latest)
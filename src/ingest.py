@@ -1,27 +1,39 @@
 import os
+import re
+import sys
 import glob
 import asyncio
-from langchain_experimental.graph_transformers import LLMGraphTransformer
+import threading
+import argparse
 from langchain_core.documents import Document
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.graphs import Neo4jGraph
-from src.config import GOOGLE_API_KEY, NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
-
-# Initialize Neo4jGraph
-# Note: Neo4jGraph expects url, username, password.
-graph = Neo4jGraph(
-    url=NEO4J_URI,
-    username=NEO4J_USERNAME,
-    password=NEO4J_PASSWORD,
-    refresh_schema=False
-)
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from src.config import INGEST_CONCURRENCY, EXTRACTION_CACHE_ENABLED, EXTRACTION_MODE, NEO4J_WRITE_BATCH_SIZE, INGEST_MANIFEST_PATH
+from src.config import PIPELINE_QUEUE_SIZE, PIPELINE_WRITE_WORKERS
+from src.config import ENTITY_CANONICALIZATION, ENTITY_INDEX_PATH, EXTRACTION_CHUNK_SIZE, METADATA_RULES_ENABLED, METADATA_RULES_MIN_CONFIDENCE
+from src.extraction_cache import ExtractionCache
+from src.batch_writer import Neo4jBatchWriter
+from src.manifest import IngestionManifest
+from src.entity_index import EntityIndex
+from src.llm_scheduler import get_scheduler, estimate_tokens, INGEST
+from src.metadata_rules import METADATA_FIELDS, RULES_VERSION, extract_header_metadata, missing_fields, merge_metadata, metadata_stats
+from src.clients import LazyClient, create_neo4j_graph, create_chat_model
+from src.graph_db import create_driver
+
+# Neo4j and Gemini clients are created on first use, not on import
+graph = LazyClient("neo4j_graph", create_neo4j_graph)
+# The batch writer runs its own managed transactions on a plain driver
+neo4j_driver = LazyClient("neo4j_driver", create_driver)
 
 # Initialize LLM
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0,
-    google_api_key=GOOGLE_API_KEY
-)
+LLM_MODEL = "gemini-2.5-flash"
+
+# Bump whenever a prompt, output model or post-processing step changes what
+# extract_info produces, so that stale extraction cache entries are not reused.
+PROMPT_VERSION = "2"
+
+EXTRACTION_MODES = ["chained", "fused"]
+
+llm = LazyClient("ingest_llm", lambda: create_chat_model(LLM_MODEL))
 
 # Define Allowed Nodes and Relationships
 allowed_nodes = [
@@ -41,11 +53,15 @@ allowed_relationships = [
     "AFFECTS",
 ]
 
-graph_transformer = LLMGraphTransformer(
-    llm=llm, 
-    allowed_nodes=allowed_nodes,
-    allowed_relationships=allowed_relationships
-)
+def _create_graph_transformer():
+    from langchain_experimental.graph_transformers import LLMGraphTransformer
+    return LLMGraphTransformer(
+        llm=llm.get(),
+        allowed_nodes=allowed_nodes,
+        allowed_relationships=allowed_relationships
+    )
+
+graph_transformer = LazyClient("graph_transformer", _create_graph_transformer)
 
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
@@ -79,7 +95,7 @@ metadata_prompt = PromptTemplate(
     input_variables=["text"],
     partial_variables={"format_instructions": metadata_parser.get_format_instructions()}
 )
-metadata_chain = metadata_prompt | llm | metadata_parser
+metadata_chain = LazyClient("metadata_chain", lambda: metadata_prompt | llm.get() | metadata_parser)
 
 # --- Sentiment Analysis Setup ---
 
@@ -106,7 +122,54 @@ sentiment_prompt = PromptTemplate(
     partial_variables={"format_instructions": sentiment_parser.get_format_instructions()}
 )
 
-sentiment_chain = sentiment_prompt | llm | sentiment_parser
+sentiment_chain = LazyClient("sentiment_chain", lambda: sentiment_prompt | llm.get() | sentiment_parser)
+
+# Entity types that receive a sentiment score
+SENTIMENT_NODE_TYPES = ["Company", "Product", "Sector"]
+
+# --- Fused Extraction Setup ---
+# A single structured-output call that returns metadata, graph and sentiment at once.
+
+class ExtractedNode(BaseModel):
+    id: str = Field(description="The name of the entity as written in the text (e.g., Nvidia, Jensen Huang).")
+    type: str = Field(description=f"The entity type. One of: {', '.join(allowed_nodes)}.")
+
+class ExtractedRelationship(BaseModel):
+    source_id: str = Field(description="The id of the source entity.")
+    source_type: str = Field(description=f"The type of the source entity. One of: {', '.join(allowed_nodes)}.")
+    target_id: str = Field(description="The id of the target entity.")
+    target_type: str = Field(description=f"The type of the target entity. One of: {', '.join(allowed_nodes)}.")
+    type: str = Field(description=f"The relationship type. One of: {', '.join(allowed_relationships)}.")
+
+class FusedExtraction(ArticleMetadata):
+    nodes: list[ExtractedNode] = Field(description="Entities mentioned in the article.")
+    relationships: list[ExtractedRelationship] = Field(description="Relationships between the extracted entities.")
+    sentiments: list[EntitySentiment] = Field(
+        description=f"Sentiment of the article towards every extracted entity of type {', '.join(SENTIMENT_NODE_TYPES)}."
+    )
+
+fused_prompt = PromptTemplate(
+    template="""
+    You are building a financial news knowledge graph. From the news article below, extract in one pass:
+    1. The article metadata (title, source/publisher, url, publication date in ISO format YYYY-MM-DD, status).
+    2. The entities it mentions, using only these types: {allowed_nodes}.
+       Use the most complete, consistent name for each entity and reuse exactly that id in relationships.
+    3. The relationships between those entities, using only these types: {allowed_relationships}.
+    4. For every entity of type {sentiment_types}, whether the article is Positive, Negative, or Neutral towards it.
+       Use the entity id as entity_name.
+    
+    Article Content:
+    {text}
+    """,
+    input_variables=["text"],
+    partial_variables={
+        "allowed_nodes": ", ".join(allowed_nodes),
+        "allowed_relationships": ", ".join(allowed_relationships),
+        "sentiment_types": ", ".join(SENTIMENT_NODE_TYPES),
+    }
+)
+
+fused_chain = LazyClient("fused_chain", lambda: fused_prompt | llm.get().with_structured_output(FusedExtraction))
 
 # --- Publisher Tier Logic ---
 
@@ -136,8 +199,269 @@ def get_publisher_tier(publisher: str) -> str:
             
     return "C"
 
-async def extract_info(text: str, source: str = "Manual Input"):
+# --- Extraction Cache ---
+
+extraction_cache = ExtractionCache()
+
+def _node_to_dict(node: Node) -> dict:
+    return {"id": node.id, "type": node.type, "properties": node.properties}
+
+def _results_to_cache(results: dict) -> dict:
+    """Converts extraction results into a JSON-serializable cache payload (the article text is not stored)."""
+    return {
+        "metadata": results["metadata"],
+        "graph_documents": [
+            {
+                "nodes": [_node_to_dict(node) for node in graph_doc.nodes],
+                "relationships": [
+                    {
+                        "source": _node_to_dict(rel.source),
+                        "target": _node_to_dict(rel.target),
+                        "type": rel.type,
+                        "properties": rel.properties,
+                    }
+                    for rel in graph_doc.relationships
+                ],
+                "document_metadata": graph_doc.source.metadata,
+            }
+            for graph_doc in results["graph_documents"]
+        ],
+        "sentiment": [s.dict() for s in results["sentiment"]],
+    }
+
+def _results_from_cache(payload: dict, text: str, source: str) -> dict:
+    """Rebuilds extraction results from a cache payload for an article ingested as `source`."""
+    graph_documents = []
+    for graph_doc in payload["graph_documents"]:
+        document_metadata = dict(graph_doc["document_metadata"], source=source)
+        graph_documents.append(GraphDocument(
+            nodes=[Node(**node) for node in graph_doc["nodes"]],
+            relationships=[
+                Relationship(
+                    source=Node(**rel["source"]),
+                    target=Node(**rel["target"]),
+                    type=rel["type"],
+                    properties=rel["properties"],
+                )
+                for rel in graph_doc["relationships"]
+            ],
+            source=Document(page_content=text, metadata=document_metadata),
+        ))
+    return {
+        "metadata": payload["metadata"],
+        "graph_documents": graph_documents,
+        "sentiment": [EntitySentiment(**s) for s in payload["sentiment"]],
+        "source": source,
+        "text_snippet": text[:3000],
+        "cached": True,
+    }
+
+async def extract_info(text: str, source: str = "Manual Input", use_cache: bool = EXTRACTION_CACHE_ENABLED, mode: str = EXTRACTION_MODE,
+                       chunk_size: int = EXTRACTION_CHUNK_SIZE):
+    """
+    Extracts metadata, graph documents and entity sentiment from an article.
+
+    Args:
+        text (str): The article text.
+        source (str): Identifier of the article, stored as the Document source.
+        use_cache (bool): Whether to reuse and store results in the extraction cache.
+        mode (str): "chained" (three LLM steps) or "fused" (one structured-output call).
+        chunk_size (int): Articles longer than this many characters are extracted in
+            paragraph-aligned chunks in parallel (0 disables chunking).
+
+    Returns:
+        dict: metadata, graph_documents, sentiment, source and text_snippet, plus
+        metadata_error/sentiment_error when a step failed.
+    """
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode {mode!r}. Options: {', '.join(EXTRACTION_MODES)}")
+
+    cache_key = None
+    if use_cache:
+        cache_key = ExtractionCache.make_key(text, LLM_MODEL, allowed_nodes, allowed_relationships, _cache_version(mode, chunk_size))
+        payload = extraction_cache.get(cache_key)
+        if payload is not None:
+            print(f"Using cached extraction for {source}")
+            return _results_from_cache(payload, text, source)
+
+    results = await _extract_with_llm(text, source, mode, chunk_size)
+
+    # Only cache complete extractions so that failed steps are retried next time
+    if cache_key and "metadata_error" not in results and "sentiment_error" not in results:
+        try:
+            extraction_cache.put(cache_key, _results_to_cache(results))
+        except OSError as e:
+            print(f"Could not cache extraction for {source}: {e}")
+    return results
+
+def _cache_version(mode: str, chunk_size: int) -> str:
+    """Version part of the extraction cache key: every setting besides the model and schema that changes the results."""
+    # Confident rule values replace the LLM's metadata, so the rules and their threshold matter too
+    rules = f"rules-{RULES_VERSION}@{METADATA_RULES_MIN_CONFIDENCE}" if METADATA_RULES_ENABLED else "no-rules"
+    return f"{PROMPT_VERSION}/{mode}/{chunk_size}/{rules}"
+
+async def _call_llm(call, *texts, output_tokens: int = 1024):
+    """Runs an LLM call through the shared scheduler's ingestion budget."""
+    return await get_scheduler().run(call, traffic=INGEST, tokens=estimate_tokens(*texts, output_tokens=output_tokens))
+
+def _document_metadata(metadata: ArticleMetadata, source: str) -> dict:
+    """Returns the Document properties for an article, with placeholders if metadata is missing."""
+    if metadata is None:
+        return {"source": source, "title": "Unknown", "date": "", "publisher": "Unknown", "publisher_tier": "C", "url": "Unknown", "news_status": "Unknown"}
+    return {
+        "source": source,
+        "title": metadata.title,
+        "date": metadata.date,
+        "publisher": metadata.source,
+        "publisher_tier": get_publisher_tier(metadata.source),
+        "url": metadata.url,
+        "news_status": metadata.status,
+    }
+
+def _record_metadata(results: dict, metadata: ArticleMetadata, doc_metadata: dict):
+    print(f"Extracted Metadata: {doc_metadata['title']} | {doc_metadata['publisher']} ({doc_metadata['publisher_tier']}) | {doc_metadata['date']} | {doc_metadata['url']} | {doc_metadata['news_status']}")
+    results["metadata"] = metadata.dict(include=set(ArticleMetadata.model_fields))
+    results["metadata"]["publisher_tier"] = doc_metadata["publisher_tier"]
+
+def _inject_relationship_metadata(graph_documents, doc_metadata: dict):
+    for graph_doc in graph_documents:
+        for relationship in graph_doc.relationships:
+            relationship.properties["title"] = doc_metadata["title"]
+            relationship.properties["date"] = doc_metadata["date"]
+            relationship.properties["publisher_tier"] = doc_metadata["publisher_tier"]
+            relationship.properties["news_status"] = doc_metadata["news_status"]
+
+def _sentiment_entities(graph_documents) -> list:
+    entities = []
+    for doc_graph in graph_documents:
+        for node in doc_graph.nodes:
+            if node.type in SENTIMENT_NODE_TYPES:
+                entities.append(node.id)
+    # Remove duplicates
+    return list(set(entities))
+
+# --- Chunking ---
+
+def split_into_chunks(text: str, max_chars: int = EXTRACTION_CHUNK_SIZE) -> list:
+    """
+    Splits text into chunks of at most `max_chars` characters on paragraph boundaries.
+    Paragraphs longer than `max_chars` are split on sentence boundaries, then hard-split.
+    A `max_chars` of 0 (or a short text) returns the text as a single chunk.
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [text]
+
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            pieces.extend(sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars))
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 2 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _merge_graph_documents(graph_documents, doc: Document) -> GraphDocument:
+    """Merges per-chunk graph documents into one, de-duplicating nodes and relationships."""
+    nodes = {}
+    relationships = {}
+    for graph_doc in graph_documents:
+        for node in graph_doc.nodes:
+            nodes.setdefault((node.id, node.type), node)
+        for rel in graph_doc.relationships:
+            key = (rel.source.id, rel.source.type, rel.type, rel.target.id, rel.target.type)
+            relationships.setdefault(key, rel)
+    return GraphDocument(nodes=list(nodes.values()), relationships=list(relationships.values()), source=doc)
+
+def _merge_sentiments(sentiment_lists) -> list:
+    """
+    Combines per-chunk sentiments into one per entity by majority vote. Ties are
+    broken by the balance of Positive and Negative votes (Neutral if they cancel out).
+    """
+    votes = {}
+    for sentiments in sentiment_lists:
+        for entity_sentiment in sentiments:
+            if entity_sentiment.sentiment:
+                votes.setdefault(entity_sentiment.entity_name, []).append(entity_sentiment.sentiment)
+
+    merged = []
+    for entity, entity_votes in votes.items():
+        counts = {label: entity_votes.count(label) for label in ("Positive", "Negative", "Neutral")}
+        best = max(counts.values())
+        leaders = [label for label, count in counts.items() if count == best]
+        if len(leaders) == 1:
+            sentiment = leaders[0]
+        else:
+            balance = counts["Positive"] - counts["Negative"]
+            sentiment = "Positive" if balance > 0 else "Negative" if balance < 0 else "Neutral"
+        merged.append(EntitySentiment(entity_name=entity, sentiment=sentiment))
+    return merged
+
+async def _extract_with_llm(text: str, source: str, mode: str = "chained", chunk_size: int = EXTRACTION_CHUNK_SIZE):
+    chunks = split_into_chunks(text, chunk_size)
+    if len(chunks) > 1:
+        print(f"Splitting {source} into {len(chunks)} chunks")
+    if mode == "fused":
+        return await _extract_fused(text, source, chunks)
+    return await _extract_chained(text, source, chunks)
+
+def _header_metadata(text: str):
+    """Rule-based metadata values and confidences, or nothing when the rules are disabled."""
+    if not METADATA_RULES_ENABLED:
+        return {}, {}
+    return extract_header_metadata(text)
+
+async def _extract_metadata(text: str, source: str):
+    """
+    Returns (metadata, error message). Fields read from the article header with
+    enough confidence are taken as-is; metadata_chain is only called when some
+    field is still missing. Metadata is None if nothing could be extracted.
+    """
+    rule_values, confidence = _header_metadata(text)
+    missing = missing_fields(confidence)
+    metadata_stats.record(llm_called=bool(missing), fields_from_rules=len(METADATA_FIELDS) - len(missing))
+    if not missing:
+        print(f"Metadata for {source} read from the article header")
+        return ArticleMetadata(**merge_metadata(rule_values, confidence)), None
+
+    try:
+        llm_metadata = await _call_llm(lambda: metadata_chain.ainvoke({"text": text}), text)
+        return ArticleMetadata(**merge_metadata(rule_values, confidence, llm_metadata.dict())), None
+    except Exception as e:
+        print(f"Metadata extraction failed for {source}: {e}")
+        if not rule_values:
+            return None, str(e)
+        # Keep what the rules found; the error still keeps the result out of the cache
+        return ArticleMetadata(**merge_metadata(rule_values, confidence)), str(e)
+
+async def _extract_chunk_graph(chunk: str):
+    return await _call_llm(lambda: graph_transformer.aconvert_to_graph_documents([Document(page_content=chunk)]), chunk)
+
+async def _extract_sentiment(text: str, entities: list):
+    result = await _call_llm(lambda: sentiment_chain.ainvoke({"text": text, "entities": entities}), text, entities)
+    return result.sentiments
+
+async def _extract_chained(text: str, source: str, chunks: list = None):
+    """
+    Extracts metadata, graph and sentiment with three LLM steps. Metadata and graph
+    extraction run concurrently; for long articles the graph and sentiment steps
+    run once per chunk, in parallel, and are merged into one GraphDocument.
+    """
     print(f"Extracting info from {source}...")
+    chunks = chunks or [text]
     results = {
         "metadata": {},
         "graph_documents": [],
@@ -147,62 +471,41 @@ async def extract_info(text: str, source: str = "Manual Input"):
     }
     
     try:
-        # Extract Metadata using LLM
-        try:
-            metadata = metadata_chain.invoke({"text": text})
-            title = metadata.title
-            source_pub = metadata.source
-            url = metadata.url
-            date_str = metadata.date
-            news_status = metadata.status
-            
-            # Determine Publisher Tier
-            publisher_tier = get_publisher_tier(source_pub)
-            
-            print(f"Extracted Metadata: {title} | {source_pub} ({publisher_tier}) | {date_str} | {url} | {news_status}")
-            results["metadata"] = metadata.dict()
-            results["metadata"]["publisher_tier"] = publisher_tier
-            
-        except Exception as e:
-            print(f"Metadata extraction failed for {source}: {e}")
-            title = "Unknown"
-            source_pub = "Unknown"
-            publisher_tier = "C"
-            url = "Unknown"
-            date_str = ""
-            news_status = "Unknown"
-            results["metadata_error"] = str(e)
-
-        doc = Document(page_content=text, metadata={"source": source, "title": title, "date": date_str, "publisher": source_pub, "publisher_tier": publisher_tier, "url": url, "news_status": news_status})
-        
-        # Extract Graph Data
-        graph_documents = await graph_transformer.aconvert_to_graph_documents([doc])
+        # Extract Metadata and Graph Data
+        (metadata, metadata_error), chunk_graphs = await asyncio.gather(
+            _extract_metadata(text, source),
+            asyncio.gather(*[_extract_chunk_graph(chunk) for chunk in chunks]),
+        )
+        doc_metadata = _document_metadata(metadata, source)
+        if metadata is not None:
+            _record_metadata(results, metadata, doc_metadata)
+        if metadata_error:
+            results["metadata_error"] = metadata_error
+
+        doc = Document(page_content=text, metadata=doc_metadata)
+        graph_documents = [_merge_graph_documents([g for graphs in chunk_graphs for g in graphs], doc)]
         results["graph_documents"] = graph_documents
         
         # Inject Metadata into Relationships
-        for graph_doc in graph_documents:
-            for relationship in graph_doc.relationships:
-                relationship.properties["title"] = title
-                relationship.properties["date"] = date_str
-                relationship.properties["publisher_tier"] = publisher_tier
-                relationship.properties["news_status"] = news_status
+        _inject_relationship_metadata(graph_documents, doc_metadata)
         
         # --- Sentiment Analysis ---
         # Identify relevant entities for sentiment analysis
-        relevant_entities = []
-        for doc_graph in graph_documents:
-            for node in doc_graph.nodes:
-                if node.type in ["Company", "Product", "Sector"]:
-                    relevant_entities.append(node.id)
-        
-        # Remove duplicates
-        relevant_entities = list(set(relevant_entities))
+        relevant_entities = _sentiment_entities(graph_documents)
         
         if relevant_entities:
             print(f"Analyzing sentiment for: {relevant_entities}")
             try:
-                sentiment_result = sentiment_chain.invoke({"text": text[:3000], "entities": relevant_entities})
-                results["sentiment"] = sentiment_result.sentiments
+                if len(chunks) == 1:
+                    results["sentiment"] = await _extract_sentiment(chunks[0], relevant_entities)
+                else:
+                    # Each chunk is scored for the entities extracted from it
+                    chunk_entities = [_sentiment_entities(graphs) for graphs in chunk_graphs]
+                    chunk_sentiments = await asyncio.gather(*[
+                        _extract_sentiment(chunk, entities)
+                        for chunk, entities in zip(chunks, chunk_entities) if entities
+                    ])
+                    results["sentiment"] = _merge_sentiments(chunk_sentiments)
             except Exception as e:
                 print(f"Sentiment analysis failed for {source}: {e}")
                 results["sentiment_error"] = str(e)
@@ -213,67 +516,223 @@ async def extract_info(text: str, source: str = "Manual Input"):
         print(f"Error extracting info from {source}: {e}")
         raise e
 
+def _fused_to_graph_document(extraction: FusedExtraction, doc: Document) -> GraphDocument:
+    """Builds a GraphDocument from a fused extraction, normalized the way LLMGraphTransformer does."""
+    nodes = {}
+
+    def add_node(node_id: str, node_type: str):
+        node_type = node_type.strip().capitalize() if node_type else ""
+        if not node_id or node_type not in allowed_nodes:
+            return None
+        key = (node_id, node_type)
+        if key not in nodes:
+            nodes[key] = Node(id=node_id, type=node_type)
+        return nodes[key]
+
+    for node in extraction.nodes:
+        add_node(node.id, node.type)
+
+    relationships = []
+    for rel in extraction.relationships:
+        rel_type = rel.type.strip().replace(" ", "_").upper()
+        if rel_type not in allowed_relationships:
+            continue
+        source_node = add_node(rel.source_id, rel.source_type)
+        target_node = add_node(rel.target_id, rel.target_type)
+        if source_node is None or target_node is None:
+            continue
+        relationships.append(Relationship(source=source_node, target=target_node, type=rel_type))
+
+    return GraphDocument(nodes=list(nodes.values()), relationships=relationships, source=doc)
+
+async def _extract_fused(text: str, source: str, chunks: list = None):
+    """
+    Extracts metadata, graph and sentiment with a single structured-output LLM call
+    (one per chunk for long articles; metadata then comes from the first chunk).
+    """
+    print(f"Extracting info from {source} (fused)...")
+    chunks = chunks or [text]
+    results = {
+        "metadata": {},
+        "graph_documents": [],
+        "sentiment": [],
+        "source": source,
+        "text_snippet": text[:3000]
+    }
+
+    try:
+        extractions = await asyncio.gather(*[
+            _call_llm(lambda chunk=chunk: fused_chain.ainvoke({"text": chunk}), chunk, output_tokens=4096)
+            for chunk in chunks
+        ])
+        # Confident header fields override what the model read
+        rule_values, confidence = _header_metadata(text)
+        metadata = ArticleMetadata(**merge_metadata(rule_values, confidence, extractions[0].dict(include=set(METADATA_FIELDS))))
+        doc_metadata = _document_metadata(metadata, source)
+        _record_metadata(results, metadata, doc_metadata)
+
+        doc = Document(page_content=text, metadata=doc_metadata)
+        graph_documents = [_merge_graph_documents([_fused_to_graph_document(e, doc) for e in extractions], doc)]
+        results["graph_documents"] = graph_documents
+        _inject_relationship_metadata(graph_documents, doc_metadata)
+
+        # Keep only sentiments for entities that made it into the graph, as the chained path does
+        relevant_entities = set(_sentiment_entities(graph_documents))
+        sentiments = extractions[0].sentiments if len(extractions) == 1 else _merge_sentiments([e.sentiments for e in extractions])
+        results["sentiment"] = [s for s in sentiments if s.entity_name in relevant_entities]
+        return results
+
+    except Exception as e:
+        print(f"Error extracting info from {source}: {e}")
+        raise e
+
+# Neo4j writes are blocking driver calls. They run in a worker thread so that
+# extraction for other files keeps going, and one at a time so that concurrent
+# MERGEs on shared entities (e.g. the same Company in two articles) cannot deadlock.
+# A threading.Lock, because Streamlit and ingest.main write from several event loops.
+_write_lock = threading.Lock()
+
+def _locked_write(writer: Neo4jBatchWriter, batch: list) -> list:
+    with _write_lock:
+        return writer.write(batch)
+
+async def _write_batch(writer: Neo4jBatchWriter, batch: list) -> list:
+    return await asyncio.to_thread(_locked_write, writer, batch)
+
+# --- Entity Canonicalization ---
+
+_entity_index = None
+
+def get_entity_index():
+    """
+    Returns the shared EntityIndex, loading it from ENTITY_INDEX_PATH and the graph
+    on first use, or None when canonicalization is disabled.
+    """
+    global _entity_index
+    if not ENTITY_CANONICALIZATION:
+        return None
+    if _entity_index is None:
+        index = EntityIndex.load(ENTITY_INDEX_PATH)
+        index.load_from_graph(graph.query)
+        print(f"Loaded entity index with {len(index)} entities")
+        _entity_index = index
+    return _entity_index
+
+def save_entity_index():
+    if _entity_index is not None:
+        _entity_index.save(ENTITY_INDEX_PATH)
+
 async def save_to_neo4j(data: dict):
     source = data.get("source", "Manual Input")
     print(f"Saving data for {source} to Neo4j...")
     
     try:
-        # Add to Neo4j
-        if data.get("graph_documents"):
-            graph.add_graph_documents(data["graph_documents"], include_source=True)
-            print(f"Successfully added graph documents for {source}")
-        
-        # Update Sentiment
-        if data.get("sentiment"):
-            for entity_sentiment in data["sentiment"]:
-                query = """
-                MATCH (d:Document {source: $source})-[r:MENTIONS]->(n)
-                WHERE n.id = $entity_id
-                SET r.sentiment = $sentiment
-                """
-                
-                graph.query(query, params={
-                    "source": source,
-                    "entity_id": entity_sentiment.entity_name,
-                    "sentiment": entity_sentiment.sentiment
-                })
-                print(f"Updated sentiment for {entity_sentiment.entity_name}: {entity_sentiment.sentiment}")
+        entity_index = await asyncio.to_thread(get_entity_index)
+        await _write_batch(Neo4jBatchWriter(neo4j_driver, entity_index=entity_index), [data])
+        await asyncio.to_thread(save_entity_index)
+        print(f"Successfully added graph documents for {source}")
                 
     except Exception as e:
         print(f"Error saving to Neo4j for {source}: {e}")
         raise e
 
-async def process_text(text: str, source: str = "Manual Input"):
-    data = await extract_info(text, source)
+async def process_text(text: str, source: str = "Manual Input", mode: str = EXTRACTION_MODE):
+    data = await extract_info(text, source, mode=mode)
     await save_to_neo4j(data)
     return data
 
-async def process_file(filepath):
+async def extract_file(filepath, mode: str = EXTRACTION_MODE):
+    """Reads and extracts one article file. Returns the extraction results, or None on failure."""
     print(f"Processing {filepath}...")
     try:
         with open(filepath, "r", encoding="utf-8") as file:
             text = file.read()
         
-        await process_text(text, source=filepath)
+        return await extract_info(text, source=filepath, mode=mode)
         
     except Exception as e:
         print(f"Error processing {filepath}: {e}")
+        return None
 
-async def main():
-    files = glob.glob(r"data\batch3\*.txt")
-    
-    print(f"Found {len(files)} files.")
-    
-    # Process files
-    for file in files:
-        # print(f"Processing {file}...")
-        await process_file(file)
+async def process_file(filepath, mode: str = EXTRACTION_MODE):
+    data = await extract_file(filepath, mode=mode)
+    if data is None:
+        return False
+    try:
+        await save_to_neo4j(data)
+        return True
+    except Exception:
+        return False
+
+def collect_files(patterns):
+    """Expands directories and glob patterns into a sorted, de-duplicated list of .txt files."""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.txt")
+        files.update(f for f in glob.glob(pattern) if os.path.isfile(f))
+    return sorted(files)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest news articles into the Neo4j knowledge graph.")
+    parser.add_argument(
+        "paths", nargs="*", default=[os.path.join("data", "batch3", "*.txt")],
+        help="Directories or glob patterns of .txt articles, .jsonl files, or - for JSONL on stdin (default: data/batch3/*.txt)."
+    )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=INGEST_CONCURRENCY,
+        help=f"Number of extraction workers, i.e. articles extracted concurrently (default: {INGEST_CONCURRENCY})."
+    )
+    parser.add_argument(
+        "--write-workers", type=int, default=PIPELINE_WRITE_WORKERS,
+        help=f"Number of workers collecting Neo4j write batches; their transactions are committed one at a time (default: {PIPELINE_WRITE_WORKERS})."
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=PIPELINE_QUEUE_SIZE,
+        help=f"Capacity of the queues between pipeline stages (default: {PIPELINE_QUEUE_SIZE})."
+    )
+    parser.add_argument(
+        "--mode", choices=EXTRACTION_MODES, default=EXTRACTION_MODE,
+        help=f"Extraction mode: three chained LLM calls or one fused call (default: {EXTRACTION_MODE})."
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=NEO4J_WRITE_BATCH_SIZE,
+        help=f"Maximum number of articles written per Neo4j transaction (default: {NEO4J_WRITE_BATCH_SIZE})."
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Re-ingest the matched files even if the manifest says they are unchanged."
+    )
+    parser.add_argument(
+        "--no-manifest", action="store_true",
+        help=f"Ignore the ingestion manifest ({INGEST_MANIFEST_PATH}) and process every matched file."
+    )
+    return parser.parse_args(argv)
+
+async def main(argv=None):
+    # Imported here because the pipeline itself builds on this module
+    from src.pipeline import IngestionPipeline, iter_articles
+
+    args = parse_args(argv)
+    manifest = None if args.no_manifest else IngestionManifest()
+    try:
+        pipeline = IngestionPipeline(
+            extract_workers=args.concurrency, write_workers=args.write_workers, batch_size=args.batch_size,
+            queue_size=args.queue_size, mode=args.mode, manifest=manifest, force=args.force
+        )
+        stats = await pipeline.run(iter_articles(args.paths))
+    finally:
+        if manifest:
+            manifest.close()
         
     # Post-processing: Label Document nodes as Article for consistency with App
     print("Running post-processing...")
     # graph.query("MATCH (d:Document) SET d:Article")
     
+    print(f"Metadata: {metadata_stats.format()}")
     print("Ingestion complete.")
+    failed = sum(stage["failed"] for stage in stats["stages"].values())
+    return 1 if failed else 0
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,270 @@
+"""
+Shared scheduler for every Gemini call.
+
+Each traffic class ("ingest" for batch extraction, "interactive" for the API's
+agent endpoints) has its own requests-per-minute and tokens-per-minute budgets
+and its own adaptive concurrency limit, so a large ingestion job cannot starve
+the UI. Transient failures (rate limits, overload, timeouts) are retried with
+exponential backoff and full jitter; rate-limit errors also halve the class's
+concurrency limit, which then grows back by one slot per window of successes.
+
+Usage:
+    result = await get_scheduler().run(lambda: chain.ainvoke(inputs), traffic="ingest", tokens=estimate_tokens(text))
+"""
+import re
+import time
+import random
+import asyncio
+from collections import deque
+from src.config import (
+    LLM_INGEST_RPM, LLM_INGEST_TPM, LLM_INGEST_MAX_CONCURRENCY,
+    LLM_INTERACTIVE_RPM, LLM_INTERACTIVE_TPM, LLM_INTERACTIVE_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX,
+)
+
+INGEST = "ingest"
+INTERACTIVE = "interactive"
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:
+    google_exceptions = None
+
+# HTTP status codes of retryable failures, as carried by provider errors (`.code` / `.status_code`)
+_THROTTLE_CODES = {429}
+_TRANSIENT_CODES = _THROTTLE_CODES | {408, 500, 502, 503, 504}
+
+if google_exceptions is not None:
+    _THROTTLE_TYPES = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+    _TRANSIENT_TYPES = _THROTTLE_TYPES + (
+        google_exceptions.ServiceUnavailable, google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError, google_exceptions.BadGateway, google_exceptions.GatewayTimeout,
+    )
+else:
+    _THROTTLE_TYPES = ()
+    _TRANSIENT_TYPES = ()
+_TRANSIENT_TYPES += (asyncio.TimeoutError, TimeoutError, ConnectionError)
+
+# Fallback for errors that only describe the failure in their message: a leading
+# HTTP status ("429 Resource has been exhausted") or an upper-case gRPC status name
+_THROTTLE_MESSAGE = re.compile(r"^\s*429\b|\bRESOURCE_EXHAUSTED\b")
+_TRANSIENT_MESSAGE = re.compile(r"^\s*(?:429|408|50[0234])\b|\b(?:RESOURCE_EXHAUSTED|UNAVAILABLE|DEADLINE_EXCEEDED|INTERNAL)\b")
+
+def _causes(exc: BaseException):
+    """Yields `exc` and the exceptions it was raised from, e.g. the provider error a LangChain error wraps."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+def _status_code(exc: BaseException):
+    for attribute in (getattr(exc, "code", None), getattr(exc, "status_code", None),
+                      getattr(getattr(exc, "response", None), "status_code", None)):
+        if isinstance(attribute, int):
+            return attribute
+    return None
+
+def _classify(exc: BaseException, types: tuple, codes: set, message: re.Pattern) -> bool:
+    for error in _causes(exc):
+        if isinstance(error, types):
+            return True
+        code = _status_code(error)
+        if code is not None:
+            if code in codes:
+                return True
+            # A provider status code is authoritative; don't second-guess it from the message
+            continue
+        if message.search(str(error)):
+            return True
+    return False
+
+def is_throttle_error(exc: BaseException) -> bool:
+    """True for quota / rate-limit errors."""
+    return _classify(exc, _THROTTLE_TYPES, _THROTTLE_CODES, _THROTTLE_MESSAGE)
+
+def is_transient_error(exc: BaseException) -> bool:
+    """True for errors worth retrying: throttling, server overload and timeouts."""
+    return _classify(exc, _TRANSIENT_TYPES, _TRANSIENT_CODES, _TRANSIENT_MESSAGE)
+
+def estimate_tokens(*texts, output_tokens: int = 1024) -> int:
+    """Rough token estimate for a request: ~4 characters per input token plus an output allowance."""
+    return sum(len(str(t)) for t in texts) // 4 + output_tokens
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute` tokens per minute.
+    A rate of 0 disables the limit.
+    """
+
+    def __init__(self, per_minute: float, capacity: float = None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are available now)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        # Requests larger than the bucket are allowed once it is full
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    async def acquire(self, amount: float = 1):
+        if self.rate <= 0:
+            return
+        while True:
+            wait = self.wait_time(amount)
+            if wait <= 0:
+                self.tokens -= min(amount, self.capacity)
+                return
+            await asyncio.sleep(wait)
+
+class AdaptiveLimiter:
+    """
+    Concurrency limiter whose limit follows AIMD: halved on throttling and
+    grown by one slot for every `limit` successful calls.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._waiters = deque()
+
+    async def acquire(self):
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def on_success(self):
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def on_throttle(self):
+        self.limit = max(self.min_limit, self.limit / 2)
+
+class TrafficClass:
+    def __init__(self, name: str, rpm: float, tpm: float, max_concurrency: int, clock=time.monotonic):
+        self.name = name
+        self.requests = TokenBucket(rpm, clock=clock)
+        self.tokens = TokenBucket(tpm, clock=clock)
+        self.limiter = AdaptiveLimiter(max_concurrency)
+        self.stats = {"calls": 0, "succeeded": 0, "failed": 0, "retries": 0, "throttled": 0, "wait_seconds": 0.0}
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, concurrency_limit=int(self.limiter.limit), in_flight=self.limiter.in_flight)
+
+class LLMScheduler:
+    """
+    Runs LLM calls under per-traffic-class rate limits, adaptive concurrency and retries.
+
+    Args:
+        classes (dict): Traffic class name -> {"rpm", "tpm", "max_concurrency"}.
+        max_retries (int): Retries after the first attempt for transient errors.
+        backoff_base (float): Initial backoff in seconds; doubles with every retry.
+        backoff_max (float): Upper bound of a single backoff.
+    """
+
+    def __init__(self, classes: dict = None, max_retries: int = LLM_MAX_RETRIES,
+                 backoff_base: float = LLM_BACKOFF_BASE, backoff_max: float = LLM_BACKOFF_MAX,
+                 clock=time.monotonic, sleep=None):
+        if classes is None:
+            classes = {
+                INGEST: {"rpm": LLM_INGEST_RPM, "tpm": LLM_INGEST_TPM, "max_concurrency": LLM_INGEST_MAX_CONCURRENCY},
+                INTERACTIVE: {"rpm": LLM_INTERACTIVE_RPM, "tpm": LLM_INTERACTIVE_TPM, "max_concurrency": LLM_INTERACTIVE_MAX_CONCURRENCY},
+            }
+        self.classes = {name: TrafficClass(name, clock=clock, **config) for name, config in classes.items()}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+        self._sleep = sleep or asyncio.sleep
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt (1-based)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    async def run(self, call, traffic: str = INGEST, tokens: int = 0):
+        """
+        Awaits `call()` (a function returning a coroutine) within the budget of `traffic`.
+
+        Args:
+            call: Zero-argument callable returning an awaitable, e.g. lambda: chain.ainvoke(inputs).
+            traffic (str): Traffic class name.
+            tokens (int): Estimated tokens of the request, charged against the TPM budget.
+
+        Returns:
+            The result of the call. Non-transient errors, and transient errors after
+            `max_retries` retries, are raised to the caller.
+        """
+        traffic_class = self.classes[traffic]
+        stats = traffic_class.stats
+        stats["calls"] += 1
+        attempt = 0
+        while True:
+            waited = self.clock()
+            await traffic_class.limiter.acquire()
+            try:
+                await traffic_class.requests.acquire(1)
+                await traffic_class.tokens.acquire(tokens)
+                stats["wait_seconds"] += self.clock() - waited
+                result = await call()
+            except Exception as e:
+                throttled = is_throttle_error(e)
+                if throttled:
+                    stats["throttled"] += 1
+                    traffic_class.limiter.on_throttle()
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    stats["failed"] += 1
+                    raise
+                attempt += 1
+                stats["retries"] += 1
+                delay = self.backoff(attempt)
+                print(f"LLM call ({traffic}) failed with {type(e).__name__}: {e}. Retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            else:
+                stats["succeeded"] += 1
+                traffic_class.limiter.on_success()
+                return result
+            finally:
+                traffic_class.limiter.release()
+            await self._sleep(delay)
+
+    def stats(self) -> dict:
+        return {name: traffic_class.snapshot() for name, traffic_class in self.classes.items()}
+
+_scheduler = None
+
+def get_scheduler() -> LLMScheduler:
+    """Returns the process-wide scheduler shared by ingestion and the API."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+    return _scheduler
@@ -0,0 +1,141 @@
+import os
+import sys
+import sqlite3
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from src.config import INGEST_MANIFEST_PATH
+
+# Status of a source in the manifest
+PENDING = "pending"         # Extraction started but the article is not in Neo4j yet
+DONE = "done"               # Written to Neo4j
+FAILED = "failed"           # Extraction or write failed; retried on the next run
+
+def content_hash(data) -> str:
+    """Returns the SHA-256 hex digest of `data` (str or bytes)."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+class IngestionManifest:
+    """
+    Persistent record of which sources have been ingested, backed by SQLite.
+
+    A source is skipped on later runs only once it is DONE with the same content
+    hash, so an interrupted run resumes where it stopped and edited files are
+    picked up again.
+    """
+
+    def __init__(self, path: str = INGEST_MANIFEST_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS manifest (
+                source TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                first_seen_at TEXT NOT NULL,
+                started_at TEXT,
+                completed_at TEXT
+            )
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, source: str):
+        return self.conn.execute("SELECT * FROM manifest WHERE source = ?", (source,)).fetchone()
+
+    def needs_processing(self, source: str, digest: str, force: bool = False) -> bool:
+        """Returns True unless `source` was already ingested with the same content."""
+        if force:
+            return True
+        row = self.get(source)
+        return row is None or row["status"] != DONE or row["content_hash"] != digest
+
+    def mark_started(self, source: str, digest: str):
+        now = _now()
+        self.conn.execute("""
+            INSERT INTO manifest (source, content_hash, status, attempts, first_seen_at, started_at)
+            VALUES (?, ?, ?, 1, ?, ?)
+            ON CONFLICT(source) DO UPDATE SET
+                content_hash = excluded.content_hash,
+                status = excluded.status,
+                attempts = manifest.attempts + 1,
+                error = NULL,
+                started_at = excluded.started_at,
+                completed_at = NULL
+        """, (source, digest, PENDING, now, now))
+        self.conn.commit()
+
+    def mark_done(self, sources):
+        now = _now()
+        self.conn.executemany(
+            "UPDATE manifest SET status = ?, error = NULL, completed_at = ? WHERE source = ?",
+            [(DONE, now, source) for source in sources]
+        )
+        self.conn.commit()
+
+    def mark_failed(self, sources, error: str):
+        now = _now()
+        self.conn.executemany(
+            "UPDATE manifest SET status = ?, error = ?, completed_at = ? WHERE source = ?",
+            [(FAILED, error, now, source) for source in sources]
+        )
+        self.conn.commit()
+
+    def forget(self, sources) -> int:
+        """Removes sources from the manifest so they are ingested again on the next run."""
+        cursor = self.conn.executemany("DELETE FROM manifest WHERE source = ?", [(s,) for s in sources])
+        self.conn.commit()
+        return cursor.rowcount
+
+    def summary(self) -> dict:
+        rows = self.conn.execute("SELECT status, count(*) AS n FROM manifest GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def entries(self, status: str = None):
+        if status:
+            return self.conn.execute("SELECT * FROM manifest WHERE status = ? ORDER BY source", (status,)).fetchall()
+        return self.conn.execute("SELECT * FROM manifest ORDER BY source").fetchall()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or edit the ingestion manifest.")
+    parser.add_argument("--path", default=INGEST_MANIFEST_PATH, help="Manifest database path.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("summary", help="Count sources per status.")
+    list_parser = commands.add_parser("list", help="List sources.")
+    list_parser.add_argument("--status", choices=[PENDING, DONE, FAILED], default=None)
+    forget_parser = commands.add_parser("forget", help="Remove sources so they are re-ingested.")
+    forget_parser.add_argument("sources", nargs="+")
+    args = parser.parse_args(argv)
+
+    manifest = IngestionManifest(args.path)
+    try:
+        if args.command == "summary":
+            summary = manifest.summary()
+            for status in (DONE, PENDING, FAILED):
+                print(f"{status:8} {summary.get(status, 0)}")
+        elif args.command == "list":
+            for row in manifest.entries(args.status):
+                line = f"{row['status']:8} {row['completed_at'] or row['started_at'] or '-':25} {row['source']}"
+                if row["error"]:
+                    line += f"  ({row['error']})"
+                print(line)
+        elif args.command == "forget":
+            print(f"Removed {manifest.forget(args.sources)} sources.")
+    finally:
+        manifest.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
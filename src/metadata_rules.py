@@ -0,0 +1,219 @@
+"""
+Rule-based article metadata extraction.
+
+Most of our feeds start with fixed header lines: the headline, an optional
+"Source : <publisher>" line, the article URL and a publication date. Reading
+those with regular expressions is free, so extract_info only asks the LLM for
+the metadata fields that the rules could not fill with enough confidence.
+The article status is only read from publisher URL paths (e.g. Investing.com's
+/analyst-ratings/); classifying the body text is left to the LLM.
+
+Publisher-specific behaviour (display name, date formats, status hints from
+URL paths) lives in PublisherRule objects; add one with register_rule.
+"""
+import re
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+from src.config import METADATA_RULES_MIN_CONFIDENCE
+
+METADATA_FIELDS = ["title", "source", "url", "date", "status"]
+
+# Bump whenever a rule change alters the extracted metadata; it is part of the extraction cache key
+RULES_VERSION = "2"
+
+# Only the first few non-empty lines are treated as the header
+HEADER_LINES = 6
+
+URL_PATTERN = re.compile(r"https?://\S+")
+SOURCE_LINE_PATTERN = re.compile(r"^source\s*:\s*(?P<publisher>[^\s]+)?", re.IGNORECASE)
+MONTHS = "January|February|March|April|May|June|July|August|September|October|November|December"
+
+# (regex, strptime format of the matched groups joined by spaces)
+DEFAULT_DATE_PATTERNS = [
+    (re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4})\b"), "%m %d %Y"),
+    (re.compile(rf"\b({MONTHS}) (\d{{1,2}}), (\d{{4}})"), "%B %d %Y"),
+    (re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b"), "%Y %m %d"),
+]
+
+class PublisherRule:
+    """
+    Header conventions of one publisher.
+
+    Args:
+        name (str): Publisher name as stored on the Document (and fed to get_publisher_tier).
+        domains (list[str]): URL host names (without "www.") served by this publisher.
+        date_patterns (list): (regex, strptime format) pairs tried before the defaults.
+        status_paths (dict): URL path fragment -> article status, e.g. {"/analyst-ratings/": "Analysis/Outlook"}.
+    """
+
+    def __init__(self, name: str, domains: list, date_patterns: list = None, status_paths: dict = None):
+        self.name = name
+        self.domains = [d.lower() for d in domains]
+        self.date_patterns = date_patterns or []
+        self.status_paths = status_paths or {}
+
+    def matches(self, host: str) -> bool:
+        return any(host == d or host.endswith(f".{d}") for d in self.domains)
+
+PUBLISHER_RULES = [
+    PublisherRule("Investing.com", ["investing.com"], status_paths={"/analyst-ratings/": "Analysis/Outlook"}),
+    PublisherRule("Reuters", ["reuters.com"]),
+    PublisherRule("CNBC", ["cnbc.com"]),
+    PublisherRule("Bloomberg", ["bloomberg.com"]),
+    PublisherRule("Wall Street Journal", ["wsj.com"]),
+    PublisherRule("Financial Times", ["ft.com"]),
+    PublisherRule("New York Times", ["nytimes.com"]),
+    PublisherRule("TechCrunch", ["techcrunch.com"]),
+    PublisherRule("Forbes", ["forbes.com"]),
+    PublisherRule("Business Insider", ["businessinsider.com"]),
+    PublisherRule("Axios", ["axios.com"]),
+    PublisherRule("Wired", ["wired.com"]),
+    PublisherRule("The Verge", ["theverge.com"]),
+    PublisherRule("Yahoo Finance", ["finance.yahoo.com"]),
+    PublisherRule("Fox Business", ["foxbusiness.com"]),
+    PublisherRule("SemiAnalysis", ["semianalysis.com"]),
+    PublisherRule("The Next Platform", ["nextplatform.com"]),
+    PublisherRule("24/7 Wall St.", ["247wallst.com"]),
+    PublisherRule("RCR Wireless News", ["rcrwireless.com"]),
+]
+
+def register_rule(rule: PublisherRule):
+    """Adds a publisher rule; later rules take precedence over earlier ones."""
+    PUBLISHER_RULES.insert(0, rule)
+
+def find_rule(host: str):
+    for rule in PUBLISHER_RULES:
+        if rule.matches(host):
+            return rule
+    return None
+
+def _header_lines(text: str) -> list:
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return lines[:HEADER_LINES]
+
+def _parse_date(lines: list, patterns: list):
+    for line in lines:
+        for pattern, date_format in patterns:
+            match = pattern.search(line)
+            if not match:
+                continue
+            try:
+                return datetime.strptime(" ".join(match.groups()), date_format).date().isoformat()
+            except ValueError:
+                continue
+    return None
+
+def extract_header_metadata(text: str):
+    """
+    Extracts article metadata from the header lines with regular expressions.
+
+    Returns:
+        tuple[dict, dict]: Field values and per-field confidence (0-1), for the
+        fields in METADATA_FIELDS that could be read. Missing fields are absent.
+    """
+    values = {}
+    confidence = {}
+    lines = _header_lines(text)
+    if not lines:
+        return values, confidence
+
+    rule = None
+    url_match = next((URL_PATTERN.search(line) for line in lines if URL_PATTERN.search(line)), None)
+
+    # The first line is only trusted as the headline when a URL header follows it
+    title = lines[0]
+    if not URL_PATTERN.match(title) and not SOURCE_LINE_PATTERN.match(title) and 10 <= len(title) <= 250:
+        values["title"] = title
+        confidence["title"] = 0.9 if url_match else 0.5
+
+    if url_match:
+        url = url_match.group(0).rstrip(".,)")
+        values["url"] = url
+        confidence["url"] = 1.0
+        host = urlparse(url).netloc.lower().removeprefix("www.")
+        rule = find_rule(host)
+        if rule:
+            values["source"] = rule.name
+            confidence["source"] = 1.0
+        elif host:
+            values["source"] = host
+            confidence["source"] = 0.8
+        path = urlparse(url).path.lower()
+        for fragment, status in (rule.status_paths.items() if rule else ()):
+            if fragment in path:
+                values["status"] = status
+                confidence["status"] = 0.9
+                break
+
+    if "source" not in values:
+        for line in lines:
+            source_match = SOURCE_LINE_PATTERN.match(line)
+            if source_match and source_match.group("publisher") and not URL_PATTERN.match(source_match.group("publisher")):
+                values["source"] = source_match.group("publisher")
+                confidence["source"] = 0.85
+                break
+
+    # Dates inside URLs are often the filing date in another time zone; prefer the dateline
+    date_lines = [URL_PATTERN.sub("", line) for line in lines[1:]]
+    date = _parse_date(date_lines, (rule.date_patterns if rule else []) + DEFAULT_DATE_PATTERNS)
+    if date:
+        values["date"] = date
+        confidence["date"] = 0.95
+
+    return values, confidence
+
+def missing_fields(confidence: dict, min_confidence: float = METADATA_RULES_MIN_CONFIDENCE) -> list:
+    """Returns the metadata fields that still need the LLM."""
+    return [field for field in METADATA_FIELDS if confidence.get(field, 0.0) < min_confidence]
+
+def merge_metadata(rule_values: dict, confidence: dict, llm_values: dict = None,
+                   min_confidence: float = METADATA_RULES_MIN_CONFIDENCE) -> dict:
+    """
+    Combines rule-based and LLM metadata: confident rule values win, the LLM
+    fills the rest, and low-confidence rule values are used only as a fallback.
+    """
+    llm_values = llm_values or {}
+    merged = {}
+    for field in METADATA_FIELDS:
+        if confidence.get(field, 0.0) >= min_confidence:
+            merged[field] = rule_values[field]
+        elif llm_values.get(field) is not None:
+            merged[field] = llm_values[field]
+        else:
+            merged[field] = rule_values.get(field)
+    return merged
+
+class MetadataRuleStats:
+    """Counts how many metadata LLM calls the rules avoided. Thread-safe."""
+
+    def __init__(self):
+        self.articles = 0
+        self.llm_calls = 0
+        self.fields_from_rules = 0
+        self._lock = threading.Lock()
+
+    def record(self, llm_called: bool, fields_from_rules: int):
+        with self._lock:
+            self.articles += 1
+            self.llm_calls += int(llm_called)
+            self.fields_from_rules += fields_from_rules
+
+    @property
+    def avoided_fraction(self) -> float:
+        return (self.articles - self.llm_calls) / self.articles if self.articles else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "articles": self.articles,
+            "llm_calls": self.llm_calls,
+            "avoided": self.articles - self.llm_calls,
+            "avoided_fraction": round(self.avoided_fraction, 3),
+            "fields_from_rules": self.fields_from_rules,
+        }
+
+    def format(self) -> str:
+        return (f"rule-based metadata avoided {self.articles - self.llm_calls}/{self.articles} "
+                f"LLM metadata calls ({self.avoided_fraction:.0%})")
+
+metadata_stats = MetadataRuleStats()
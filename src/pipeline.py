@@ -0,0 +1,313 @@
+"""
+Streaming ingestion pipeline: read -> extract -> write.
+
+Each stage runs in its own workers and hands items to the next stage through a
+bounded asyncio.Queue, so Neo4j writes overlap with LLM extraction and a slow
+stage applies backpressure instead of letting items pile up in memory.
+
+Sources are read lazily: a directory or glob of .txt files, a JSONL file, or
+JSONL on stdin ("-"). Each JSONL line is an object with a "text" field and an
+optional "id" or "url" used as the Document source. File paths, ids and URLs name
+one article, so a changed article replaces the Document written from its earlier
+version. Other lines get a source made unique by a content hash (JSONL "source"
+fields are usually a publisher name and line numbers restart every run), and are
+never replaced. A file that cannot be read yields an {"source", "error"} item
+instead, which the read stage counts as a failure before moving on to the next file.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import asyncio
+import threading
+import concurrent.futures
+from src.config import INGEST_CONCURRENCY, NEO4J_WRITE_BATCH_SIZE, EXTRACTION_MODE
+from src.config import PIPELINE_QUEUE_SIZE, PIPELINE_WRITE_WORKERS, PIPELINE_REPORT_INTERVAL
+from src.ingest import extract_info, neo4j_driver, get_entity_index, save_entity_index, _write_batch
+from src.batch_writer import Neo4jBatchWriter
+from src.manifest import IngestionManifest, content_hash
+
+_DONE = object() # Sentinel telling a stage's workers that no more items will arrive
+
+# How often the reader thread checks whether the pipeline was aborted while it waits for queue space
+_PUT_POLL_SECONDS = 0.5
+
+# --- Sources ---
+
+def _iter_text_files(pattern: str):
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.txt")
+    for filepath in glob.iglob(pattern):
+        if not os.path.isfile(filepath):
+            continue
+        try:
+            with open(filepath, "r", encoding="utf-8") as file:
+                text = file.read()
+        except (OSError, UnicodeDecodeError) as e:
+            yield {"source": filepath, "error": str(e)}
+            continue
+        yield {"source": filepath, "text": text, "replace_source": True}
+
+def _iter_jsonl(file, name: str):
+    for line_no, line in enumerate(file, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            print(f"Skipping invalid JSON on {name} line {line_no}: {e}")
+            continue
+        text = record.get("text") or record.get("content") or record.get("body")
+        if not text:
+            print(f"Skipping {name} line {line_no}: no text field")
+            continue
+        article_id = next((record[key] for key in ("id", "url") if record.get(key) is not None), None)
+        if article_id is not None:
+            yield {"source": str(article_id), "text": text, "replace_source": True}
+        else:
+            yield {"source": f"{record.get('source') or name}#{content_hash(text)[:16]}", "text": text, "replace_source": False}
+
+def iter_articles(paths):
+    """Lazily yields {"source", "text", "replace_source"} articles from directories, globs, JSONL files or stdin ("-")."""
+    for path in paths:
+        try:
+            if path == "-":
+                yield from _iter_jsonl(sys.stdin, "stdin")
+            elif path.endswith(".jsonl") and os.path.isfile(path):
+                with open(path, "r", encoding="utf-8") as file:
+                    yield from _iter_jsonl(file, path)
+            else:
+                yield from _iter_text_files(path)
+        except (OSError, UnicodeDecodeError) as e:
+            # The rest of this source is lost, but the remaining paths are still read
+            yield {"source": path, "error": str(e)}
+
+# --- Instrumentation ---
+
+class StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.processed = 0
+        self.failed = 0
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float, ok: bool = True, count: int = 1):
+        self.processed += count if ok else 0
+        self.failed += 0 if ok else count
+        self.calls += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> dict:
+        return {
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_seconds": self.total_seconds / self.calls if self.calls else 0.0,
+            "max_seconds": self.max_seconds,
+        }
+
+class PipelineStats:
+    """Per-stage counters and latencies plus the current depth of every queue."""
+
+    def __init__(self, queues: dict):
+        self.started = time.perf_counter()
+        self.queues = queues
+        self.stages = {name: StageStats(name) for name in ("read", "extract", "write")}
+        self.skipped = 0
+
+    def snapshot(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        written = self.stages["write"].processed
+        return {
+            "elapsed_seconds": elapsed,
+            "throughput": written / elapsed if elapsed else 0.0,
+            "skipped": self.skipped,
+            "queues": {name: {"depth": q.qsize(), "maxsize": q.maxsize} for name, q in self.queues.items()},
+            "stages": {name: stage.snapshot() for name, stage in self.stages.items()},
+        }
+
+    def format(self) -> str:
+        snap = self.snapshot()
+        stages = " | ".join(
+            f"{name} {s['processed']} ok/{s['failed']} failed (avg {s['avg_seconds']:.2f}s)"
+            for name, s in snap["stages"].items()
+        )
+        queues = " ".join(f"{name}={q['depth']}/{q['maxsize']}" for name, q in snap["queues"].items())
+        return f"{stages} | queues {queues} | skipped {snap['skipped']} | {snap['throughput']:.2f} articles/s"
+
+# --- Pipeline ---
+
+class IngestionPipeline:
+    """
+    Staged asyncio ingestion pipeline.
+
+    Args:
+        extract_workers (int): Number of concurrent extract_info calls.
+        write_workers (int): Number of workers collecting write batches. Their transactions
+            are committed one at a time (see ingest._write_lock).
+        batch_size (int): Maximum number of articles per write transaction.
+        queue_size (int): Capacity of each inter-stage queue.
+        mode (str): Extraction mode passed to extract_info.
+        manifest (IngestionManifest): Optional manifest used to skip unchanged sources.
+        force (bool): Re-ingest sources even if the manifest says they are done.
+        report_interval (float): Seconds between progress reports (0 disables them).
+    """
+
+    def __init__(self, extract_workers: int = INGEST_CONCURRENCY, write_workers: int = PIPELINE_WRITE_WORKERS,
+                 batch_size: int = NEO4J_WRITE_BATCH_SIZE, queue_size: int = PIPELINE_QUEUE_SIZE,
+                 mode: str = EXTRACTION_MODE, manifest: IngestionManifest = None, force: bool = False,
+                 report_interval: float = PIPELINE_REPORT_INTERVAL):
+        self.extract_workers = max(1, extract_workers)
+        self.write_workers = max(1, write_workers)
+        self.mode = mode
+        self.manifest = manifest
+        self.force = force
+        self.report_interval = report_interval
+        self.writer = Neo4jBatchWriter(neo4j_driver, batch_size=batch_size, entity_index=get_entity_index())
+        self.extract_queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.write_queue = asyncio.Queue(maxsize=max(batch_size, queue_size))
+        self.stats = PipelineStats({"extract": self.extract_queue, "write": self.write_queue})
+        self._aborted = threading.Event()
+
+    async def run(self, articles) -> dict:
+        """Ingests every article yielded by the (synchronous) iterable `articles`. Returns the final stats snapshot."""
+        loop = asyncio.get_running_loop()
+        reader = loop.run_in_executor(None, self._read, articles, loop)
+        extractors = [asyncio.create_task(self._extract_worker()) for _ in range(self.extract_workers)]
+        writers = [asyncio.create_task(self._write_worker()) for _ in range(self.write_workers)]
+        reporter = asyncio.create_task(self._report()) if self.report_interval > 0 else None
+
+        async def feed_writers():
+            await asyncio.gather(reader, *extractors)
+            for _ in writers:
+                await self.write_queue.put(_DONE)
+
+        feeder = asyncio.create_task(feed_writers())
+        try:
+            # Fails as soon as any stage does, instead of waiting on a queue nobody drains
+            await asyncio.gather(feeder, *writers)
+        finally:
+            # Unblocks the reader thread if it is waiting for space in the extract queue
+            self._aborted.set()
+            if reporter:
+                reporter.cancel()
+            for task in [feeder] + extractors + writers:
+                task.cancel()
+            save_entity_index()
+
+        print(f"Pipeline finished: {self.stats.format()}")
+        return self.stats.snapshot()
+
+    def _read(self, articles, loop):
+        """Runs in a worker thread; blocks whenever the extract queue is full."""
+        stage = self.stats.stages["read"]
+        try:
+            iterator = iter(articles)
+            while True:
+                started = time.perf_counter()
+                try:
+                    article = next(iterator)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    # The generator itself raised, so it cannot be resumed
+                    stage.record(time.perf_counter() - started, ok=False)
+                    print(f"Error reading articles: {e}")
+                    break
+                if "error" in article:
+                    stage.record(time.perf_counter() - started, ok=False)
+                    print(f"Error reading {article['source']}: {article['error']}")
+                    continue
+                stage.record(time.perf_counter() - started)
+                if not self._put(article, loop):
+                    return
+        finally:
+            for _ in range(self.extract_workers):
+                if not self._put(_DONE, loop):
+                    break
+
+    def _put(self, item, loop) -> bool:
+        """Puts `item` on the extract queue from the reader thread. Returns False if the pipeline was aborted first."""
+        future = asyncio.run_coroutine_threadsafe(self.extract_queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=_PUT_POLL_SECONDS)
+                return True
+            except concurrent.futures.TimeoutError:
+                if self._aborted.is_set():
+                    future.cancel()
+                    return False
+
+    async def _extract_worker(self):
+        stage = self.stats.stages["extract"]
+        while True:
+            article = await self.extract_queue.get()
+            if article is _DONE:
+                return
+            source = article["source"]
+            digest = content_hash(article["text"])
+            if self.manifest and not self.manifest.needs_processing(source, digest, force=self.force):
+                self.stats.skipped += 1
+                continue
+            if self.manifest:
+                self.manifest.mark_started(source, digest)
+
+            started = time.perf_counter()
+            try:
+                data = await extract_info(article["text"], source=source, mode=self.mode)
+            except Exception as e:
+                stage.record(time.perf_counter() - started, ok=False)
+                print(f"Error processing {source}: {e}")
+                if self.manifest:
+                    self.manifest.mark_failed([source], f"Extraction failed: {e}")
+                continue
+            stage.record(time.perf_counter() - started)
+            print(f"Extracted {source} in {time.perf_counter() - started:.1f}s")
+            data["replace_source"] = article.get("replace_source", False)
+            await self.write_queue.put(data)
+
+    async def _next_batch(self):
+        """Waits for one item, then takes whatever else is already queued, up to the batch size."""
+        first = await self.write_queue.get()
+        if first is _DONE:
+            return None
+        batch = [first]
+        while len(batch) < self.writer.batch_size:
+            try:
+                item = self.write_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is _DONE:
+                # Leave the sentinel for this worker's next iteration
+                self.write_queue.put_nowait(item)
+                break
+            batch.append(item)
+        return batch
+
+    async def _write_worker(self):
+        stage = self.stats.stages["write"]
+        while True:
+            batch = await self._next_batch()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            try:
+                written = await _write_batch(self.writer, batch)
+            except Exception as e:
+                stage.record(time.perf_counter() - started, ok=False, count=len(batch))
+                print(f"Error saving batch of {len(batch)} articles to Neo4j: {e}")
+                if self.manifest:
+                    self.manifest.mark_failed([data["source"] for data in batch], f"Neo4j write failed: {e}")
+                continue
+            stage.record(time.perf_counter() - started, count=len(written))
+            if self.manifest:
+                self.manifest.mark_done(written)
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            print(f"[pipeline] {self.stats.format()}")
@@ -0,0 +1,127 @@
+"""
+Cypher builders for the read queries the API serves most often.
+
+They live outside src/api so that src/schema.py can EXPLAIN the exact queries
+the endpoints run (`python -m src.schema check`) without importing FastAPI.
+"""
+import json
+import base64
+from typing import List, Optional, Tuple
+from src.entity_search import entity_filter_clause, lucene_query
+
+ARTICLE_MENTIONS_QUERY = """
+    MATCH (d:Document)-[:MENTIONS]->(n)
+    WHERE d.title = $title
+    RETURN elementId(n) as id
+    """
+
+ARTICLE_CONTENT_QUERY = """
+    MATCH (d:Document)
+    WHERE d.title = $title
+    RETURN d.text as text
+    """
+
+# Sentiment counts of the companies, products and sectors mentioned by the given articles
+ANALYSIS_SENTIMENT_QUERY = """
+    MATCH (d:Document)-[r:MENTIONS]->(n)
+    WHERE d.title IN $titles AND (n:Company OR n:Product OR n:Sector)
+    RETURN 
+        COALESCE(n.name, n.id) as Entity, 
+        labels(n)[0] as Type, 
+        r.sentiment as Sentiment, 
+        count(*) as Count
+    """
+
+def build_document_filter_clause(date_range: Optional[str], tiers: Optional[List[str]], news_status: Optional[List[str]], params: dict) -> str:
+    """
+    Returns "AND ..." conditions on `d:Document` for the date, tier and status filters
+    and adds their parameters to `params`. Conditions are only emitted for filters
+    that are set, so that the planner can use the Document indexes (see src/schema.py).
+    """
+    clauses = []
+    if date_range and date_range != "all":
+        from datetime import datetime, timedelta
+        today = datetime.now()
+        if date_range == "7d":
+            delta = timedelta(days=7)
+        elif date_range == "30d":
+            delta = timedelta(days=30)
+        elif date_range == "3m":
+            delta = timedelta(days=90)
+        else:
+            delta = timedelta(days=36500) # Default to all if unknown
+            
+        params["threshold_date"] = (today - delta).strftime("%Y-%m-%d")
+        clauses.append("AND d.date >= $threshold_date")
+    if tiers is not None:
+        params["tiers"] = tiers
+        clauses.append("AND d.publisher_tier IN $tiers")
+    if news_status is not None:
+        params["statuses"] = news_status
+        clauses.append("AND d.news_status IN $statuses")
+    return "\n    ".join(clauses)
+
+ARTICLES_PAGE_SIZE = 50
+ARTICLES_MAX_PAGE_SIZE = 500
+
+def encode_cursor(date: str, document_id: str) -> str:
+    """Opaque /articles cursor for the page after the row with this (sort_date, id)."""
+    return base64.urlsafe_b64encode(json.dumps([date, document_id]).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_cursor. Raises ValueError for a malformed cursor."""
+    try:
+        date, document_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(date, str) or not isinstance(document_id, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return date, document_id
+
+def build_articles_query(limit: int = ARTICLES_PAGE_SIZE, date_range: Optional[str] = None, tiers: Optional[List[str]] = None,
+                         news_status: Optional[List[str]] = None, sectors: Optional[List[str]] = None,
+                         entity_search: Optional[str] = None, after: Optional[Tuple[str, str]] = None):
+    """
+    Returns the Cypher query and parameters behind /articles.
+
+    Articles are ordered by (sort_date, id) descending, and `after` is the
+    (sort_date, id) of the last article of the previous page. `sort_date` is the
+    document date, or "" for undated documents, which therefore come last rather
+    than being left out. The query seeks past `after` in the Document(sort_date, id)
+    index, so a deep page costs the same as the first one. One row more than
+    `limit` is returned to tell whether there is a next page.
+    """
+    params = {"limit": limit + 1, "sectors": sectors}
+    document_filter_clause = build_document_filter_clause(date_range, tiers, news_status, params)
+    if after is not None:
+        params["after_date"], params["after_id"] = after
+        # Written as a range on d.date plus a tie-break so that the planner can seek the index
+        document_filter_clause += "\n    AND d.sort_date <= $after_date AND (d.sort_date < $after_date OR d.id < $after_id)"
+
+    # Filter by Entity Search (if provided): matching entities come from the full-text index
+    entity_query = lucene_query(entity_search) if entity_search else None
+    entity_clause = entity_filter_clause(entity_query, params) if entity_query else ""
+    if entity_query:
+        document_filter_clause += "\n    AND EXISTS { MATCH (d)-[:MENTIONS]->(n) WHERE n IN entities }"
+
+    # Build Query
+    # We need to filter Documents based on their properties AND their relationships to specific nodes (Sectors/Entities)
+    
+    query = f"""
+    {entity_clause}
+    MATCH (d:Document)
+    WHERE d.sort_date IS NOT NULL
+    {document_filter_clause}
+    
+    // Filter by Sector (if provided)
+    AND ($sectors IS NULL OR EXISTS {{
+        MATCH (d)-[:MENTIONS]->(n)
+        WHERE (n:Sector AND n.id IN $sectors) 
+           OR EXISTS {{ MATCH (n)-[:BELONGS_TO]->(s:Sector) WHERE s.id IN $sectors }}
+    }})
+    
+    RETURN d.title as title, d.date as date, d.publisher as source, d.url as url, d.publisher_tier as tier, d.news_status as status, d.id as id, d.sort_date as sort_date
+    ORDER BY d.sort_date DESC, d.id DESC
+    LIMIT $limit
+    """
+    return query, params
@@ -0,0 +1,190 @@
+"""
+Per-query Neo4j instrumentation.
+
+GraphDB and AsyncGraphDB report every query here under a name (routes pass one,
+ad-hoc queries get a fingerprint). For each name we keep a wall-time histogram,
+rows returned, the driver's result_available_after / result_consumed_after and,
+for a sampled fraction of read queries that are run with PROFILE, database hits.
+Queries slower than SLOW_QUERY_THRESHOLD_MS are printed to the slow-query log.
+
+Recording is a few additions under a lock, cheap enough to leave on in
+production. The API exposes the numbers in Prometheus text format at /metrics.
+"""
+import re
+import time
+import random
+import hashlib
+import threading
+from src.config import QUERY_METRICS_ENABLED, SLOW_QUERY_THRESHOLD_MS, QUERY_PROFILE_SAMPLE_RATE
+
+# Upper bounds (seconds) of the wall-time histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Only plain read queries are profiled; PROFILE cannot wrap schema commands or EXPLAIN
+_PROFILABLE = re.compile(r"^\s*(MATCH|OPTIONAL\s+MATCH|WITH|UNWIND|RETURN)\b", re.IGNORECASE)
+
+def query_name(query: str) -> str:
+    """Stable name for an unnamed query, from a hash of its whitespace-normalized text."""
+    normalized = " ".join(query.split())
+    return f"adhoc_{hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:8]}"
+
+def db_hits(profile) -> int:
+    """Sums dbHits over a profiled plan tree (the dict from ResultSummary.profile)."""
+    if not profile:
+        return 0
+    return profile.get("dbHits", 0) + sum(db_hits(child) for child in profile.get("children", []))
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.available_after_seconds = 0.0
+        self.consumed_after_seconds = 0.0
+        self.profiled = 0
+        self.db_hits = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "avg_ms": round(self.seconds / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 2),
+            "avg_db_hits": round(self.db_hits / self.profiled) if self.profiled else None,
+        }
+
+class QueryRun:
+    """
+    Times one query execution; returned by QueryMetrics.run and used as a context manager.
+    Set `rows` and `summary` before leaving the block. Run `statement`, which adds
+    PROFILE when the execution was sampled for profiling.
+    """
+
+    def __init__(self, metrics, name: str, query: str):
+        self.metrics = metrics
+        self.name = name
+        self.query = query
+        self.statement = f"PROFILE {query}" if metrics.should_profile(query) else query
+        self.rows = 0
+        self.summary = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Cancellation and streams closed early (GeneratorExit) are not query errors
+        error = exc_type is not None and issubclass(exc_type, Exception)
+        self.metrics.record(self.name, time.perf_counter() - self.started, self.rows, self.summary, error=error, query=self.query)
+        return False
+
+class QueryMetrics:
+    """
+    Thread-safe registry of per-query statistics.
+
+    Args:
+        slow_threshold_ms (float): Queries at least this slow are logged; 0 disables the log.
+        profile_sample_rate (float): Fraction (0-1) of eligible read queries to run with PROFILE.
+    """
+
+    def __init__(self, enabled: bool = QUERY_METRICS_ENABLED, slow_threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+                 profile_sample_rate: float = QUERY_PROFILE_SAMPLE_RATE):
+        self.enabled = enabled
+        self.slow_threshold_ms = slow_threshold_ms
+        self.profile_sample_rate = profile_sample_rate
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def run(self, name: str, query: str) -> QueryRun:
+        return QueryRun(self, name or query_name(query), query)
+
+    def should_profile(self, query: str) -> bool:
+        return (self.enabled and self.profile_sample_rate > 0 and random.random() < self.profile_sample_rate
+                and bool(_PROFILABLE.match(query)))
+
+    def record(self, name: str, seconds: float, rows: int = 0, summary=None, error: bool = False, query: str = None):
+        """
+        Records one execution.
+
+        Args:
+            summary: The neo4j ResultSummary, if the result was fully consumed.
+            query: The Cypher text, only used for the slow-query log.
+        """
+        if not self.enabled:
+            return
+        available_after = getattr(summary, "result_available_after", None)
+        consumed_after = getattr(summary, "result_consumed_after", None)
+        profile = getattr(summary, "profile", None)
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = QueryStats()
+            stats.count += 1
+            stats.errors += int(error)
+            stats.rows += rows
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+                    break
+            if available_after is not None:
+                stats.available_after_seconds += available_after / 1000
+            if consumed_after is not None:
+                stats.consumed_after_seconds += consumed_after / 1000
+            if profile:
+                stats.profiled += 1
+                stats.db_hits += db_hits(profile)
+
+        if self.slow_threshold_ms and seconds * 1000 >= self.slow_threshold_ms:
+            snippet = " ".join(query.split())[:200] if query else ""
+            hits = f", {db_hits(profile)} db hits" if profile else ""
+            print(f"[slow query] {name}: {seconds * 1000:.0f} ms, {rows} rows{hits}{', failed' if error else ''} | {snippet}")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: stats.snapshot() for name, stats in sorted(self._stats.items())}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def render_prometheus(self, prefix: str = "relatiq_neo4j_query") -> str:
+        """Renders all statistics in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_duration_seconds Wall time of Neo4j queries, by query name.",
+            f"# TYPE {prefix}_duration_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted(self._stats.items())
+            for name, stats in items:
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(f'{prefix}_duration_seconds_bucket{{query="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_duration_seconds_bucket{{query="{label}",le="+Inf"}} {stats.count}')
+                lines.append(f'{prefix}_duration_seconds_sum{{query="{label}"}} {stats.seconds:.6f}')
+                lines.append(f'{prefix}_duration_seconds_count{{query="{label}"}} {stats.count}')
+            counters = [
+                ("errors_total", "Failed executions.", lambda s: s.errors),
+                ("rows_total", "Rows returned.", lambda s: s.rows),
+                ("result_available_after_seconds_total", "Server time until the first record was available.", lambda s: f"{s.available_after_seconds:.6f}"),
+                ("result_consumed_after_seconds_total", "Server time until the result was consumed.", lambda s: f"{s.consumed_after_seconds:.6f}"),
+                ("profiled_total", "Executions run with PROFILE.", lambda s: s.profiled),
+                ("db_hits_total", "Database hits of profiled executions.", lambda s: s.db_hits),
+            ]
+            for suffix, help_text, value in counters:
+                lines.append(f"# HELP {prefix}_{suffix} {help_text}")
+                lines.append(f"# TYPE {prefix}_{suffix} counter")
+                for name, stats in items:
+                    label = name.replace("\\", "\\\\").replace('"', '\\"')
+                    lines.append(f'{prefix}_{suffix}{{query="{label}"}} {value(stats)}')
+        return "\n".join(lines) + "\n"
+
+# Shared by every GraphDB / AsyncGraphDB in the process
+query_metrics = QueryMetrics()
@@ -0,0 +1,224 @@
+"""
+Versioned Neo4j schema: uniqueness constraints and indexes for the real data model.
+
+Ingestion writes `Document` nodes keyed by `id` and entity nodes (Company,
+Person, Product, Sector) keyed by `id`; the API filters documents by title,
+date, publisher tier and news status and searches entities by name. Each
+migration below is applied once, in order, and recorded as a
+`(:SchemaMigration {version})` node. Every statement is idempotent, so running
+the migrations again (at API startup, or from the CLI) is harmless.
+
+Usage:
+    python -m src.schema migrate   # Apply pending migrations
+    python -m src.schema status    # Show applied and pending migrations
+    python -m src.schema check     # EXPLAIN the hot API queries and verify they use indexes
+"""
+import sys
+import argparse
+from src.sentiment_timeline import TIMELINE_QUERY, backfill as backfill_sentiment_aggregates
+from src.queries import build_articles_query, ARTICLE_MENTIONS_QUERY, ARTICLE_CONTENT_QUERY, ANALYSIS_SENTIMENT_QUERY
+
+
+ENTITY_LABELS = ["Company", "Person", "Product", "Sector"]
+
+# Constraints created by the old GraphDB.create_constraints on properties the pipeline never writes
+LEGACY_CONSTRAINTS = [
+    (["Company"], ["name"]),
+    (["Person"], ["name"]),
+    (["Topic"], ["name"]),
+    (["Article"], ["url"]),
+]
+
+def _drop_legacy_constraints(query):
+    rows = query("SHOW CONSTRAINTS YIELD name, labelsOrTypes, properties RETURN name, labelsOrTypes, properties")
+    for row in rows:
+        if (list(row["labelsOrTypes"] or []), list(row["properties"] or [])) in LEGACY_CONSTRAINTS:
+            print(f"Dropping legacy constraint {row['name']}")
+            query(f"DROP CONSTRAINT `{row['name']}` IF EXISTS")
+
+def _backfill_sort_dates(query):
+    """Stores the /articles sort key on documents written before ingestion did."""
+    query("""
+    MATCH (d:Document) WHERE d.sort_date IS NULL
+    CALL {
+        WITH d
+        SET d.sort_date = coalesce(toString(d.date), '')
+    } IN TRANSACTIONS OF 1000 ROWS
+    """)
+
+# (version, description, steps); a step is a Cypher statement or a callable taking `query`
+MIGRATIONS = [
+    (1, "Drop legacy constraints on properties the pipeline never writes", [
+        _drop_legacy_constraints,
+    ]),
+    (2, "Uniqueness constraints on Document and entity ids", [
+        "CREATE CONSTRAINT document_id IF NOT EXISTS FOR (d:Document) REQUIRE d.id IS UNIQUE",
+    ] + [
+        f"CREATE CONSTRAINT {label.lower()}_id IF NOT EXISTS FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+        for label in ENTITY_LABELS
+    ]),
+    (3, "Range indexes on the Document properties the API filters and sorts on", [
+        "CREATE INDEX document_title IF NOT EXISTS FOR (d:Document) ON (d.title)",
+        "CREATE INDEX document_date IF NOT EXISTS FOR (d:Document) ON (d.date)",
+        "CREATE INDEX document_publisher_tier IF NOT EXISTS FOR (d:Document) ON (d.publisher_tier)",
+        "CREATE INDEX document_news_status IF NOT EXISTS FOR (d:Document) ON (d.news_status)",
+        "CREATE INDEX document_url IF NOT EXISTS FOR (d:Document) ON (d.url)",
+    ]),
+    (4, "Text and full-text indexes for title and entity name search", [
+        "CREATE TEXT INDEX document_title_text IF NOT EXISTS FOR (d:Document) ON (d.title)",
+    ] + [
+        f"CREATE TEXT INDEX {label.lower()}_id_text IF NOT EXISTS FOR (n:{label}) ON (n.id)"
+        for label in ENTITY_LABELS
+    ] + [
+        f"CREATE FULLTEXT INDEX entity_names IF NOT EXISTS FOR (n:{'|'.join(ENTITY_LABELS)}) ON EACH [n.id]",
+        "CREATE FULLTEXT INDEX document_titles IF NOT EXISTS FOR (d:Document) ON EACH [d.title]",
+    ]),
+    (5, "Uniqueness constraint on the GraphMeta node the API reads cache versions from", [
+        "CREATE CONSTRAINT graph_meta_id IF NOT EXISTS FOR (m:GraphMeta) REQUIRE m.id IS UNIQUE",
+    ]),
+    (6, "Composite index backing the (date, id) keyset pagination of /articles", [
+        "CREATE INDEX document_date_id IF NOT EXISTS FOR (d:Document) ON (d.date, d.id)",
+    ]),
+    (7, "Index on the GraphChange log the graph projection refreshes from", [
+        "CREATE INDEX graph_change_version IF NOT EXISTS FOR (c:GraphChange) ON (c.version)",
+    ]),
+    (8, "Daily sentiment aggregates per entity, indexed for /analysis/sentiment/timeline", [
+        "CREATE INDEX sentiment_daily_entity_date IF NOT EXISTS FOR (s:SentimentDaily) ON (s.entity, s.date)",
+        backfill_sentiment_aggregates,
+    ]),
+    (9, "Page /articles on (sort_date, id) so that undated documents stay reachable", [
+        "CREATE INDEX document_sort_date_id IF NOT EXISTS FOR (d:Document) ON (d.sort_date, d.id)",
+        _backfill_sort_dates,
+        "DROP INDEX document_date_id IF EXISTS",
+    ]),
+    (10, "Index on Document.source, which re-ingestion looks earlier versions of an article up by", [
+        "CREATE INDEX document_source IF NOT EXISTS FOR (d:Document) ON (d.source)",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def current_version(query) -> int:
+    rows = query("MATCH (m:SchemaMigration) RETURN max(m.version) AS version")
+    return (rows[0]["version"] if rows else None) or 0
+
+def migrate(query, target: int = LATEST_VERSION) -> list:
+    """
+    Applies every migration newer than the recorded version, up to `target`.
+
+    Args:
+        query: A callable running Cypher in auto-commit transactions, e.g. GraphDB.query.
+            Schema statements cannot share a transaction with data writes.
+
+    Returns:
+        list[int]: The versions applied.
+    """
+    version = current_version(query)
+    applied = []
+    for migration_version, description, steps in MIGRATIONS:
+        if migration_version <= version or migration_version > target:
+            continue
+        print(f"Applying schema migration {migration_version}: {description}")
+        try:
+            for step in steps:
+                if callable(step):
+                    step(query)
+                else:
+                    query(step)
+        except Exception as e:
+            # Typically a uniqueness constraint over existing duplicates; run
+            # `python -m src.entity_index merge` and migrate again.
+            print(f"Schema migration {migration_version} failed: {e}")
+            raise
+        query(
+            "MERGE (m:SchemaMigration {version: $version}) SET m.description = $description, m.applied_at = datetime()",
+            {"version": migration_version, "description": description},
+        )
+        applied.append(migration_version)
+    if applied:
+        # Index population is asynchronous; wait until the new indexes are ONLINE
+        query("CALL db.awaitIndexes(300)")
+    return applied
+
+# --- Index usage checks ---
+
+# Plan operators that read through an index rather than scanning a label or every node
+INDEX_OPERATORS = {
+    "NodeIndexSeek", "NodeUniqueIndexSeek", "NodeIndexSeekByRange", "NodeUniqueIndexSeekByRange",
+    "MultiNodeIndexSeek", "NodeIndexContainsScan", "NodeIndexEndsWithScan", "NodeIndexScan",
+    "PartitionedNodeIndexSeek", "PartitionedNodeIndexSeekByRange", "PartitionedNodeIndexScan",
+}
+SCAN_OPERATORS = {"AllNodesScan", "NodeByLabelScan", "PartitionedAllNodesScan", "PartitionedNodeByLabelScan"}
+
+def hot_queries() -> list:
+    """Returns (name, query, parameters) for the API queries that must be index-backed."""
+    return [
+        ("/articles?tiers", *build_articles_query(tiers=["A"])),
+        ("/articles?news_status", *build_articles_query(news_status=["Confirmed News"])),
+        ("/articles?date_range", *build_articles_query(date_range="30d")),
+        ("/articles?cursor", *build_articles_query(after=("2025-01-01", ""))),
+        ("/articles/mentions", ARTICLE_MENTIONS_QUERY, {"title": ""}),
+        ("/article/content", ARTICLE_CONTENT_QUERY, {"title": ""}),
+        ("/analysis/companies", ANALYSIS_SENTIMENT_QUERY, {"titles": [""]}),
+        ("entity by id", "MATCH (c:Company {id: $id}) RETURN c", {"id": ""}),
+        ("/analysis/sentiment/timeline", TIMELINE_QUERY, {"entity": "", "start": "", "end": "", "label": None}),
+    ]
+
+def _operators(plan) -> list:
+    """Flattens a plan tree (the dict from ResultSummary.plan) into operator names."""
+    if not plan:
+        return []
+    name = plan.get("operatorType", "").split("@")[0]
+    operators = [name]
+    for child in plan.get("children", []):
+        operators.extend(_operators(child))
+    return operators
+
+def check_index_usage(explain, queries=None) -> list:
+    """
+    EXPLAINs each hot query and checks that it starts from an index instead of a scan.
+
+    Args:
+        explain: A callable returning the plan of a query, e.g. GraphDB.explain.
+
+    Returns:
+        list[dict]: {"name", "ok", "operators"} per query.
+    """
+    results = []
+    for name, query, parameters in queries or hot_queries():
+        operators = _operators(explain(query, parameters))
+        uses_index = any(op in INDEX_OPERATORS for op in operators)
+        scans = [op for op in operators if op in SCAN_OPERATORS]
+        results.append({"name": name, "ok": uses_index and not scans, "operators": operators})
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Neo4j schema migrations and index checks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="Apply pending migrations.")
+    commands.add_parser("status", help="Show applied and pending migrations.")
+    commands.add_parser("check", help="Verify that the hot API queries use index seeks.")
+    args = parser.parse_args(argv)
+
+    from src.graph_db import db
+
+    try:
+        if args.command == "migrate":
+            applied = migrate(db.query)
+            print(f"Applied migrations: {applied}" if applied else f"Schema is up to date (version {LATEST_VERSION}).")
+        elif args.command == "status":
+            version = current_version(db.query)
+            for migration_version, description, _ in MIGRATIONS:
+                state = "applied" if migration_version <= version else "pending"
+                print(f"{migration_version:3d} {state:8s} {description}")
+        elif args.command == "check":
+            results = check_index_usage(db.explain)
+            for result in results:
+                print(f"{'OK  ' if result['ok'] else 'SCAN'} {result['name']}: {' -> '.join(result['operators'])}")
+            return 0 if all(result["ok"] for result in results) else 1
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
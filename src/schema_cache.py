@@ -0,0 +1,91 @@
+"""
+Cached, compact graph schema for Text2Cypher prompts.
+
+`apoc.meta.schema()` samples the whole graph, so the API calls it once and keeps
+the result until the TTL expires or ingestion bumps the GraphMeta schema_version
+(see src/graph_meta.py). The APOC map is rendered as a few lines of
+pattern-style text, which is what the LLM needs and a fraction of the tokens.
+"""
+import time
+import asyncio
+from src.config import SCHEMA_CACHE_TTL
+from src.graph_meta import INTERNAL_LABELS
+
+def _properties(properties: dict) -> str:
+    return ", ".join(sorted(properties or {}))
+
+def format_schema(schema: dict) -> str:
+    """
+    Renders a schema as compact text, e.g.
+
+        Nodes:
+        Company(id, description)
+        Relationships:
+        (:Company)-[:INVESTS_IN]->(:Company)
+
+    Accepts both the apoc.meta.schema() map and the labels/relationship types
+    fallback of GraphDB.get_schema.
+    """
+    if not schema:
+        return ""
+    if "node_labels" in schema:
+        labels = [label for label in schema["node_labels"] if label not in INTERNAL_LABELS]
+        return f"Node labels: {', '.join(sorted(labels))}\nRelationship types: {', '.join(sorted(schema['relationship_types']))}"
+
+    nodes = []
+    patterns = []
+    relationship_properties = {
+        name: _properties(meta.get("properties")) for name, meta in schema.items() if meta.get("type") == "relationship"
+    }
+    for label, meta in sorted(schema.items()):
+        if meta.get("type") != "node" or label in INTERNAL_LABELS:
+            continue
+        nodes.append(f"{label}({_properties(meta.get('properties'))})")
+        for rel_type, rel in sorted((meta.get("relationships") or {}).items()):
+            # Each relationship appears on both ends; keep the outgoing side only
+            if rel.get("direction") != "out":
+                continue
+            targets = "|".join(sorted(t for t in rel.get("labels", []) if t not in INTERNAL_LABELS))
+            properties = relationship_properties.get(rel_type)
+            properties = f" {{{properties}}}" if properties else ""
+            patterns.append(f"(:{label})-[:{rel_type}{properties}]->(:{targets})")
+    return "Nodes:\n" + "\n".join(nodes) + "\nRelationships:\n" + "\n".join(patterns)
+
+class SchemaCache:
+    """
+    Holds the formatted schema for `ttl` seconds, or until the graph's schema_version changes.
+
+    Args:
+        fetch_schema: Async callable returning the raw schema, e.g. AsyncGraphDB.get_schema.
+        versions: A GraphVersions instance.
+        ttl (float): Seconds before the schema is fetched again regardless of the version.
+    """
+
+    def __init__(self, fetch_schema, versions, ttl: float = SCHEMA_CACHE_TTL):
+        self._fetch_schema = fetch_schema
+        self._versions = versions
+        self.ttl = ttl
+        self._text = None
+        self._version = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self.fetches = 0
+
+    def _is_fresh(self, version) -> bool:
+        return self._text is not None and version == self._version and time.monotonic() - self._fetched_at < self.ttl
+
+    async def get(self) -> str:
+        version = (await self._versions.get())["schema_version"]
+        if self._is_fresh(version):
+            return self._text
+        async with self._lock:
+            # Another request may have refreshed the schema while we waited
+            if not self._is_fresh(version):
+                self._text = format_schema(await self._fetch_schema())
+                self._version = version
+                self._fetched_at = time.monotonic()
+                self.fetches += 1
+        return self._text
+
+    def invalidate(self):
+        self._text = None
@@ -0,0 +1,114 @@
+"""
+Daily sentiment aggregates per entity, maintained by ingestion.
+
+Every MENTIONS relationship is counted in one `(:SentimentDaily {entity, label,
+date, tier})` node: the mentioned entity's id and label, the document's day and
+publisher tier. Each node holds the positive, negative and neutral counts (a
+missing sentiment counts as neutral). The batch writer updates the nodes of the
+mentions it writes in the same transaction. Each mention remembers the bucket it
+was counted in (`m.sentiment_bucket`), so re-ingesting an article moves its counts
+instead of adding them twice. Merging duplicate entities (src/entity_index.py)
+drops the aggregates kept under the merged ids and counts the merged node's
+mentions again under its canonical id.
+
+/analysis/sentiment/timeline reads an entity's series with one range seek on the
+(entity, date) index (see src/schema.py) instead of aggregating raw mentions.
+"""
+from collections import OrderedDict
+
+SENTIMENTS = ("positive", "negative", "neutral")
+
+# Continues a query that matched (d:Document)-[m:MENTIONS]->(n). Moves each mention whose
+# bucket changed out of its previous SentimentDaily node (if any) and into the new one.
+_UPDATE_AGGREGATES = """
+WITH m, n, [left(toString(coalesce(d.date, '')), 10), coalesce(d.publisher_tier, 'C'), coalesce(m.sentiment, 'Neutral')] AS bucket
+WHERE m.sentiment_bucket IS NULL OR m.sentiment_bucket <> bucket
+WITH m, n, bucket, m.sentiment_bucket AS previous
+SET m.sentiment_bucket = bucket
+WITH n, [update IN [[previous, -1], [bucket, 1]] WHERE update[0] IS NOT NULL AND update[0][0] <> ''] AS updates
+UNWIND updates AS update
+WITH n, update[0] AS bucket, update[1] AS delta
+MERGE (s:SentimentDaily {entity: n.id, label: COALESCE(labels(n)[0], 'Unknown'), date: bucket[0], tier: bucket[1]})
+ON CREATE SET s.positive = 0, s.negative = 0, s.neutral = 0
+SET s.positive = s.positive + CASE bucket[2] WHEN 'Positive' THEN delta ELSE 0 END,
+    s.negative = s.negative + CASE bucket[2] WHEN 'Negative' THEN delta ELSE 0 END,
+    s.neutral = s.neutral + CASE WHEN bucket[2] IN ['Positive', 'Negative'] THEN 0 ELSE delta END
+"""
+
+# Runs in the batch writer's transaction, after DOCUMENTS_QUERY
+UPDATE_QUERY = """
+UNWIND $document_ids AS document_id
+MATCH (d:Document {id: document_id})-[m:MENTIONS]->(n)
+""" + _UPDATE_AGGREGATES + """
+RETURN count(*) AS updates
+"""
+
+# Counts the mentions written before the aggregates existed; idempotent like UPDATE_QUERY
+BACKFILL_QUERY = """
+MATCH (d:Document)-[m:MENTIONS]->(n)
+CALL {
+    WITH d, m, n
+""" + _UPDATE_AGGREGATES + """
+} IN TRANSACTIONS OF 1000 ROWS
+"""
+
+TIMELINE_QUERY = """
+MATCH (s:SentimentDaily)
+WHERE s.entity = $entity AND s.date >= $start AND s.date <= $end
+AND ($label IS NULL OR s.label = $label)
+RETURN s.date AS date, s.tier AS tier, s.positive AS positive, s.negative AS negative, s.neutral AS neutral
+ORDER BY date, tier
+"""
+
+# Runs in the entity merge transaction, after the duplicates of a group were merged into $node
+MERGED_ENTITY_QUERY = """
+MATCH (s:SentimentDaily {label: $type}) WHERE s.entity IN $ids
+DELETE s
+WITH count(*) AS dropped
+MATCH (d:Document)-[m:MENTIONS]->(n) WHERE elementId(n) = $node
+SET m.sentiment_bucket = null
+WITH d, m, n
+""" + _UPDATE_AGGREGATES + """
+RETURN count(*) AS updates
+"""
+
+# Runs before documents are deleted: takes their counted mentions back out of the aggregates
+RETRACT_QUERY = """
+UNWIND $document_ids AS document_id
+MATCH (d:Document {id: document_id})-[m:MENTIONS]->(n)
+WITH n, m.sentiment_bucket AS bucket
+WHERE bucket IS NOT NULL AND bucket[0] <> ''
+MATCH (s:SentimentDaily {entity: n.id, label: COALESCE(labels(n)[0], 'Unknown'), date: bucket[0], tier: bucket[1]})
+SET s.positive = s.positive - CASE bucket[2] WHEN 'Positive' THEN 1 ELSE 0 END,
+    s.negative = s.negative - CASE bucket[2] WHEN 'Negative' THEN 1 ELSE 0 END,
+    s.neutral = s.neutral - CASE WHEN bucket[2] IN ['Positive', 'Negative'] THEN 0 ELSE 1 END
+RETURN count(*) AS updates
+"""
+
+def backfill(query):
+    """Migration step: aggregates the mentions already in the graph."""
+    query(BACKFILL_QUERY)
+
+def timeline_series(rows) -> list:
+    """
+    Folds (date, tier, positive, negative, neutral) rows into one point per day:
+
+        {"date", "positive", "negative", "neutral", "total",
+         "tiers": {tier: {"positive", "negative", "neutral"}}}
+
+    Days whose counts are all zero (every mention moved elsewhere) are left out.
+    """
+    days = OrderedDict()
+    for row in rows:
+        counts = {sentiment: row[sentiment] or 0 for sentiment in SENTIMENTS}
+        if not any(counts.values()):
+            continue
+        day = days.get(row["date"])
+        if day is None:
+            day = days[row["date"]] = {"date": row["date"], **{sentiment: 0 for sentiment in SENTIMENTS}, "total": 0, "tiers": {}}
+        tier = day["tiers"].setdefault(row["tier"], {sentiment: 0 for sentiment in SENTIMENTS})
+        for sentiment, count in counts.items():
+            day[sentiment] += count
+            day["total"] += count
+            tier[sentiment] += count
+    return list(days.values())
@@ -6,7 +6,8 @@ import sys
 # Add the project root to the path so we can import src modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.ingest import extract_info, save_to_neo4j
+from src.ingest import extract_info, save_to_neo4j, EXTRACTION_MODES
+from src.config import EXTRACTION_MODE
 
 st.set_page_config(page_title="Relatiq-AI Ingestion", layout="wide")
 
@@ -23,6 +24,10 @@ if "extraction_results" not in st.session_state:
 
 # Text Input
 article_text = st.text_area("News Article Content", height=300)
+extraction_mode = st.radio(
+    "Extraction Mode", EXTRACTION_MODES, index=EXTRACTION_MODES.index(EXTRACTION_MODE), horizontal=True,
+    help="chained: separate metadata, graph and sentiment calls. fused: a single LLM call."
+)
 
 if st.button("Extract Article"):
     if not article_text:
@@ -31,7 +36,7 @@ if st.button("Extract Article"):
         with st.spinner("Analyzing... This may take a moment."):
             try:
                 # Run the async extract_info function
-                results = asyncio.run(extract_info(article_text))
+                results = asyncio.run(extract_info(article_text, mode=extraction_mode))
                 st.session_state.extraction_results = results
                 st.success("Analysis Complete! Review the results below and click 'Confirm Ingestion' to save.")
             except Exception as e:
@@ -0,0 +1,79 @@
+"""
+Load test for the read endpoints of a running API server.
+
+Sends the same mix of requests sequentially and then with N concurrent clients,
+and prints throughput and latency for both. With the async Neo4j driver,
+concurrent throughput should scale with the number of clients instead of
+collapsing to one query at a time.
+
+    uvicorn src.api.main:app --port 8000
+    python tests/load_test_api.py --requests 200 --concurrency 16
+"""
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import requests.adapters
+
+BASE_URL = "http://localhost:8000"
+
+def build_requests(base_url: str) -> list:
+    """Returns (method, url, params) for a representative mix of read endpoints."""
+    mix = [
+        ("GET", f"{base_url}/sectors", None),
+        ("GET", f"{base_url}/articles", {"limit": 50}),
+        ("GET", f"{base_url}/graph/network", None),
+    ]
+    articles = requests.get(f"{base_url}/articles", params={"limit": 3}).json()
+    titles = [a["title"] for a in articles]
+    if titles:
+        # The path query behind /analysis/companies is the slowest read
+        mix.append(("GET", f"{base_url}/analysis/companies", {"article_titles": titles}))
+        mix.append(("GET", f"{base_url}/articles/mentions", {"title": titles[0]}))
+    return mix
+
+def run(mix: list, total: int, concurrency: int) -> dict:
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+
+    def send(i):
+        method, url, params = mix[i % len(mix)]
+        started = time.perf_counter()
+        response = session.request(method, url, params=params)
+        return time.perf_counter() - started, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": sum(1 for _, status in results if status >= 400),
+        "throughput": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API read endpoints.")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per run.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients in the second run.")
+    args = parser.parse_args()
+
+    mix = build_requests(args.base_url)
+    print(f"Request mix: {', '.join(url.replace(args.base_url, '') for _, url, _ in mix)}")
+    sequential = run(mix, args.requests, 1)
+    concurrent = run(mix, args.requests, args.concurrency)
+    for result in (sequential, concurrent):
+        print(f"concurrency {result['concurrency']:3d}: {result['throughput']:7.1f} req/s, "
+              f"p50 {result['p50_ms']:7.1f} ms, p95 {result['p95_ms']:7.1f} ms, {result['errors']} errors")
+    print(f"Speedup with {args.concurrency} clients: {concurrent['throughput'] / sequential['throughput']:.1f}x")
+
+if __name__ == "__main__":
+    main()
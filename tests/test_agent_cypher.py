@@ -0,0 +1,133 @@
+import os
+import sys
+import asyncio
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.api.agent_cypher import (
+    CypherCache, UnsafeCypherError, normalize_question, clean_cypher, inject_limit, check_explain, guard,
+)
+
+class FakeVersions:
+    def __init__(self):
+        self.schema_version = 1
+
+    async def get(self):
+        return {"data_version": 1, "schema_version": self.schema_version}
+
+class Summary:
+    def __init__(self, query_type="r", plan=None):
+        self.query_type = query_type
+        self.plan = plan or {"operatorType": "ProduceResults@neo4j", "args": {"EstimatedRows": 10.0}, "children": []}
+
+def plan(operator, rows, *children):
+    return {"operatorType": f"{operator}@neo4j", "args": {"EstimatedRows": rows}, "children": list(children)}
+
+def test_normalize_question():
+    assert normalize_question("  Who   invests in Acme?? ") == "who invests in acme"
+    assert normalize_question("Who invests in ACME.") == normalize_question("who invests in acme")
+    assert clean_cypher("```cypher\nMATCH (n) RETURN n;\n```") == "MATCH (n) RETURN n"
+
+def test_inject_limit():
+    assert inject_limit("MATCH (n) RETURN n", 100) == "MATCH (n) RETURN n\nLIMIT 100"
+    assert inject_limit("MATCH (n) RETURN n LIMIT 5", 100) == "MATCH (n) RETURN n LIMIT 5"
+    assert inject_limit("MATCH (n) RETURN n limit 5000", 100) == "MATCH (n) RETURN n LIMIT 100"
+    union = inject_limit("MATCH (a:Company) RETURN a.id AS id UNION MATCH (b:Person) RETURN b.id AS id", 100)
+    assert union.startswith("CALL {") and union.endswith("RETURN *\nLIMIT 100")
+
+def test_check_explain_rejects_writes_and_cartesian_products():
+    check_explain(Summary())
+    check_explain(Summary(plan=plan("ProduceResults", 1.0, plan("CartesianProduct", 1.0))))
+    for summary in (
+        Summary(query_type="rw"),
+        Summary(query_type="w"),
+        Summary(query_type="s"),
+        Summary(plan=plan("ProduceResults", 1e6, plan("CartesianProduct", 1e6, plan("NodeByLabelScan", 1e3)))),
+    ):
+        try:
+            check_explain(summary, max_cartesian_rows=10000)
+        except UnsafeCypherError:
+            continue
+        raise AssertionError(f"{summary.query_type} query with plan {summary.plan} was accepted")
+
+def test_guard_explains_the_limited_query():
+    explained = []
+
+    async def explain(query):
+        explained.append(query)
+        return Summary()
+
+    assert asyncio.run(guard("MATCH (n) RETURN n", explain, limit=10)) == "MATCH (n) RETURN n\nLIMIT 10"
+    assert explained == ["MATCH (n) RETURN n\nLIMIT 10"]
+
+def test_repeated_questions_skip_generation():
+    versions = FakeVersions()
+    cache = CypherCache(versions, max_entries=2)
+    generated = []
+
+    async def generate():
+        generated.append(1)
+        return f"MATCH (n) RETURN n LIMIT {len(generated)}"
+
+    async def validate(cypher):
+        return cypher
+
+    async def run():
+        first = await cache.get_or_generate("Who invests in Acme?", generate, validate)
+        again = await cache.get_or_generate("who invests in  acme", generate, validate)
+        assert first == again
+        assert len(generated) == 1
+        # A schema change discards the cached Cypher
+        versions.schema_version = 2
+        await cache.get_or_generate("who invests in acme", generate, validate)
+        assert len(generated) == 2
+
+    asyncio.run(run())
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+    assert "relatiq_cypher_cache_hits_total 1" in cache.render_prometheus()
+
+def test_rejected_queries_are_not_cached():
+    cache = CypherCache(FakeVersions())
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        return "CREATE (n:Company) RETURN n"
+
+    async def validate(cypher):
+        raise UnsafeCypherError("write")
+
+    async def run():
+        for _ in range(2):
+            try:
+                await cache.get_or_generate("create a company", generate, validate)
+            except UnsafeCypherError:
+                pass
+            else:
+                raise AssertionError("the write query was accepted")
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert cache.stats()["rejected"] == 2 and cache.stats()["entries"] == 0
+
+def test_concurrent_misses_share_one_generation():
+    cache = CypherCache(FakeVersions())
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "MATCH (n) RETURN n LIMIT 1"
+
+    async def validate(cypher):
+        return cypher
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_generate("same question", generate, validate) for _ in range(5)))
+
+    assert len(set(asyncio.run(run()))) == 1
+    assert len(calls) == 1
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")
@@ -30,6 +30,32 @@ def test_articles():
     except Exception as e:
         print(f"Failed to fetch articles: {e}")
 
+def test_articles_pagination():
+    print("\nTesting /articles pagination...")
+    try:
+        seen = []
+        cursor = None
+        for page in range(3):
+            params = {"limit": 5}
+            if cursor:
+                params["cursor"] = cursor
+            response = requests.get(f"{BASE_URL}/articles", params=params)
+            response.raise_for_status()
+            seen.extend(a["title"] for a in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            print(f"Page {page + 1}: {len(response.json())} articles, next cursor: {cursor}")
+            if not cursor:
+                break
+        first_page = requests.get(f"{BASE_URL}/articles", params={"limit": len(seen)}).json()
+        if [a["title"] for a in first_page] == seen:
+            print("SUCCESS: Pages match a single request of the same size")
+        else:
+            print("FAILURE: Pages differ from a single request of the same size")
+        bad = requests.get(f"{BASE_URL}/articles", params={"cursor": "not-a-cursor"})
+        print(f"Malformed cursor - Status: {bad.status_code} (expected 400)")
+    except Exception as e:
+        print(f"Failed to paginate articles: {e}")
+
 def test_network_filters():
     print("\nTesting /graph/network with filters...")
     try:
@@ -54,4 +80,5 @@ def test_network_filters():
 if __name__ == "__main__":
     test_sectors()
     test_articles()
+    test_articles_pagination()
     test_network_filters()
@@ -0,0 +1,46 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.queries import build_articles_query, encode_cursor, decode_cursor
+
+def test_cursor_round_trip():
+    for date, document_id in [("2025-01-31", "doc-1"), ("", "undated/é"), ("2025-01-31T10:00:00", "")]:
+        cursor = encode_cursor(date, document_id)
+        assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+        assert decode_cursor(cursor) == (date, document_id)
+
+def test_malformed_cursors_are_rejected():
+    for cursor in ["not-a-cursor", encode_cursor("2025-01-01", "x")[:-3], "WzEsIDJd", "bnVsbA"]:
+        # Garbage, truncated, [1, 2] and null
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            continue
+        raise AssertionError(f"{cursor} was accepted")
+
+def test_first_page_includes_undated_documents():
+    query, params = build_articles_query(limit=10)
+    assert params["limit"] == 11
+    assert "d.date IS NOT NULL" not in query
+    assert "WHERE d.sort_date IS NOT NULL" in query
+    assert "ORDER BY d.sort_date DESC, d.id DESC" in query
+    assert "after_date" not in params
+
+def test_cursor_seeks_past_the_previous_page():
+    query, params = build_articles_query(limit=5, after=decode_cursor(encode_cursor("", "doc-9")))
+    assert (params["after_date"], params["after_id"]) == ("", "doc-9")
+    assert "d.sort_date <= $after_date AND (d.sort_date < $after_date OR d.id < $after_id)" in query
+
+def test_filters_add_parameters():
+    query, params = build_articles_query(date_range="30d", tiers=["A"], news_status=["Confirmed News"], sectors=["Tech"])
+    assert "d.date >= $threshold_date" in query and len(params["threshold_date"]) == 10
+    assert params["tiers"] == ["A"] and params["statuses"] == ["Confirmed News"] and params["sectors"] == ["Tech"]
+
+    query, params = build_articles_query(entity_search="acme")
+    assert "entity_query" in params and "n IN entities" in query
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")
@@ -0,0 +1,160 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from hashlib import md5
+from langchain_core.documents import Document
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from src.batch_writer import (
+    Neo4jBatchWriter, DOCUMENTS_QUERY, REPLACED_DOCUMENTS_QUERY, DELETE_DOCUMENTS_QUERY,
+    _document_rows, _written_schema,
+)
+from src.sentiment_timeline import RETRACT_QUERY
+from src.ingest import EntitySentiment
+
+def extraction(metadata=None):
+    acme, globex = Node(id="Acme", type="Company"), Node(id="Globex", type="Company", properties={"ticker": "GBX"})
+    ceo = Node(id="Jane Doe", type="Person")
+    graph_doc = GraphDocument(
+        nodes=[acme, globex, ceo],
+        relationships=[
+            Relationship(source=acme, target=globex, type="partners with", properties={"source": "a.txt"}),
+            Relationship(source=ceo, target=acme, type="WORKS_AT"),
+        ],
+        source=Document(page_content="Acme partners with Globex.", metadata=metadata or {}),
+    )
+    return {
+        "source": "a.txt",
+        "graph_documents": [graph_doc],
+        "sentiment": [EntitySentiment(entity_name="Acme", sentiment="Positive")],
+    }
+
+def test_document_rows():
+    documents, relationships = _document_rows(extraction({"id": "doc-1", "title": "Deal"}))
+    assert documents == [{
+        "id": "doc-1",
+        "text": "Acme partners with Globex.",
+        "metadata": {"id": "doc-1", "title": "Deal"},
+        "nodes": [
+            {"id": "Acme", "type": "Company", "properties": {}, "sentiment": "Positive"},
+            {"id": "Globex", "type": "Company", "properties": {"ticker": "GBX"}, "sentiment": None},
+            {"id": "Jane Doe", "type": "Person", "properties": {}, "sentiment": None},
+        ],
+    }]
+    assert relationships == [
+        {"source": "Acme", "source_label": "Company", "target": "Globex", "target_label": "Company",
+         "type": "PARTNERS_WITH", "properties": {"source": "a.txt"}},
+        {"source": "Jane Doe", "source_label": "Person", "target": "Acme", "target_label": "Company",
+         "type": "WORKS_AT", "properties": {}},
+    ]
+
+def test_document_id_defaults_to_the_text_hash():
+    documents, _ = _document_rows(extraction())
+    assert documents[0]["id"] == md5("Acme partners with Globex.".encode("utf-8")).hexdigest()
+    assert documents[0]["metadata"]["id"] == documents[0]["id"]
+    assert _document_rows({"graph_documents": None}) == ([], [])
+
+def test_written_schema():
+    documents, relationships = _document_rows(extraction({"id": "doc-1"}))
+    assert _written_schema(documents, relationships) == (
+        {"Document", "Company", "Person"}, {"MENTIONS", "PARTNERS_WITH", "WORKS_AT"}
+    )
+    # A document without entities writes no MENTIONS
+    assert _written_schema([{"id": "doc-2", "nodes": []}], []) == ({"Document"}, set())
+    assert _written_schema([], []) == (set(), set())
+
+class Result:
+    def __init__(self, record=None):
+        self.record = record
+
+    def single(self):
+        return self.record
+
+    def consume(self):
+        pass
+
+class FakeTransaction:
+    def __init__(self, replaced=()):
+        self.replaced = list(replaced)
+        self.runs = []
+
+    def run(self, query, **parameters):
+        self.runs.append((query, parameters))
+        if query == REPLACED_DOCUMENTS_QUERY:
+            return Result({"ids": self.replaced})
+        if "RETURN m.data_version" in query:
+            return Result({"data_version": 1, "schema_version": 1})
+        return Result({"nodes": []})
+
+    def queries(self):
+        return [query for query, _ in self.runs]
+
+DOCUMENTS = [{"id": "new-hash", "text": "edited", "metadata": {"id": "new-hash", "source": "data/a.txt"}, "nodes": []}]
+
+def test_changed_source_replaces_its_previous_document():
+    tx = FakeTransaction(replaced=["old-hash"])
+    Neo4jBatchWriter._write_transaction(tx, DOCUMENTS, [], DOCUMENTS)
+    queries = tx.queries()
+    # The old mentions are uncounted before the old Document is deleted, all before the new one is written
+    assert queries.index(REPLACED_DOCUMENTS_QUERY) < queries.index(RETRACT_QUERY) < queries.index(DELETE_DOCUMENTS_QUERY) < queries.index(DOCUMENTS_QUERY)
+    assert dict(tx.runs)[REPLACED_DOCUMENTS_QUERY]["document_ids"] == ["new-hash"]
+    assert dict(tx.runs)[DELETE_DOCUMENTS_QUERY] == {"document_ids": ["old-hash"]}
+
+def test_unchanged_source_deletes_nothing():
+    tx = FakeTransaction()
+    Neo4jBatchWriter._write_transaction(tx, DOCUMENTS, [], DOCUMENTS)
+    assert DELETE_DOCUMENTS_QUERY not in tx.queries() and RETRACT_QUERY not in tx.queries()
+
+def test_sources_are_only_replaced_when_asked():
+    # e.g. "Manual Input" from the Streamlit app names many different articles
+    tx = FakeTransaction(replaced=["old-hash"])
+    Neo4jBatchWriter._write_transaction(tx, DOCUMENTS, [])
+    assert REPLACED_DOCUMENTS_QUERY not in tx.queries()
+
+class FakeDriver:
+    def __init__(self):
+        self.sessions = []
+        self.transactions = []
+
+    def session(self, **config):
+        self.sessions.append(config)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, work, *args):
+        tx = FakeTransaction(replaced=["yesterday"])
+        self.transactions.append(tx)
+        return work(tx, *args)
+
+def test_writer_uses_the_given_driver_and_database():
+    driver = FakeDriver()
+    writer = Neo4jBatchWriter(driver, database="news", batch_size=2)
+    written = writer.write([{"source": f"data/{i}.txt", "graph_documents": []} for i in range(3)])
+    assert written == ["data/0.txt", "data/1.txt", "data/2.txt"]
+    assert driver.sessions == [{"database": "news"}, {"database": "news"}]
+
+def test_only_marked_articles_replace_earlier_documents():
+    # e.g. a JSONL record that only names its publisher must not delete other Reuters articles
+    driver = FakeDriver()
+    marked = extraction({"id": "doc-1", "source": "data/a.txt"})
+    marked["replace_source"] = True
+    unmarked = extraction({"id": "doc-2", "source": "Reuters"})
+    Neo4jBatchWriter(driver, batch_size=10).write([marked, unmarked])
+
+    runs = dict(driver.transactions[0].runs)
+    assert [document["id"] for document in runs[REPLACED_DOCUMENTS_QUERY]["documents"]] == ["doc-1"]
+    assert runs[REPLACED_DOCUMENTS_QUERY]["document_ids"] == ["doc-1", "doc-2"]
+
+    driver = FakeDriver()
+    Neo4jBatchWriter(driver).write([unmarked])
+    assert REPLACED_DOCUMENTS_QUERY not in driver.transactions[0].queries()
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")
@@ -0,0 +1,77 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from langchain_core.documents import Document
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from src.ingest import split_into_chunks, _merge_sentiments, _merge_graph_documents, EntitySentiment
+
+def sentiments(*pairs):
+    return [EntitySentiment(entity_name=name, sentiment=sentiment) for name, sentiment in pairs]
+
+def merged(*chunk_pairs):
+    return {s.entity_name: s.sentiment for s in _merge_sentiments([sentiments(*pairs) for pairs in chunk_pairs])}
+
+def test_short_text_is_one_chunk():
+    text = "First paragraph.\n\nSecond paragraph."
+    assert split_into_chunks(text, max_chars=1000) == [text]
+    assert split_into_chunks(text * 100, max_chars=0) == [text * 100]
+
+def test_chunks_follow_paragraph_boundaries():
+    paragraphs = [f"Paragraph {i} " + "x" * 30 for i in range(6)]
+    chunks = split_into_chunks("\n\n".join(paragraphs), max_chars=100)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    # No paragraph is cut, and they keep their order
+    assert [p for chunk in chunks for p in chunk.split("\n\n")] == paragraphs
+
+def test_oversize_paragraphs_are_split_on_sentences_then_hard_split():
+    sentence = "Acme reported record profits this quarter."
+    long_paragraph = " ".join([sentence] * 5)
+    chunks = split_into_chunks(f"Intro.\n\n{long_paragraph}", max_chars=50)
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert sum(chunk.count(sentence) for chunk in chunks) == 5
+
+    word = "y" * 120
+    chunks = split_into_chunks(word, max_chars=50)
+    assert [len(chunk) for chunk in chunks] == [50, 50, 20]
+    assert "".join(chunks) == word
+
+def test_merge_sentiments_majority_vote():
+    result = merged(
+        [("Acme", "Positive"), ("Globex", "Negative")],
+        [("Acme", "Positive"), ("Globex", "Neutral")],
+        [("Acme", "Negative"), ("Globex", "Negative")],
+    )
+    assert result == {"Acme": "Positive", "Globex": "Negative"}
+
+def test_merge_sentiments_ties():
+    # Positive and Negative tied: they cancel out
+    assert merged([("Acme", "Positive")], [("Acme", "Negative")]) == {"Acme": "Neutral"}
+    # A tie with Neutral goes to the polar side
+    assert merged([("Acme", "Positive")], [("Acme", "Neutral")]) == {"Acme": "Positive"}
+    assert merged([("Acme", "Neutral")], [("Acme", "Negative")]) == {"Acme": "Negative"}
+    # A three-way tie cancels out as well
+    assert merged([("Acme", "Positive")], [("Acme", "Negative")], [("Acme", "Neutral")]) == {"Acme": "Neutral"}
+
+def test_merge_sentiments_ignores_missing_votes():
+    assert merged([("Acme", None)], [("Acme", "Negative")]) == {"Acme": "Negative"}
+    assert merged([("Acme", None)]) == {}
+
+def test_merge_graph_documents_deduplicates_nodes_and_relationships():
+    doc = Document(page_content="text")
+    acme, globex = Node(id="Acme", type="Company"), Node(id="Globex", type="Company")
+    chunks = [
+        GraphDocument(nodes=[acme, globex], relationships=[Relationship(source=acme, target=globex, type="SUPPLIES")], source=doc),
+        GraphDocument(nodes=[Node(id="Acme", type="Company"), Node(id="Acme", type="Product")],
+                      relationships=[Relationship(source=acme, target=globex, type="SUPPLIES")], source=doc),
+    ]
+    merged = _merge_graph_documents(chunks, doc)
+    assert [(node.id, node.type) for node in merged.nodes] == [("Acme", "Company"), ("Globex", "Company"), ("Acme", "Product")]
+    assert len(merged.relationships) == 1
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")
@@ -0,0 +1,92 @@
+import os
+import sys
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.clients import LazyClient, close_clients
+
+class FakeClient:
+    def __init__(self, name="real", fail_on_close=False):
+        self.name = name
+        self.closed = False
+        self.fail_on_close = fail_on_close
+
+    def query(self, text):
+        return f"{self.name}: {text}"
+
+    def close(self):
+        self.closed = True
+        if self.fail_on_close:
+            raise RuntimeError("connection already gone")
+
+def counting_factory(created):
+    def factory():
+        client = FakeClient(f"real{len(created)}")
+        created.append(client)
+        return client
+    return factory
+
+def test_client_is_created_on_first_use_only():
+    created = []
+    client = LazyClient("test", counting_factory(created))
+    assert not client.created and created == []
+    assert client.query("RETURN 1") == "real0: RETURN 1"
+    assert client.query("RETURN 2") == "real0: RETURN 2"
+    assert client.created and len(created) == 1
+
+def test_concurrent_first_use_creates_one_client():
+    created = []
+    client = LazyClient("test", counting_factory(created))
+    threads = [threading.Thread(target=client.get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+
+def test_override_replaces_the_client():
+    created = []
+    client = LazyClient("test", counting_factory(created))
+    client.override(FakeClient("fake"))
+    assert client.query("x") == "fake: x"
+    assert created == []
+
+def test_close_closes_and_recreates_on_next_use():
+    created = []
+    client = LazyClient("test", counting_factory(created))
+    first = client.get()
+    client.close()
+    assert first.closed and not client.created
+    assert client.get() is not first and len(created) == 2
+    # Closing a client that was never created is a no-op
+    LazyClient("unused", counting_factory([])).close()
+
+def test_close_errors_are_reported_not_raised():
+    client = LazyClient("test", lambda: FakeClient(fail_on_close=True))
+    broken = client.get()
+    client.close()
+    assert broken.closed and not client.created
+
+def test_set_factory_closes_the_old_client():
+    client = LazyClient("test", lambda: FakeClient("old"))
+    old = client.get()
+    client.set_factory(lambda: FakeClient("new"))
+    assert old.closed
+    assert client.query("x") == "new: x"
+
+def test_close_clients_closes_every_created_client():
+    clients = [LazyClient(f"test{i}", FakeClient) for i in range(2)]
+    created = clients[0].get()
+    close_clients()
+    assert created.closed
+    assert not any(client.created for client in clients)
+
+def test_dunder_lookups_are_not_forwarded():
+    client = LazyClient("test", FakeClient)
+    assert not hasattr(client, "__len__")
+    assert not client.created
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")
@@ -0,0 +1,100 @@
+import os
+import sys
+import asyncio
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.connections import ConnectionFinder, COMPANIES_QUERY, NEIGHBORS_QUERY
+
+# Acme and Globex share a direct relationship and a document; Initech is two hops from Globex
+EDGES = [
+    ("acme", "globex", "PARTNERS_WITH"),
+    ("doc1", "acme", "MENTIONS"),
+    ("doc1", "globex", "MENTIONS"),
+    ("globex", "tech", "IN_SECTOR"),
+    ("initech", "tech", "IN_SECTOR"),
+    ("hooli", "nowhere", "LOCATED_IN"),
+]
+COMPANIES = {"acme": "Acme", "globex": "Globex", "initech": "Initech", "hooli": "Hooli"}
+
+class FakeGraph:
+    def __init__(self, edges=EDGES, companies=COMPANIES):
+        self.adjacency = {}
+        for source, target, rel_type in edges:
+            self.adjacency.setdefault(source, []).append((target, rel_type))
+            self.adjacency.setdefault(target, []).append((source, rel_type))
+        self.companies = companies
+        self.expanded = []
+
+    async def query(self, query, params=None, name=None):
+        if query == COMPANIES_QUERY:
+            return [{"id": node_id, "name": name} for node_id, name in sorted(self.companies.items())]
+        assert query == NEIGHBORS_QUERY
+        self.expanded.extend(params["ids"])
+        records = []
+        for node_id in params["ids"]:
+            if node_id not in self.adjacency:
+                continue
+            neighbors = self.adjacency[node_id]
+            entities = [list(n) for n in neighbors if not n[0].startswith("doc")]
+            documents = [list(n) for n in neighbors if n[0].startswith("doc")][:params["max_degree"]]
+            records.append({"id": node_id, "neighbors": entities + documents})
+        return records
+
+def find(graph, **options):
+    return asyncio.run(ConnectionFinder(graph.query, **options).find(["any"]))
+
+def test_shortest_paths_first_with_relationship_types():
+    rows = find(FakeGraph())
+    assert rows[0] == {"Company1": "Acme", "Company2": "Globex", "Relationships": ["PARTNERS_WITH"], "Distance": 1}
+    assert {"Company1": "Acme", "Company2": "Globex", "Relationships": ["MENTIONS", "MENTIONS"], "Distance": 2} in rows
+    assert {"Company1": "Globex", "Company2": "Initech", "Relationships": ["IN_SECTOR", "IN_SECTOR"], "Distance": 2} in rows
+    assert {"Company1": "Acme", "Company2": "Initech", "Relationships": ["PARTNERS_WITH", "IN_SECTOR", "IN_SECTOR"], "Distance": 3} in rows
+    assert [row["Distance"] for row in rows] == sorted(row["Distance"] for row in rows)
+    assert not any("Hooli" in (row["Company1"], row["Company2"]) for row in rows)
+
+def test_paths_per_pair_and_max_depth():
+    rows = find(FakeGraph(), paths_per_pair=1)
+    acme_globex = [row for row in rows if (row["Company1"], row["Company2"]) == ("Acme", "Globex")]
+    assert acme_globex == [{"Company1": "Acme", "Company2": "Globex", "Relationships": ["PARTNERS_WITH"], "Distance": 1}]
+
+    rows = find(FakeGraph(), max_depth=2)
+    assert all(row["Distance"] <= 2 for row in rows)
+    assert not any((row["Company1"], row["Company2"]) == ("Acme", "Initech") for row in rows)
+
+def test_paths_are_simple():
+    # A triangle must not yield paths that revisit a node, e.g. acme-globex-acme-globex
+    rows = find(FakeGraph(edges=[("acme", "globex", "A"), ("globex", "initech", "B"), ("initech", "acme", "C")],
+                          companies={"acme": "Acme", "globex": "Globex"}), paths_per_pair=5)
+    assert sorted(row["Relationships"] for row in rows) == [["A"], ["C", "B"]]
+
+def test_nodes_are_expanded_once_across_pairs():
+    graph = FakeGraph()
+    find(graph)
+    assert len(graph.expanded) == len(set(graph.expanded))
+
+def test_caps_and_deadline_stop_the_search():
+    graph = FakeGraph()
+    assert find(graph, timeout=0) == []
+    assert graph.expanded == []
+
+    graph = FakeGraph()
+    rows = find(graph, max_expanded=2)
+    assert len(set(graph.expanded)) <= 2 + 1 # the batch that crosses the cap is still fetched
+    assert all(row["Distance"] <= 2 for row in rows)
+
+    rows = find(FakeGraph(), limit=2)
+    assert len(rows) == 2
+
+def test_document_hubs_do_not_crowd_out_entity_relationships():
+    # Acme is mentioned in more documents than max_degree; its partnership must still be found
+    edges = [(f"doc{i}", "acme", "MENTIONS") for i in range(10)] + [("acme", "globex", "PARTNERS_WITH")]
+    graph = FakeGraph(edges=edges, companies={"acme": "Acme", "globex": "Globex"})
+    rows = find(graph, max_degree=3, max_depth=2)
+    assert rows[0]["Relationships"] == ["PARTNERS_WITH"]
+    expanded_docs = {node for node in graph.expanded if node.startswith("doc")}
+    assert len(expanded_docs) <= 3
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")
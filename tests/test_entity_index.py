@@ -0,0 +1,170 @@
+import os
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from langchain_core.documents import Document
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from src.entity_index import EntityIndex, normalize_key, merge_duplicates, merge_query
+from src.graph_meta import RECORD_WRITE_QUERY, CHANGE_QUERY
+from src.sentiment_timeline import MERGED_ENTITY_QUERY
+
+def test_normalize_key():
+    assert normalize_key("Nestlé SA", "Company") == "nestle"
+    assert normalize_key("AT&T Inc.", "Company") == "atandt"
+    assert normalize_key("McDonald's Corporation", "Company") == "mcdonald"
+    # Suffixes are only stripped from companies, and never down to nothing
+    assert normalize_key("Holdings Inc", "Company") == "holdings"
+    assert normalize_key("Jane Group", "Person") == "janegroup"
+    assert normalize_key("  -- ") == ""
+
+def test_exact_key_matches_resolve_to_the_first_spelling():
+    index = EntityIndex(threshold=0.9)
+    assert index.resolve("Company", "NVIDIA Corporation") == "NVIDIA Corporation"
+    assert index.resolve("Company", "Nvidia") == "NVIDIA Corporation"
+    assert index.resolve("Company", "nvidia corp.") == "NVIDIA Corporation"
+    assert index.aliases("Company", "NVIDIA Corporation") == ["Nvidia", "nvidia corp."]
+    # Types are kept apart
+    assert index.resolve("Product", "Nvidia") == "Nvidia"
+
+def test_fuzzy_matches_stay_within_their_block():
+    index = EntityIndex(threshold=0.85)
+    index.add("Company", "Microsoft")
+    assert index.resolve("Company", "Microsfot") == "Microsoft"
+    # Candidates are blocked on the first three characters of the key, so an
+    # equally close misspelling in another block is a new entity
+    assert index.resolve("Company", "Mircosoft") == "Mircosoft"
+    # Below the threshold
+    strict = EntityIndex(threshold=0.95)
+    strict.add("Company", "Microsoft")
+    assert strict.resolve("Company", "Microsfot") == "Microsfot"
+    # Short keys only match exactly
+    index.add("Company", "AMD")
+    assert index.resolve("Company", "AMC") == "AMC"
+
+def test_canonicalize_rewrites_nodes_relationships_and_sentiments():
+    index = EntityIndex()
+    index.add("Company", "Alphabet Inc.", aliases=["Google"])
+    google, alphabet = Node(id="Google", type="Company"), Node(id="Alphabet", type="Company")
+    graph_doc = GraphDocument(
+        nodes=[google, alphabet],
+        relationships=[Relationship(source=Node(id="Google", type="Company"), target=Node(id="Alphabet", type="Company"), type="OWNS")],
+        source=Document(page_content="text"),
+    )
+    sentiment = type("Sentiment", (), {"entity_name": "Google", "sentiment": "Positive"})()
+    index.canonicalize({"graph_documents": [graph_doc], "sentiment": [sentiment]})
+    assert [node.id for node in graph_doc.nodes] == ["Alphabet Inc."]
+    assert graph_doc.relationships == [] # became a self-loop
+    assert sentiment.entity_name == "Alphabet Inc."
+
+def test_index_round_trips_through_json():
+    index = EntityIndex()
+    index.add("Company", "Alphabet Inc.", aliases=["Google"])
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "index.json")
+        index.save(path)
+        loaded = EntityIndex.load(path)
+    assert loaded.resolve("Company", "Google") == "Alphabet Inc."
+    assert loaded.aliases("Company", "Alphabet Inc.") == ["Google"]
+
+class FakeResult:
+    def __init__(self, row=None):
+        self.row = row
+
+    def single(self):
+        return self.row
+
+    def consume(self):
+        return None
+
+class FakeTx:
+    def __init__(self, log):
+        self.log = log
+
+    def run(self, query, **params):
+        self.log.append((query, params))
+        if query == merge_query("Company"):
+            return FakeResult({"id": "4:merged"})
+        if query == RECORD_WRITE_QUERY:
+            return FakeResult({"data_version": 7, "schema_version": 1})
+        return FakeResult()
+
+class FakeSession:
+    def __init__(self, log):
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, work, *args):
+        return work(FakeTx(self.log), *args)
+
+class FakeDriver:
+    def __init__(self, log):
+        self.log = log
+
+    def session(self, **config):
+        return FakeSession(self.log)
+
+class FakeDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.writes = []
+        self.driver = FakeDriver(self.writes)
+
+    def query(self, query, parameters=None, name=None):
+        return self.rows
+
+ROWS = [
+    {"type": "Company", "id": "Acme Corporation", "mentions": 5},
+    {"type": "Company", "id": "Acme Corp.", "mentions": 2},
+    {"type": "Company", "id": "Globex", "mentions": 1},
+]
+
+def test_merge_bumps_the_data_version():
+    db = FakeDB(ROWS)
+    groups = merge_duplicates(db)
+    assert [(group["canonical"], group["ids"]) for group in groups] == [("Acme Corporation", ["Acme Corporation", "Acme Corp."])]
+
+    queries = [query for query, _ in db.writes]
+    assert queries.index(merge_query("Company")) < queries.index(RECORD_WRITE_QUERY) < queries.index(CHANGE_QUERY)
+    change = dict(db.writes)[CHANGE_QUERY]
+    assert change["version"] == 7 and change["nodes"] == ["4:merged"]
+    # Merging deletes nodes, so the graph projection must rebuild
+    assert change["rebuild"] is True
+
+def test_merge_recounts_sentiment_aggregates():
+    db = FakeDB(ROWS)
+    merge_duplicates(db)
+    queries = [query for query, _ in db.writes]
+    assert queries.index(merge_query("Company")) < queries.index(MERGED_ENTITY_QUERY) < queries.index(RECORD_WRITE_QUERY)
+    assert dict(db.writes)[MERGED_ENTITY_QUERY] == {"ids": ["Acme Corporation", "Acme Corp."], "type": "Company", "node": "4:merged"}
+
+def test_merge_query_uses_the_label():
+    query = merge_query("Company")
+    assert "MATCH (n:`Company` {id: id})" in query
+    assert '{properties: "discard", mergeRels: true}' in query
+    for label in ("Document", "Company` {id: 1}) DETACH DELETE n //", ""):
+        try:
+            merge_query(label)
+        except ValueError:
+            continue
+        raise AssertionError(f"{label!r} was accepted")
+
+def test_groups_outside_the_data_model_are_skipped():
+    rows = ROWS + [{"type": "Topic", "id": "AI", "mentions": 1}, {"type": "Topic", "id": "A.I.", "mentions": 1}]
+    groups = merge_duplicates(FakeDB(rows), dry_run=True)
+    assert [group["type"] for group in groups] == ["Company"]
+
+def test_dry_run_writes_nothing():
+    db = FakeDB(ROWS)
+    assert len(merge_duplicates(db, dry_run=True)) == 1
+    assert db.writes == []
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")
@@ -0,0 +1,33 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.entity_search import lucene_query, build_search_query, entity_filter_clause
+
+def test_lucene_query_matches_exact_prefix_and_fuzzy():
+    assert lucene_query("Nvid") == "(nvid^3 OR nvid*^2 OR nvid~1)"
+    assert lucene_query("AI") == "(ai^3 OR ai*^2)"
+    assert lucene_query("Morgan St") == "(morgan^3 OR morgan*^2 OR morgan~1) AND (st^3 OR st*^2)"
+
+def test_lucene_query_strips_query_syntax():
+    assert lucene_query('name:"x" OR *') == "(name^3 OR name*^2 OR name~1) AND (x^3 OR x*^2) AND (or^3 OR or*^2)"
+    assert lucene_query("  !!  ") is None
+    assert lucene_query(None) is None
+
+def test_build_search_query():
+    assert build_search_query("--", ["Company"]) is None
+    query, params = build_search_query("micro", ["Company"], limit=10)
+    assert "db.index.fulltext.queryNodes('entity_names'" in query
+    assert params["labels"] == ["Company"] and params["limit"] == 10
+    assert build_search_query("micro")[1]["labels"] is None
+
+def test_entity_filter_clause():
+    params = {}
+    clause = entity_filter_clause(lucene_query("tesla"), params)
+    assert clause.endswith("WITH collect(node) AS entities")
+    assert params["entity_query"] == lucene_query("tesla")
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.extraction_cache import ExtractionCache
+from src import ingest
+
+PAYLOAD = {"graph_documents": [], "text": "x" * 100}
+
+def age(cache, key, seconds):
+    """Marks an entry as last used `seconds` ago."""
+    timestamp = time.time() - seconds
+    os.utime(cache._path(key), (timestamp, timestamp))
+
+def test_key_depends_on_text_and_configuration():
+    key = ExtractionCache.make_key("text", "model", ["Company", "Person"], ["WORKS_AT"], "v1")
+    assert key == ExtractionCache.make_key("text", "model", ["Person", "Company"], ["WORKS_AT"], "v1")
+    assert key != ExtractionCache.make_key("text!", "model", ["Company", "Person"], ["WORKS_AT"], "v1")
+    assert key != ExtractionCache.make_key("text", "model", ["Company", "Person"], ["WORKS_AT"], "v2")
+
+def test_key_version_covers_the_metadata_rules():
+    enabled, threshold = ingest.METADATA_RULES_ENABLED, ingest.METADATA_RULES_MIN_CONFIDENCE
+    try:
+        ingest.METADATA_RULES_ENABLED, ingest.METADATA_RULES_MIN_CONFIDENCE = True, 0.8
+        with_rules = ingest._cache_version("chained", 4000)
+        ingest.METADATA_RULES_MIN_CONFIDENCE = 0.9
+        stricter = ingest._cache_version("chained", 4000)
+        ingest.METADATA_RULES_ENABLED = False
+        without_rules = ingest._cache_version("chained", 4000)
+    finally:
+        ingest.METADATA_RULES_ENABLED, ingest.METADATA_RULES_MIN_CONFIDENCE = enabled, threshold
+    assert len({with_rules, stricter, without_rules}) == 3
+    assert ingest.RULES_VERSION in with_rules
+
+def test_get_and_put_round_trip():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ExtractionCache(directory)
+        assert cache.get("ab" * 32) is None
+        cache.put("ab" * 32, PAYLOAD)
+        assert cache.get("ab" * 32) == PAYLOAD
+        assert cache.stats()["entries"] == 1
+
+def test_unreadable_entries_are_discarded():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ExtractionCache(directory)
+        cache.put("cd" * 32, PAYLOAD)
+        with open(cache._path("cd" * 32), "w") as file:
+            file.write("{truncated")
+        assert cache.get("cd" * 32) is None
+        assert not os.path.exists(cache._path("cd" * 32))
+
+def test_get_marks_entries_as_recently_used():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ExtractionCache(directory)
+        for key in ("a1" * 32, "b2" * 32):
+            cache.put(key, PAYLOAD)
+        age(cache, "a1" * 32, 200)
+        age(cache, "b2" * 32, 100)
+        assert [key for key, _, _ in cache.entries()] == ["a1" * 32, "b2" * 32]
+        cache.get("a1" * 32)
+        assert [key for key, _, _ in cache.entries()] == ["b2" * 32, "a1" * 32]
+
+def test_put_evicts_least_recently_used_entries():
+    with tempfile.TemporaryDirectory() as directory:
+        size = len(str(PAYLOAD)) + 10
+        cache = ExtractionCache(directory, max_bytes=size * 3)
+        keys = [f"{i:02d}" * 32 for i in range(3)]
+        for seconds, key in zip((300, 200, 100), keys):
+            cache.put(key, PAYLOAD)
+            age(cache, key, seconds)
+        cache.get(keys[0]) # keys[1] is now the least recently used
+
+        cache.put("ff" * 32, PAYLOAD)
+        assert cache.total_size() <= cache.max_bytes
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) == PAYLOAD and cache.get("ff" * 32) == PAYLOAD
+
+def test_prune_by_size_and_age():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ExtractionCache(directory)
+        keys = [f"{i:02d}" * 32 for i in range(4)]
+        for i, key in enumerate(keys):
+            cache.put(key, PAYLOAD)
+            age(cache, key, 86400 * (4 - i))
+        entry_size = cache.entries()[0][1]
+
+        assert cache.prune(older_than=86400 * 2.5) == 2
+        assert [key for key, _, _ in cache.entries()] == keys[2:]
+        assert cache.prune(max_bytes=entry_size) == 1
+        assert [key for key, _, _ in cache.entries()] == keys[3:]
+        assert cache.total_size() == entry_size
+        assert cache.clear() == 1 and cache.total_size() == 0
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")
@@ -0,0 +1,77 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from langchain_core.documents import Document
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from src.ingest import (
+    FusedExtraction, ExtractedNode, ExtractedRelationship, EntitySentiment,
+    _fused_to_graph_document,
+)
+from src.compare_extraction import compare_results
+
+def fused(nodes=(), relationships=(), sentiments=()):
+    return FusedExtraction(
+        title="Deal", source="Reuters", url=None, date="2025-01-01", status="Confirmed News",
+        nodes=[ExtractedNode(id=node_id, type=node_type) for node_id, node_type in nodes],
+        relationships=[ExtractedRelationship(source_id=s, source_type=st, target_id=t, target_type=tt, type=rel_type)
+                       for s, st, t, tt, rel_type in relationships],
+        sentiments=[EntitySentiment(entity_name=name, sentiment=sentiment) for name, sentiment in sentiments],
+    )
+
+def test_fused_extraction_is_normalized_like_the_graph_transformer():
+    extraction = fused(
+        nodes=[("Acme", "company"), ("Acme", "Company"), ("Mars", "Planet"), ("", "Company")],
+        relationships=[
+            ("Acme", "company", "Globex", " Company ", "partners with"),
+            ("Acme", "Company", "Globex", "Company", "LIKES"),      # relationship type not allowed
+            ("Acme", "Company", "Mars", "Planet", "AFFECTS"),       # endpoint type not allowed
+        ],
+    )
+    doc = Document(page_content="text", metadata={"source": "a.txt"})
+    graph_doc = _fused_to_graph_document(extraction, doc)
+
+    assert [(node.id, node.type) for node in graph_doc.nodes] == [("Acme", "Company"), ("Globex", "Company")]
+    assert [(rel.source.id, rel.type, rel.target.id) for rel in graph_doc.relationships] == [("Acme", "PARTNERS_WITH", "Globex")]
+    # Relationship endpoints are the graph document's own nodes
+    assert graph_doc.relationships[0].source is graph_doc.nodes[0]
+    assert graph_doc.source is doc
+
+def results(metadata, nodes, relationships, sentiments):
+    acme = Node(id="Acme", type="Company")
+    graph_doc = GraphDocument(
+        nodes=[Node(id=node_id, type="Company") for node_id in nodes],
+        relationships=[Relationship(source=acme, target=Node(id=target, type="Company"), type=rel_type) for rel_type, target in relationships],
+        source=Document(page_content="text"),
+    )
+    return {
+        "metadata": metadata,
+        "graph_documents": [graph_doc],
+        "sentiment": [EntitySentiment(entity_name=name, sentiment=sentiment) for name, sentiment in sentiments],
+    }
+
+def test_compare_results_scores_agreement():
+    metadata = {"title": "Deal", "source": "Reuters", "url": None, "date": "2025-01-01", "status": "Confirmed News"}
+    chained = results(metadata, ["Acme", "Globex"], [("SUPPLIES", "Globex")], [("Acme", "Positive"), ("Globex", "Neutral")])
+    fused_results = results(
+        dict(metadata, title=" deal ", date="2025-01-02"), ["acme", "Globex", "Initech"], [("SUPPLIES", "globex")],
+        [("acme", "Positive"), ("Globex", "Negative"), ("Initech", "Neutral")],
+    )
+    scores = compare_results(chained, fused_results)
+    # Comparisons ignore case and surrounding whitespace
+    assert scores["metadata"] == 4 / 5
+    assert scores["nodes"] == 2 / 3
+    assert scores["relationships"] == 1.0
+    assert scores["sentiment"] == 1 / 2
+    assert scores["sentiment_coverage"] == 2 / 3
+
+def test_compare_results_without_shared_sentiments():
+    metadata = {"title": None}
+    scores = compare_results(results(metadata, [], [], []), results(metadata, [], [], [("Acme", "Positive")]))
+    assert scores["nodes"] == 1.0 and scores["relationships"] == 1.0
+    assert scores["sentiment"] is None and scores["sentiment_coverage"] == 0.0
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")
@@ -0,0 +1,154 @@
+import os
+import sys
+import asyncio
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.graph_db import GraphDB, AsyncGraphDB, row_tuple
+from src.query_metrics import query_metrics
+
+class FakeRecord(dict):
+    def data(self):
+        return dict(self)
+
+class FakeResult:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __iter__(self):
+        for i in range(self.driver.rows):
+            self.driver.pulled += 1
+            yield FakeRecord(id=i, name=f"n{i}")
+
+    def consume(self):
+        return None
+
+class FakeSession:
+    def __init__(self, driver, fetch_size=None):
+        self.driver = driver
+        self.driver.fetch_sizes.append(fetch_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.driver.closed_sessions += 1
+
+    def run(self, query, parameters=None):
+        self.driver.queries.append(query)
+        return FakeResult(self.driver)
+
+class FakeDriver:
+    def __init__(self, rows):
+        self.rows = rows
+        self.pulled = 0
+        self.fetch_sizes = []
+        self.closed_sessions = 0
+        self.queries = []
+
+    def session(self, **kwargs):
+        return FakeSession(self, **kwargs)
+
+def test_driver_is_created_lazily():
+    created = []
+    db = GraphDB(driver_factory=lambda: created.append(1) or FakeDriver(0))
+    assert not created
+    db.query("RETURN 1")
+    db.query("RETURN 1")
+    assert created == [1]
+
+def test_stream_yields_mapped_rows_lazily():
+    driver = FakeDriver(rows=1000)
+    db = GraphDB(driver_factory=lambda: driver)
+    rows = db.stream("MATCH (n) RETURN n.id AS id, n.name AS name", fetch_size=50)
+    assert next(rows) == {"id": 0, "name": "n0"}
+    # Nothing beyond the first row has been consumed yet
+    assert driver.pulled == 1
+    assert driver.fetch_sizes == [50]
+    rows.close()
+    assert driver.closed_sessions == 1
+
+def test_stream_with_custom_mapper():
+    db = GraphDB(driver_factory=lambda: FakeDriver(rows=3))
+    assert list(db.stream("...", mapper=row_tuple)) == [(0, "n0"), (1, "n1"), (2, "n2")]
+    assert list(db.stream("...", mapper=lambda record: record["name"].upper())) == ["N0", "N1", "N2"]
+
+def test_queries_are_recorded_under_their_name():
+    query_metrics.reset()
+    driver = FakeDriver(rows=4)
+    db = GraphDB(driver_factory=lambda: driver)
+    db.query("MATCH (n) RETURN n", name="nodes")
+    rows = db.stream("MATCH (n) RETURN n", name="nodes_stream")
+    next(rows)
+    rows.close()
+    stats = query_metrics.snapshot()
+    assert stats["nodes"]["count"] == 1 and stats["nodes"]["rows"] == 4
+    # A stream closed early is recorded with the rows it produced, not as an error
+    assert stats["nodes_stream"]["rows"] == 1 and stats["nodes_stream"]["errors"] == 0
+
+def test_sampled_queries_run_with_profile():
+    driver = FakeDriver(rows=0)
+    db = GraphDB(driver_factory=lambda: driver)
+    rate, query_metrics.profile_sample_rate = query_metrics.profile_sample_rate, 1.0
+    try:
+        db.query("MATCH (n) RETURN n")
+        db.query("CREATE INDEX foo IF NOT EXISTS FOR (n:Foo) ON (n.id)")
+    finally:
+        query_metrics.profile_sample_rate = rate
+    assert driver.queries == ["PROFILE MATCH (n) RETURN n", "CREATE INDEX foo IF NOT EXISTS FOR (n:Foo) ON (n.id)"]
+
+class FakeAsyncResult:
+    async def consume(self):
+        return None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+class FakeAsyncTransaction:
+    def __init__(self, queries):
+        self.queries = queries
+
+    async def run(self, query, parameters=None):
+        self.queries.append(query)
+        return FakeAsyncResult()
+
+class FakeAsyncSession:
+    def __init__(self, queries):
+        self.queries = queries
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute_read(self, work, *args):
+        return await work(FakeAsyncTransaction(self.queries), *args)
+
+    async def execute_write(self, work, *args):
+        return await work(FakeAsyncTransaction(self.queries), *args)
+
+class FakeAsyncDriver:
+    def __init__(self):
+        self.queries = []
+
+    def session(self, **kwargs):
+        return FakeAsyncSession(self.queries)
+
+def test_async_writes_are_profiled_like_reads():
+    driver = FakeAsyncDriver()
+    db = AsyncGraphDB(driver_factory=lambda: driver, query_timeout=0)
+    rate, query_metrics.profile_sample_rate = query_metrics.profile_sample_rate, 1.0
+    try:
+        asyncio.run(db.query("MATCH (n) RETURN n"))
+        asyncio.run(db.write("MATCH (n:Foo {id: 1}) SET n.seen = true RETURN n"))
+    finally:
+        query_metrics.profile_sample_rate = rate
+    assert driver.queries == ["PROFILE MATCH (n) RETURN n", "PROFILE MATCH (n:Foo {id: 1}) SET n.seen = true RETURN n"]
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
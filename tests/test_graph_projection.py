@@ -0,0 +1,171 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.graph_projection import (
+    GraphProjection, ProjectionLoader, NODES_QUERY, RELATIONSHIPS_QUERY, CHANGES_QUERY,
+    CHANGED_NODES_QUERY, CHANGED_ADJACENCY_QUERY,
+)
+from src.graph_meta import VERSIONS_QUERY
+
+NODES = [
+    ("acme", "Company", "Acme"),
+    ("globex", "Company", "Globex"),
+    ("ceo", "Person", "Jane Doe"),
+    ("tech", "Sector", "Technology"),
+    ("widget", "Product", "Widget"),
+]
+RELATIONSHIPS = [
+    ("acme", "globex", "PARTNERS_WITH"),
+    ("ceo", "acme", "WORKS_AT"),
+    ("acme", "tech", "BELONGS_TO"),
+    ("globex", "tech", "BELONGS_TO"),
+    ("acme", "widget", "PRODUCES"),
+    ("doc", "acme", "MENTIONS"), # endpoint outside the projection
+]
+
+def edges(rows):
+    return sorted((row[0], row[3], row[6]) for row in rows)
+
+def test_induced_subgraph_matches_undirected_cypher():
+    projection = GraphProjection.build(NODES, RELATIONSHIPS, version=3)
+    assert len(projection) == 5 and projection.edge_count == 5
+    rows = projection.induced_subgraph(["acme", "globex", "ceo", "unknown"])
+    assert edges(rows) == [
+        ("acme", "ceo", "WORKS_AT"), ("acme", "globex", "PARTNERS_WITH"),
+        ("ceo", "acme", "WORKS_AT"), ("globex", "acme", "PARTNERS_WITH"),
+    ]
+    assert ("acme", "Company", "Acme", "globex", "Company", "Globex", "PARTNERS_WITH") in rows
+
+def test_induced_subgraph_filters_and_limit():
+    projection = GraphProjection.build(NODES, RELATIONSHIPS)
+    everything = [node[0] for node in NODES]
+    assert edges(projection.induced_subgraph(everything, labels=["Company"])) == [
+        ("acme", "globex", "PARTNERS_WITH"), ("globex", "acme", "PARTNERS_WITH"),
+    ]
+    assert {row[6] for row in projection.induced_subgraph(everything, types=["BELONGS_TO"])} == {"BELONGS_TO"}
+    assert projection.induced_subgraph(everything, types=["UNKNOWN"]) == []
+    assert len(projection.induced_subgraph(everything, limit=3)) == 3
+    assert edges(projection.induced_subgraph(everything, directed=True)) == sorted(RELATIONSHIPS[:-1])
+
+def test_k_hop_and_degree():
+    projection = GraphProjection.build(NODES, RELATIONSHIPS)
+    assert sorted(projection.k_hop(["ceo"], 0)) == ["ceo"]
+    assert sorted(projection.k_hop(["ceo"], 1)) == ["acme", "ceo"]
+    assert sorted(projection.k_hop(["ceo"], 2)) == ["acme", "ceo", "globex", "tech", "widget"]
+    # Paths may only go through allowed labels and relationship types
+    assert sorted(projection.k_hop(["ceo"], 3, labels=["Person", "Company"])) == ["acme", "ceo", "globex"]
+    assert sorted(projection.k_hop(["globex"], 3, types=["BELONGS_TO"])) == ["acme", "globex", "tech"]
+    assert projection.degree(["acme", "widget", "unknown"]) == {"acme": 4, "widget": 1}
+
+def test_updated_replaces_changed_rows():
+    projection = GraphProjection.build(NODES, RELATIONSHIPS, version=1)
+    # Ingestion added Initech, related to Globex, and renamed nothing else
+    updated = projection.updated(
+        [("globex", "Company", "Globex Corp"), ("initech", "Company", "Initech")],
+        [
+            ("globex", "acme", "PARTNERS_WITH", False), ("globex", "tech", "BELONGS_TO", True),
+            ("globex", "initech", "COMPETES_WITH", False), ("initech", "globex", "COMPETES_WITH", True),
+        ],
+        version=2,
+    )
+    assert updated.version == 2 and len(updated) == 6 and updated.edge_count == 6
+    assert updated.degree(["globex", "initech", "acme"]) == {"globex": 3, "initech": 1, "acme": 4}
+    assert ("globex", "Company", "Globex Corp", "initech", "Company", "Initech", "COMPETES_WITH") in updated.induced_subgraph(["globex", "initech"])
+    assert edges(updated.induced_subgraph(["globex", "initech", "acme"], directed=True)) == [
+        ("acme", "globex", "PARTNERS_WITH"), ("initech", "globex", "COMPETES_WITH"),
+    ]
+    # The original snapshot is untouched
+    assert len(projection) == 5 and projection.names[projection.index["globex"]] == "Globex"
+
+class FakeDB:
+    def __init__(self):
+        self.version = 1
+        self.nodes = list(NODES)
+        self.relationships = list(RELATIONSHIPS)
+        self.changes = []
+        self.queries = []
+
+    def write(self, nodes, relationships):
+        self.version += 1
+        self.nodes += nodes
+        self.relationships += relationships
+        touched = {node[0] for node in nodes} | {e for rel in relationships for e in rel[:2]}
+        self.changes.append({"version": self.version, "nodes": sorted(touched), "rebuild": False})
+
+    def delete(self, element_id):
+        self.version += 1
+        self.nodes = [node for node in self.nodes if node[0] != element_id]
+        self.relationships = [rel for rel in self.relationships if element_id not in rel[:2]]
+        self.changes.append({"version": self.version, "nodes": [], "rebuild": True})
+
+    def stream(self, query, parameters=None, mapper=None, name=None):
+        self.queries.append(name)
+        rows = {NODES_QUERY: self.nodes, RELATIONSHIPS_QUERY: self.relationships}[query]
+        return iter(list(rows))
+
+    def query(self, query, parameters=None, name=None):
+        self.queries.append(name)
+        if query == VERSIONS_QUERY:
+            return [{"data_version": self.version}]
+        if query == CHANGES_QUERY:
+            return [change for change in self.changes if change["version"] > parameters["since"]]
+        ids = set(parameters["ids"])
+        if query == CHANGED_NODES_QUERY:
+            return [FakeRecord(node) for node in self.nodes if node[0] in ids]
+        assert query == CHANGED_ADJACENCY_QUERY
+        rows = []
+        for source, target, rel_type in self.relationships:
+            if source in ids:
+                rows.append(FakeRecord((source, target, rel_type, True)))
+            if target in ids:
+                rows.append(FakeRecord((target, source, rel_type, False)))
+        return rows
+
+class FakeRecord(tuple):
+    def values(self):
+        return list(self)
+
+def test_loader_refreshes_incrementally_from_the_change_log():
+    db = FakeDB()
+    loader = ProjectionLoader(db)
+    projection = loader.current()
+    assert projection.version == 1 and db.queries.count("projection_nodes") == 1
+    assert loader.current(1) is projection
+
+    db.write([("initech", "Company", "Initech")], [("initech", "globex", "COMPETES_WITH")])
+    projection = loader.current(2)
+    assert projection.version == 2
+    assert db.queries.count("projection_nodes") == 1 # not rebuilt
+    assert sorted(projection.k_hop(["initech"], 1)) == ["globex", "initech"]
+    assert edges(projection.induced_subgraph(["acme", "globex", "initech"])) == edges(
+        GraphProjection.build(db.nodes, db.relationships).induced_subgraph(["acme", "globex", "initech"])
+    )
+
+def test_loader_rebuilds_when_the_change_log_has_gaps():
+    db = FakeDB()
+    loader = ProjectionLoader(db)
+    loader.current()
+    db.write([("initech", "Company", "Initech")], [])
+    db.write([("hooli", "Company", "Hooli")], [])
+    db.changes = db.changes[1:] # version 2 was pruned
+    projection = loader.current(3)
+    assert projection.version == 3 and len(projection) == 7
+    assert db.queries.count("projection_nodes") == 2
+
+def test_loader_rebuilds_after_deletions():
+    db = FakeDB()
+    loader = ProjectionLoader(db)
+    loader.current()
+    db.delete("globex")
+    projection = loader.current(2)
+    assert projection.version == 2 and "globex" not in projection.index
+    assert db.queries.count("projection_nodes") == 2
+
+def test_disabled_loader_returns_none():
+    assert ProjectionLoader(FakeDB(), enabled=False).current() is None
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")
@@ -0,0 +1,144 @@
+import os
+import sys
+import gzip
+import json
+import asyncio
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.api.graph_serialization import (
+    GraphBuilder, GraphStream, DEFAULT_COLOR, JSON, NDJSON, to_columnar, negotiate_encoding, negotiate_media_type,
+    graph_response, ndjson_response, wants_ndjson, THREADPOOL_COMPRESS_BYTES
+)
+from src.api import graph_serialization
+
+class FakeRequest:
+    def __init__(self, **headers):
+        self.headers = {name.replace("_", "-"): value for name, value in headers.items()}
+
+def sample_graph(edges: int = 3) -> GraphBuilder:
+    graph = GraphBuilder()
+    for i in range(edges):
+        graph.add_node("c1", "Company", "Microsoft")
+        graph.add_node(f"p{i}", "Product", f"Product {i}")
+        graph.add_edge("c1", f"p{i}", "LAUNCHED")
+    return graph
+
+def test_builder_deduplicates_nodes():
+    graph = sample_graph()
+    assert len(graph.nodes) == 4 and len(graph.edges) == 3
+    rows = graph.to_rows()
+    assert rows["nodes"][0] == {"id": "c1", "label": "Microsoft", "color": "#ef4444"}
+    assert rows["edges"][0] == {"source": "c1", "target": "p0", "label": "LAUNCHED"}
+
+def test_columnar_layout_round_trips():
+    rows = sample_graph().to_rows()
+    rows["edges"].append({"source": "c1", "target": "unknown", "label": "PARTNERS_WITH"})
+    columnar = to_columnar(rows)
+    strings = columnar["strings"]
+    nodes, edges = columnar["nodes"], columnar["edges"]
+    assert strings.count("LAUNCHED") == 1
+    # Edge endpoints refer to node positions; a missing endpoint becomes a node
+    decoded = [
+        (strings[nodes["id"][source]], strings[nodes["id"][target]], strings[label])
+        for source, target, label in zip(edges["source"], edges["target"], edges["label"])
+    ]
+    assert decoded == [(e["source"], e["target"], e["label"]) for e in rows["edges"]]
+    assert strings[nodes["color"][-1]] == DEFAULT_COLOR
+
+def test_columnar_is_smaller():
+    rows = sample_graph(edges=500).to_rows()
+    assert len(json.dumps(to_columnar(rows))) < len(json.dumps(rows)) / 2
+
+def test_negotiation():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, deflate") is None
+    assert negotiate_encoding(None) is None
+    assert negotiate_media_type("application/json, */*") == JSON
+
+def test_graph_response_compresses_large_bodies():
+    rows = sample_graph(edges=200).to_rows()
+    response = asyncio.run(graph_response(FakeRequest(accept_encoding="gzip"), rows))
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.body)) == rows
+
+    small = asyncio.run(graph_response(FakeRequest(accept_encoding="gzip"), sample_graph(edges=1).to_rows(), "columnar"))
+    assert "Content-Encoding" not in small.headers
+    assert json.loads(small.body)["format"] == "columnar"
+
+def test_large_bodies_are_compressed_off_the_event_loop():
+    threads = []
+    original = graph_serialization.compress
+
+    def recording_compress(body, encoding):
+        threads.append(threading.get_ident())
+        return original(body, encoding)
+
+    async def respond(edges):
+        return await graph_response(FakeRequest(accept_encoding="gzip"), sample_graph(edges=edges).to_rows())
+
+    graph_serialization.compress = recording_compress
+    try:
+        loop_thread = threading.get_ident()
+        small = asyncio.run(respond(50))
+        large = asyncio.run(respond(2000))
+    finally:
+        graph_serialization.compress = original
+    assert len(gzip.decompress(small.body)) < THREADPOOL_COMPRESS_BYTES <= len(gzip.decompress(large.body))
+    assert threads[0] == loop_thread and threads[1] != loop_thread
+
+def test_graph_stream_emits_each_node_once():
+    graph = GraphStream()
+    graph.add_node("c1", "Company", "Microsoft")
+    graph.add_node("p1", "Product", "Copilot")
+    graph.add_edge("c1", "p1", "LAUNCHED")
+    assert [event["type"] for event in graph.drain()] == ["node", "node", "edge"]
+    graph.add_node("c1", "Company", "Microsoft")
+    graph.add_edge("p1", "c1", "MADE_BY")
+    assert graph.drain() == [{"type": "edge", "source": "p1", "target": "c1", "label": "MADE_BY"}]
+    assert graph.end() == {"type": "end", "nodes": 2, "edges": 2}
+
+def read_ndjson(response) -> list:
+    async def collect():
+        return [chunk async for chunk in response.body_iterator]
+
+    chunks = asyncio.run(collect())
+    return chunks, [json.loads(line) for line in b"".join(chunks).splitlines()]
+
+def test_ndjson_response_batches_events():
+    async def events():
+        for i in range(5):
+            yield {"type": "row", "data": {"i": i}}
+
+    response = ndjson_response(events(), batch_size=2)
+    assert response.media_type == NDJSON
+    chunks, lines = read_ndjson(response)
+    assert len(chunks) == 3
+    assert [line["data"]["i"] for line in lines] == [0, 1, 2, 3, 4]
+
+def test_ndjson_response_reports_errors_in_band():
+    async def events():
+        yield {"type": "node", "id": "c1"}
+        raise RuntimeError("Neo4j went away")
+
+    _, lines = read_ndjson(ndjson_response(events()))
+    assert lines == [{"type": "node", "id": "c1"}, {"type": "error", "detail": "Neo4j went away"}]
+
+def test_wants_ndjson():
+    assert wants_ndjson(FakeRequest(accept="application/x-ndjson"))
+    assert wants_ndjson(FakeRequest(), stream=True)
+    assert not wants_ndjson(FakeRequest(accept="application/json"))
+
+def test_network_route_documents_every_media_type():
+    from fastapi import FastAPI
+    from src.api.routes import router
+    app = FastAPI()
+    app.include_router(router)
+    response = app.openapi()["paths"]["/graph/network"]["get"]["responses"]["200"]
+    assert set(response["content"]) == {JSON, "application/msgpack", NDJSON}
+    assert response["content"][JSON]["schema"] == {"$ref": "#/components/schemas/GraphData"}
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
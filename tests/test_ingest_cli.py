@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.ingest import collect_files, parse_args, _write_batch
+from src.config import INGEST_CONCURRENCY, NEO4J_WRITE_BATCH_SIZE, EXTRACTION_MODE
+
+def touch(*parts):
+    path = os.path.join(*parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write("article")
+    return path
+
+def test_collect_files_expands_directories_and_globs():
+    with tempfile.TemporaryDirectory() as directory:
+        b = touch(directory, "b.txt")
+        a = touch(directory, "a.txt")
+        touch(directory, "notes.md")
+        nested = touch(directory, "nested", "c.txt")
+        os.makedirs(os.path.join(directory, "folder.txt"))
+
+        # Directories match their own .txt files only, not subdirectories or other extensions
+        assert collect_files([directory]) == [a, b]
+        # Overlapping patterns are de-duplicated and the result is sorted
+        assert collect_files([os.path.join(directory, "*", "*.txt"), directory, b]) == sorted([a, b, nested])
+        assert collect_files([os.path.join(directory, "missing*.txt")]) == []
+
+def test_parse_args_defaults():
+    args = parse_args([])
+    assert args.paths == [os.path.join("data", "batch3", "*.txt")]
+    assert args.concurrency == INGEST_CONCURRENCY
+    assert args.batch_size == NEO4J_WRITE_BATCH_SIZE
+    assert args.mode == EXTRACTION_MODE
+    assert not args.force and not args.no_manifest
+
+    args = parse_args(["data/batch1", "-c", "8", "--batch-size", "5", "--force"])
+    assert args.paths == ["data/batch1"] and args.concurrency == 8 and args.batch_size == 5 and args.force
+
+class SlowWriter:
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def write(self, batch):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return [item["source"] for item in batch]
+
+def test_write_batches_are_serialized():
+    writer = SlowWriter()
+
+    async def write_all():
+        batches = [[{"source": f"{i}.txt"}] for i in range(4)]
+        return await asyncio.gather(*(_write_batch(writer, batch) for batch in batches))
+
+    assert asyncio.run(write_all()) == [[f"{i}.txt"] for i in range(4)]
+    # Concurrent MERGEs on shared entities are serialized: only one write runs at a time
+    assert writer.max_active == 1
+
+def test_write_batches_are_serialized_across_event_loops():
+    # e.g. Streamlit reruns and ingest.main each call asyncio.run
+    writer = SlowWriter()
+    errors = []
+
+    def write_in_own_loop(i):
+        try:
+            asyncio.run(_write_batch(writer, [{"source": f"{i}.txt"}]))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write_in_own_loop, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == [] and writer.max_active == 1
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")
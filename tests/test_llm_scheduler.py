@@ -0,0 +1,180 @@
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.llm_scheduler import LLMScheduler, AdaptiveLimiter, TokenBucket, is_transient_error, is_throttle_error
+
+class FakeRateLimitError(Exception):
+    pass
+
+class FakeServerError(Exception):
+    pass
+
+class FakeLLM:
+    """
+    Local stand-in for a chain or chat model. `errors` is a list of exceptions (or None
+    for success) consumed one per call, so tests can inject failures deterministically.
+    """
+
+    def __init__(self, errors=None, latency: float = 0.0, response: str = "ok"):
+        self.errors = list(errors or [])
+        self.latency = latency
+        self.response = response
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            error = self.errors.pop(0) if self.errors else None
+            if error is not None:
+                raise error
+            return self.response
+        finally:
+            self.in_flight -= 1
+
+def make_scheduler(**overrides):
+    classes = {
+        "ingest": {"rpm": 0, "tpm": 0, "max_concurrency": 4},
+        "interactive": {"rpm": 0, "tpm": 0, "max_concurrency": 4},
+    }
+    for name, config in overrides.items():
+        classes[name].update(config)
+    return LLMScheduler(classes=classes, max_retries=3, backoff_base=0.001, backoff_max=0.01)
+
+def test_error_classification():
+    assert is_throttle_error(FakeRateLimitError("429 Resource has been exhausted (e.g. check quota)."))
+    assert is_transient_error(FakeServerError("503 The model is overloaded."))
+    assert not is_throttle_error(FakeServerError("503 The model is overloaded."))
+    assert is_transient_error(asyncio.TimeoutError())
+    assert not is_transient_error(ValueError("Invalid JSON output"))
+
+class FakeAPIError(Exception):
+    """Like google.genai's APIError: the HTTP status is on `.code`."""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+def test_error_classification_ignores_incidental_numbers_and_words():
+    assert not is_transient_error(ValueError("prompt exceeds 1500 tokens"))
+    assert not is_transient_error(ValueError("field 'timeout' must be a positive number"))
+    assert not is_transient_error(ValueError("request 5023 failed validation"))
+    assert not is_throttle_error(ValueError("monthly quota report attached"))
+
+def test_error_classification_uses_provider_status_codes():
+    assert is_throttle_error(FakeAPIError(429, "RESOURCE_EXHAUSTED"))
+    assert is_transient_error(FakeAPIError(503, "UNAVAILABLE"))
+    # The status code wins over a misleading message
+    assert not is_transient_error(FakeAPIError(400, "Invalid value for timeout: 503"))
+    # LangChain wraps provider errors; the cause is classified
+    try:
+        try:
+            raise FakeAPIError(429, "RESOURCE_EXHAUSTED")
+        except FakeAPIError as e:
+            raise RuntimeError("Error calling model") from e
+    except RuntimeError as wrapped:
+        assert is_throttle_error(wrapped)
+
+def test_retries_transient_errors():
+    scheduler = make_scheduler()
+    llm = FakeLLM(errors=[FakeRateLimitError("429 quota exceeded"), FakeServerError("503 unavailable")])
+    result = asyncio.run(scheduler.run(lambda: llm.ainvoke({}), traffic="ingest"))
+    assert result == "ok"
+    assert llm.calls == 3
+    stats = scheduler.stats()["ingest"]
+    assert stats["retries"] == 2 and stats["succeeded"] == 1 and stats["throttled"] == 1
+
+def test_does_not_retry_permanent_errors():
+    scheduler = make_scheduler()
+    llm = FakeLLM(errors=[ValueError("bad request")])
+    try:
+        asyncio.run(scheduler.run(lambda: llm.ainvoke({}), traffic="ingest"))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert llm.calls == 1
+    assert scheduler.stats()["ingest"]["failed"] == 1
+
+def test_gives_up_after_max_retries():
+    scheduler = make_scheduler()
+    llm = FakeLLM(errors=[FakeRateLimitError("429")] * 10)
+    try:
+        asyncio.run(scheduler.run(lambda: llm.ainvoke({}), traffic="ingest"))
+        assert False, "expected FakeRateLimitError"
+    except FakeRateLimitError:
+        pass
+    assert llm.calls == 4 # First attempt plus max_retries
+
+def test_limits_concurrency():
+    scheduler = make_scheduler(ingest={"max_concurrency": 2})
+    llm = FakeLLM(latency=0.02)
+
+    async def run_many():
+        await asyncio.gather(*[scheduler.run(lambda: llm.ainvoke({}), traffic="ingest") for _ in range(10)])
+
+    asyncio.run(run_many())
+    assert llm.calls == 10
+    assert llm.max_in_flight == 2
+
+def test_adaptive_limit_shrinks_on_throttle_and_recovers():
+    limiter = AdaptiveLimiter(max_limit=8)
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert int(limiter.limit) == 2
+    for _ in range(100):
+        limiter.on_success()
+    assert int(limiter.limit) == 8
+
+def test_token_bucket_enforces_rate():
+    now = [0.0]
+    bucket = TokenBucket(per_minute=60, capacity=1, clock=lambda: now[0])
+    assert bucket.wait_time(1) == 0
+    bucket.tokens -= 1
+    assert abs(bucket.wait_time(1) - 1.0) < 1e-9
+    now[0] += 0.5
+    assert abs(bucket.wait_time(1) - 0.5) < 1e-9
+
+def test_requests_per_minute_budget():
+    # 1200 RPM without burst capacity: one request every 50 ms
+    scheduler = make_scheduler()
+    scheduler.classes["ingest"].requests = TokenBucket(per_minute=1200, capacity=1)
+    llm = FakeLLM()
+
+    async def run_many():
+        await asyncio.gather(*[scheduler.run(lambda: llm.ainvoke({}), traffic="ingest") for _ in range(5)])
+
+    started = time.perf_counter()
+    asyncio.run(run_many())
+    # The first request passes immediately, the other four wait ~50 ms each
+    assert time.perf_counter() - started >= 0.18
+
+def test_traffic_classes_are_isolated():
+    scheduler = make_scheduler(ingest={"max_concurrency": 1})
+    slow_batch = FakeLLM(latency=0.2)
+    interactive = FakeLLM()
+
+    async def scenario():
+        batch = [asyncio.create_task(scheduler.run(lambda: slow_batch.ainvoke({}), traffic="ingest")) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        started = time.perf_counter()
+        await scheduler.run(lambda: interactive.ainvoke({}), traffic="interactive")
+        interactive_latency = time.perf_counter() - started
+        for task in batch:
+            task.cancel()
+        await asyncio.gather(*batch, return_exceptions=True)
+        return interactive_latency
+
+    # The interactive call does not queue behind the saturated ingest class
+    assert asyncio.run(scenario()) < 0.1
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.manifest import IngestionManifest, content_hash, PENDING, DONE, FAILED
+
+def open_manifest(directory):
+    return IngestionManifest(os.path.join(directory, "nested", "manifest.db"))
+
+def test_content_hash_accepts_text_and_bytes():
+    assert content_hash("Acme") == content_hash(b"Acme")
+    assert content_hash("Acme") != content_hash("Acme ")
+
+def test_new_source_goes_pending_then_done():
+    with tempfile.TemporaryDirectory() as directory:
+        manifest = open_manifest(directory)
+        digest = content_hash("article")
+        assert manifest.needs_processing("a.txt", digest)
+
+        manifest.mark_started("a.txt", digest)
+        row = manifest.get("a.txt")
+        assert row["status"] == PENDING and row["attempts"] == 1 and row["completed_at"] is None
+        # An interrupted run leaves it pending, so it is picked up again
+        assert manifest.needs_processing("a.txt", digest)
+
+        manifest.mark_done(["a.txt"])
+        row = manifest.get("a.txt")
+        assert row["status"] == DONE and row["completed_at"] is not None
+        assert not manifest.needs_processing("a.txt", digest)
+        assert manifest.needs_processing("a.txt", digest, force=True)
+        manifest.close()
+
+def test_changed_content_is_processed_again():
+    with tempfile.TemporaryDirectory() as directory:
+        manifest = open_manifest(directory)
+        manifest.mark_started("a.txt", content_hash("v1"))
+        manifest.mark_done(["a.txt"])
+        assert manifest.needs_processing("a.txt", content_hash("v2"))
+
+        manifest.mark_started("a.txt", content_hash("v2"))
+        row = manifest.get("a.txt")
+        assert row["content_hash"] == content_hash("v2") and row["attempts"] == 2 and row["status"] == PENDING
+        manifest.close()
+
+def test_failures_are_retried_and_cleared():
+    with tempfile.TemporaryDirectory() as directory:
+        manifest = open_manifest(directory)
+        digest = content_hash("article")
+        manifest.mark_started("a.txt", digest)
+        manifest.mark_failed(["a.txt"], "Extraction failed: quota")
+        row = manifest.get("a.txt")
+        assert row["status"] == FAILED and row["error"] == "Extraction failed: quota"
+        assert manifest.needs_processing("a.txt", digest)
+
+        manifest.mark_started("a.txt", digest)
+        assert manifest.get("a.txt")["error"] is None
+        manifest.mark_done(["a.txt"])
+        assert manifest.summary() == {DONE: 1}
+        manifest.close()
+
+def test_state_survives_reopening_and_forget():
+    with tempfile.TemporaryDirectory() as directory:
+        manifest = open_manifest(directory)
+        for source in ("a.txt", "b.txt", "c.txt"):
+            manifest.mark_started(source, content_hash(source))
+        manifest.mark_done(["a.txt", "b.txt"])
+        manifest.mark_failed(["c.txt"], "Neo4j write failed")
+        manifest.close()
+
+        manifest = open_manifest(directory)
+        assert manifest.summary() == {DONE: 2, FAILED: 1}
+        assert [row["source"] for row in manifest.entries(DONE)] == ["a.txt", "b.txt"]
+        assert manifest.forget(["a.txt", "missing.txt"]) == 1
+        assert manifest.needs_processing("a.txt", content_hash("a.txt"))
+        manifest.close()
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")
@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import asyncio
+import tempfile
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.pipeline import IngestionPipeline, PipelineStats, iter_articles, _DONE
+
+class FakeWriter:
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+
+def make_pipeline(queue_size=10, batch_size=3, extract_workers=1):
+    # Skips __init__, which connects the batch writer to Neo4j
+    pipeline = IngestionPipeline.__new__(IngestionPipeline)
+    pipeline.extract_workers = extract_workers
+    pipeline.writer = FakeWriter(batch_size)
+    pipeline.extract_queue = asyncio.Queue(maxsize=queue_size)
+    pipeline.write_queue = asyncio.Queue()
+    pipeline.stats = PipelineStats({"extract": pipeline.extract_queue, "write": pipeline.write_queue})
+    pipeline._aborted = threading.Event()
+    pipeline.write_workers = 1
+    pipeline.manifest = None
+    pipeline.force = False
+    pipeline.report_interval = 0
+    return pipeline
+
+def drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+def test_iter_articles_reports_unreadable_files():
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "a_good.txt"), "w", encoding="utf-8") as file:
+            file.write("Acme buys Globex.")
+        with open(os.path.join(directory, "b_bad.txt"), "wb") as file:
+            file.write(b"\xff\xfe\xfa not utf-8")
+        articles = sorted(iter_articles([directory]), key=lambda article: article["source"])
+
+    assert [os.path.basename(article["source"]) for article in articles] == ["a_good.txt", "b_bad.txt"]
+    assert articles[0]["text"] == "Acme buys Globex."
+    assert "error" in articles[1] and "text" not in articles[1]
+
+def test_only_files_and_explicit_ids_replace_earlier_articles():
+    lines = [
+        {"text": "Acme buys Globex.", "source": "Reuters"},
+        {"text": "Initech cuts jobs.", "source": "Reuters"},
+        {"text": "Acme buys Globex, updated.", "id": "article-7", "source": "Reuters"},
+        {"text": "Globex shares rise.", "url": "https://example.com/globex"},
+        {"text": "Untitled wire story."},
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "dump.jsonl")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(json.dumps(line) for line in lines))
+        with open(os.path.join(directory, "a.txt"), "w", encoding="utf-8") as file:
+            file.write("Acme buys Globex.")
+        articles = list(iter_articles([path, directory]))
+        again = list(iter_articles([path]))
+
+    sources = [article["source"] for article in articles]
+    assert len(set(sources)) == len(sources)
+    assert sources[2:4] == ["article-7", "https://example.com/globex"]
+    # Publisher names and line numbers are not article identities
+    assert sources[0].startswith("Reuters#") and sources[4].startswith(path + "#")
+    assert [article["replace_source"] for article in articles] == [False, False, True, True, False, True]
+    # Reading the same record again gives the same source, so the manifest still skips it
+    assert [article["source"] for article in again] == sources[:5]
+
+def test_read_records_failures_and_continues():
+    articles = [
+        {"source": "a", "text": "first"},
+        {"source": "b", "error": "permission denied"},
+        {"source": "c", "text": "second"},
+    ]
+
+    async def run():
+        pipeline = make_pipeline(extract_workers=2)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, pipeline._read, articles, loop)
+        return pipeline, drain(pipeline.extract_queue)
+
+    pipeline, queued = asyncio.run(run())
+    assert [item["source"] for item in queued if item is not _DONE] == ["a", "c"]
+    assert queued.count(_DONE) == 2
+    read = pipeline.stats.snapshot()["stages"]["read"]
+    assert read["processed"] == 2 and read["failed"] == 1
+
+def test_read_stops_when_the_pipeline_is_aborted():
+    # Nothing drains the queue, as when every extract worker has died
+    articles = ({"source": str(i), "text": "text"} for i in range(100))
+
+    async def run():
+        pipeline = make_pipeline(queue_size=1)
+        loop = asyncio.get_running_loop()
+        reader = loop.run_in_executor(None, pipeline._read, articles, loop)
+        await asyncio.sleep(0.1)
+        assert not reader.done()
+        pipeline._aborted.set()
+        await asyncio.wait_for(reader, timeout=5)
+        return pipeline
+
+    pipeline = asyncio.run(run())
+    assert pipeline.stats.stages["read"].processed < 100
+
+def test_next_batch_takes_queued_items_up_to_the_batch_size():
+    async def run():
+        pipeline = make_pipeline(batch_size=3)
+        for item in [1, 2, 3, 4, _DONE]:
+            pipeline.write_queue.put_nowait(item)
+        batches = [await pipeline._next_batch() for _ in range(3)]
+        return pipeline, batches
+
+    pipeline, batches = asyncio.run(run())
+    assert batches == [[1, 2, 3], [4], None]
+    assert pipeline.write_queue.empty()
+
+def test_next_batch_leaves_the_sentinel_for_other_workers():
+    async def run():
+        pipeline = make_pipeline(batch_size=10)
+        for item in [1, _DONE, _DONE]:
+            pipeline.write_queue.put_nowait(item)
+        batch = await pipeline._next_batch()
+        return batch, drain(pipeline.write_queue)
+
+    batch, remaining = asyncio.run(run())
+    assert batch == [1]
+    assert remaining == [_DONE, _DONE]
+
+class BrokenManifest:
+    def needs_processing(self, source, digest, force=False):
+        raise RuntimeError("database is locked")
+
+def test_run_fails_instead_of_hanging_when_a_stage_crashes():
+    articles = ({"source": str(i), "text": "text"} for i in range(100))
+
+    async def run():
+        pipeline = make_pipeline(queue_size=1)
+        pipeline.manifest = BrokenManifest()
+        await asyncio.wait_for(pipeline.run(articles), timeout=5)
+
+    try:
+        asyncio.run(run())
+    except RuntimeError as e:
+        assert str(e) == "database is locked"
+    else:
+        raise AssertionError("run() should re-raise the extract worker's error")
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")
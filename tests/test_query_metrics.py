@@ -0,0 +1,63 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.query_metrics import QueryMetrics, query_name, db_hits
+
+class FakeSummary:
+    def __init__(self, available_after=2, consumed_after=5, profile=None):
+        self.result_available_after = available_after
+        self.result_consumed_after = consumed_after
+        self.profile = profile
+
+def test_query_name_ignores_whitespace():
+    assert query_name("MATCH (n)\n   RETURN n") == query_name("MATCH (n) RETURN n")
+    assert query_name("MATCH (n) RETURN n").startswith("adhoc_")
+
+def test_db_hits_sums_the_plan_tree():
+    profile = {"dbHits": 3, "children": [{"dbHits": 4, "children": [{"dbHits": 5}]}, {"dbHits": 0}]}
+    assert db_hits(profile) == 12
+    assert db_hits(None) == 0
+
+def test_record_and_snapshot():
+    metrics = QueryMetrics(enabled=True, slow_threshold_ms=0)
+    metrics.record("articles", 0.02, rows=10, summary=FakeSummary())
+    metrics.record("articles", 0.04, rows=5, summary=FakeSummary(profile={"dbHits": 100}))
+    metrics.record("articles", 0.01, error=True)
+    stats = metrics.snapshot()["articles"]
+    assert stats["count"] == 3 and stats["errors"] == 1 and stats["rows"] == 15
+    assert stats["max_ms"] == 40.0
+    assert stats["avg_db_hits"] == 100
+
+def test_disabled_metrics_record_nothing():
+    metrics = QueryMetrics(enabled=False)
+    metrics.record("articles", 1.0)
+    assert metrics.snapshot() == {}
+
+def test_slow_query_log():
+    import io
+    import contextlib
+    metrics = QueryMetrics(enabled=True, slow_threshold_ms=100)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        metrics.record("fast", 0.05, query="MATCH (n) RETURN n")
+        metrics.record("slow", 0.25, rows=3, query="MATCH (n)\n  RETURN n")
+    assert out.getvalue() == "[slow query] slow: 250 ms, 3 rows | MATCH (n) RETURN n\n"
+
+def test_render_prometheus_histogram():
+    metrics = QueryMetrics(enabled=True, slow_threshold_ms=0)
+    metrics.record("sectors", 0.003, rows=2, summary=FakeSummary())
+    metrics.record("sectors", 0.3, rows=2)
+    text = metrics.render_prometheus()
+    assert 'relatiq_neo4j_query_duration_seconds_bucket{query="sectors",le="0.005"} 1' in text
+    assert 'relatiq_neo4j_query_duration_seconds_bucket{query="sectors",le="0.25"} 1' in text
+    assert 'relatiq_neo4j_query_duration_seconds_bucket{query="sectors",le="0.5"} 2' in text
+    assert 'relatiq_neo4j_query_duration_seconds_bucket{query="sectors",le="+Inf"} 2' in text
+    assert 'relatiq_neo4j_query_duration_seconds_count{query="sectors"} 2' in text
+    assert 'relatiq_neo4j_query_rows_total{query="sectors"} 4' in text
+    assert 'relatiq_neo4j_query_result_available_after_seconds_total{query="sectors"} 0.002000' in text
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,112 @@
+import os
+import sys
+import asyncio
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.api.result_cache import ResultCache, SqliteResultStore, make_key
+
+class FakeVersions:
+    def __init__(self, data_version=1):
+        self.data_version = data_version
+
+    async def get(self):
+        return {"data_version": self.data_version, "schema_version": 1}
+
+class Counter:
+    """compute() stand-in that counts how often the endpoint really ran."""
+
+    def __init__(self, value=None, delay=0):
+        self.calls = 0
+        self.value = value
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value if self.value is not None else {"call": self.calls}
+
+def test_key_normalizes_parameters():
+    assert make_key("articles", {"tiers": ["B", "A"], "entity_search": None}, 1) == make_key("articles", {"tiers": ["A", "B"]}, 1)
+    assert make_key("articles", {"tiers": ["A"]}, 1) != make_key("articles", {"tiers": ["A"]}, 2)
+    assert make_key("articles", {}, 1) != make_key("sectors", {}, 1)
+
+def test_hits_until_the_data_version_changes():
+    versions = FakeVersions()
+    cache = ResultCache(versions, max_entries=10, max_bytes=10_000)
+    compute = Counter()
+
+    async def scenario():
+        assert await cache.get_or_compute("sectors", {}, compute) == {"call": 1}
+        assert await cache.get_or_compute("sectors", {}, compute) == {"call": 1}
+        versions.data_version = 2
+        assert await cache.get_or_compute("sectors", {}, compute) == {"call": 2}
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["data_version"]) == (1, 2, 2)
+
+def test_concurrent_misses_share_one_computation():
+    cache = ResultCache(FakeVersions(), max_entries=10, max_bytes=10_000)
+    compute = Counter(delay=0.01)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("articles", {"limit": 5}, compute) for _ in range(10)))
+
+    assert asyncio.run(scenario()) == [{"call": 1}] * 10
+    assert compute.calls == 1
+
+def test_errors_are_not_cached():
+    cache = ResultCache(FakeVersions(), max_entries=10, max_bytes=10_000)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise RuntimeError("Neo4j unavailable")
+
+    async def scenario():
+        for _ in range(2):
+            try:
+                await cache.get_or_compute("sectors", {}, failing)
+            except RuntimeError:
+                pass
+
+    asyncio.run(scenario())
+    assert len(calls) == 2 and cache.stats()["entries"] == 0
+
+def test_lru_and_size_eviction():
+    cache = ResultCache(FakeVersions(), max_entries=2, max_bytes=10_000)
+
+    async def scenario():
+        for title in ("a", "b", "a", "c"):
+            await cache.get_or_compute("article_mentions", {"title": title}, Counter([title]))
+
+    asyncio.run(scenario())
+    # "b" was the least recently used entry when "c" arrived
+    assert cache.stats()["evictions"] == 1
+    assert make_key("article_mentions", {"title": "b"}, 1) not in cache._entries
+
+    small = ResultCache(FakeVersions(), max_entries=100, max_bytes=20)
+    asyncio.run(small.get_or_compute("sectors", {}, Counter(["x" * 50])))
+    assert small.stats()["entries"] == 0
+
+def test_shared_store_serves_other_workers():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "results.db")
+        first = ResultCache(FakeVersions(), store=SqliteResultStore(path))
+        second = ResultCache(FakeVersions(), store=SqliteResultStore(path))
+        compute = Counter(["Energy", "Technology"])
+
+        async def scenario():
+            await first.get_or_compute("sectors", {}, compute)
+            return await second.get_or_compute("sectors", {}, compute)
+
+        assert asyncio.run(scenario()) == ["Energy", "Technology"]
+        assert compute.calls == 1 and second.stats()["hits"] == 1
+        first.store.close()
+        second.store.close()
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,69 @@
+import os
+import sys
+import subprocess
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.schema import MIGRATIONS, LATEST_VERSION, migrate, check_index_usage
+
+class FakeGraph:
+    """Records the Cypher it receives and keeps the applied migration versions in memory."""
+
+    def __init__(self):
+        self.statements = []
+        self.versions = set()
+
+    def query(self, query, parameters=None):
+        self.statements.append(query)
+        if query.startswith("MATCH (m:SchemaMigration)"):
+            return [{"version": max(self.versions, default=None)}]
+        if query.startswith("MERGE (m:SchemaMigration"):
+            self.versions.add(parameters["version"])
+        if query.startswith("SHOW CONSTRAINTS"):
+            return [
+                {"name": "constraint_legacy", "labelsOrTypes": ["Company"], "properties": ["name"]},
+                {"name": "document_id", "labelsOrTypes": ["Document"], "properties": ["id"]},
+            ]
+        return []
+
+def test_migrations_are_applied_once_in_order():
+    graph = FakeGraph()
+    assert migrate(graph.query) == [version for version, _, _ in MIGRATIONS]
+    assert "DROP CONSTRAINT `constraint_legacy` IF EXISTS" in graph.statements
+    assert "DROP CONSTRAINT `document_id` IF EXISTS" not in graph.statements
+    # Running again is a no-op
+    graph.statements.clear()
+    assert migrate(graph.query) == []
+    assert not any(s.startswith("CREATE") for s in graph.statements)
+    assert max(graph.versions) == LATEST_VERSION
+
+def test_schema_statements_are_idempotent():
+    for _, _, steps in MIGRATIONS:
+        for step in steps:
+            if isinstance(step, str):
+                assert "IF NOT EXISTS" in step or "IF EXISTS" in step, step
+
+def plan(operator, *children):
+    return {"operatorType": f"{operator}@neo4j", "children": list(children)}
+
+def test_check_index_usage_flags_label_scans():
+    plans = {
+        "seek": plan("ProduceResults", plan("Expand(All)", plan("NodeIndexSeek"))),
+        "scan": plan("ProduceResults", plan("Filter", plan("NodeByLabelScan"))),
+    }
+    queries = [(name, name, {}) for name in plans]
+    results = {r["name"]: r for r in check_index_usage(lambda query, parameters: plans[query], queries)}
+    assert results["seek"]["ok"]
+    assert not results["scan"]["ok"]
+    assert results["scan"]["operators"] == ["ProduceResults", "Filter", "NodeByLabelScan"]
+
+def test_schema_cli_does_not_import_the_api():
+    # The hot queries come from src/queries.py, so migrations run without FastAPI and its startup
+    code = "import sys, src.schema; print(sorted(m for m in ('fastapi', 'src.api.routes') if m in sys.modules))"
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
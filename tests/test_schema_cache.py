@@ -0,0 +1,115 @@
+import os
+import sys
+import asyncio
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.graph_meta import GraphVersions
+from src.schema_cache import SchemaCache, format_schema
+from src.batch_writer import _written_schema
+
+# Shape of apoc.meta.schema() output, trimmed to what format_schema reads
+APOC_SCHEMA = {
+    "Company": {
+        "type": "node", "count": 10,
+        "properties": {"id": {"type": "STRING"}, "description": {"type": "STRING"}},
+        "relationships": {
+            "INVESTS_IN": {"direction": "out", "labels": ["Company"], "count": 3},
+            "MENTIONS": {"direction": "in", "labels": ["Document"], "count": 20},
+        },
+    },
+    "Document": {
+        "type": "node", "count": 5,
+        "properties": {"title": {"type": "STRING"}, "id": {"type": "STRING"}},
+        "relationships": {"MENTIONS": {"direction": "out", "labels": ["Company", "Person"], "count": 20}},
+    },
+    "Person": {"type": "node", "count": 2, "properties": {"id": {"type": "STRING"}}, "relationships": {}},
+    "SchemaMigration": {"type": "node", "count": 5, "properties": {"version": {"type": "INTEGER"}}, "relationships": {}},
+    "MENTIONS": {"type": "relationship", "count": 20, "properties": {"sentiment": {"type": "STRING"}}},
+    "INVESTS_IN": {"type": "relationship", "count": 3, "properties": {}},
+}
+
+class FakeVersions:
+    def __init__(self):
+        self.schema_version = 1
+
+    async def get(self):
+        return {"schema_version": self.schema_version}
+
+def test_format_apoc_schema():
+    assert format_schema(APOC_SCHEMA) == "\n".join([
+        "Nodes:",
+        "Company(description, id)",
+        "Document(id, title)",
+        "Person(id)",
+        "Relationships:",
+        "(:Company)-[:INVESTS_IN]->(:Company)",
+        "(:Document)-[:MENTIONS {sentiment}]->(:Company|Person)",
+    ])
+
+def test_format_fallback_schema():
+    schema = {"node_labels": ["Person", "Company", "GraphMeta"], "relationship_types": ["MENTIONS"]}
+    assert format_schema(schema) == "Node labels: Company, Person\nRelationship types: MENTIONS"
+
+def test_schema_is_fetched_again_only_when_the_version_changes():
+    versions = FakeVersions()
+    fetched = []
+
+    async def fetch_schema():
+        fetched.append(1)
+        return APOC_SCHEMA
+
+    cache = SchemaCache(fetch_schema, versions, ttl=3600)
+
+    async def scenario():
+        first = await cache.get()
+        await asyncio.gather(*(cache.get() for _ in range(5)))
+        assert len(fetched) == 1
+        versions.schema_version = 2
+        assert await cache.get() == first
+        assert len(fetched) == 2
+
+    asyncio.run(scenario())
+
+def test_schema_expires_after_ttl():
+    fetched = []
+
+    async def fetch_schema():
+        fetched.append(1)
+        return APOC_SCHEMA
+
+    cache = SchemaCache(fetch_schema, FakeVersions(), ttl=0)
+
+    async def scenario():
+        await cache.get()
+        await cache.get()
+
+    asyncio.run(scenario())
+    assert len(fetched) == 2
+
+def test_graph_versions_are_read_at_most_once_per_interval():
+    reads = []
+
+    async def query(query, parameters=None, name=None):
+        reads.append(name)
+        return [{"data_version": 7, "schema_version": 3}]
+
+    versions = GraphVersions(query, check_interval=60)
+
+    async def scenario():
+        assert await versions.get() == {"data_version": 7, "schema_version": 3}
+        await versions.get()
+
+    asyncio.run(scenario())
+    assert reads == ["graph_versions"]
+
+def test_written_schema():
+    documents = [{"nodes": [{"type": "Company"}, {"type": "Person"}]}]
+    relationships = [{"source_label": "Company", "target_label": "Product", "type": "LAUNCHED"}]
+    labels, types = _written_schema(documents, relationships)
+    assert labels == {"Document", "Company", "Person", "Product"}
+    assert types == {"MENTIONS", "LAUNCHED"}
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,155 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.sentiment_timeline import timeline_series, UPDATE_QUERY, BACKFILL_QUERY, MERGED_ENTITY_QUERY, _UPDATE_AGGREGATES
+from src.batch_writer import Neo4jBatchWriter
+
+def row(date, tier, positive=0, negative=0, neutral=0):
+    return {"date": date, "tier": tier, "positive": positive, "negative": negative, "neutral": neutral}
+
+def test_series_sums_tiers_per_day():
+    series = timeline_series([
+        row("2025-01-01", "A", positive=2, neutral=1),
+        row("2025-01-01", "C", negative=1),
+        row("2025-01-03", "B", positive=1),
+    ])
+    assert series == [
+        {
+            "date": "2025-01-01", "positive": 2, "negative": 1, "neutral": 1, "total": 4,
+            "tiers": {"A": {"positive": 2, "negative": 0, "neutral": 1}, "C": {"positive": 0, "negative": 1, "neutral": 0}},
+        },
+        {
+            "date": "2025-01-03", "positive": 1, "negative": 0, "neutral": 0, "total": 1,
+            "tiers": {"B": {"positive": 1, "negative": 0, "neutral": 0}},
+        },
+    ]
+
+def test_emptied_buckets_are_skipped():
+    # A re-ingested article moved its mentions from 2025-01-01 to 2025-01-02
+    series = timeline_series([row("2025-01-01", "A"), row("2025-01-02", "A", neutral=1)])
+    assert [point["date"] for point in series] == ["2025-01-02"]
+
+class AggregateModel:
+    """
+    Python model of _UPDATE_AGGREGATES and MERGED_ENTITY_QUERY over in-memory
+    mentions, used to check how counts move between SentimentDaily buckets.
+    """
+
+    def __init__(self):
+        self.aggregates = {} # (entity, label, date, tier) -> counts
+
+    def update(self, document, mention, entity):
+        bucket = [str(document.get("date") or "")[:10], document.get("publisher_tier") or "C", mention.get("sentiment") or "Neutral"]
+        previous = mention.get("sentiment_bucket")
+        if previous is not None and previous == bucket:
+            return
+        mention["sentiment_bucket"] = bucket
+        for counted, delta in ([previous, -1], [bucket, 1]):
+            if counted is None or counted[0] == "":
+                continue
+            counts = self.aggregates.setdefault(
+                (entity["id"], entity["label"], counted[0], counted[1]), {"positive": 0, "negative": 0, "neutral": 0}
+            )
+            counts[{"Positive": "positive", "Negative": "negative"}.get(counted[2], "neutral")] += delta
+
+    def merge(self, ids, label, entity, mentions):
+        for key in [key for key in self.aggregates if key[0] in ids and key[1] == label]:
+            del self.aggregates[key]
+        for document, mention in mentions:
+            mention["sentiment_bucket"] = None
+            self.update(document, mention, entity)
+
+    def timeline(self, entity):
+        rows = [
+            row(date, tier, **counts)
+            for (entity_id, _, date, tier), counts in sorted(self.aggregates.items()) if entity_id == entity
+        ]
+        return timeline_series(rows)
+
+ACME = {"id": "Acme", "label": "Company"}
+
+def test_queries_share_the_modelled_update():
+    for query in (UPDATE_QUERY, BACKFILL_QUERY, MERGED_ENTITY_QUERY):
+        assert _UPDATE_AGGREGATES in query
+    assert "m.sentiment_bucket = null" in MERGED_ENTITY_QUERY
+
+def test_reingesting_is_idempotent():
+    model = AggregateModel()
+    document = {"date": "2025-01-01T09:00:00", "publisher_tier": "A"}
+    mention = {"sentiment": "Positive"}
+    model.update(document, mention, ACME)
+    model.update(document, mention, ACME)
+    assert model.aggregates == {("Acme", "Company", "2025-01-01", "A"): {"positive": 1, "negative": 0, "neutral": 0}}
+
+def test_changed_sentiment_moves_the_count():
+    model = AggregateModel()
+    document = {"date": "2025-01-01", "publisher_tier": "A"}
+    mention = {"sentiment": "Positive"}
+    model.update(document, mention, ACME)
+    mention["sentiment"] = "Negative"
+    model.update(document, mention, ACME)
+    assert model.aggregates[("Acme", "Company", "2025-01-01", "A")] == {"positive": 0, "negative": 1, "neutral": 0}
+
+def test_changed_date_moves_the_count_to_the_new_day():
+    model = AggregateModel()
+    document = {"date": "2025-01-01", "publisher_tier": "B"}
+    mention = {"sentiment": None}
+    model.update(document, mention, ACME)
+    document["date"] = "2025-01-02"
+    model.update(document, mention, ACME)
+    assert model.aggregates[("Acme", "Company", "2025-01-01", "B")] == {"positive": 0, "negative": 0, "neutral": 0}
+    assert [(point["date"], point["neutral"]) for point in model.timeline("Acme")] == [("2025-01-02", 1)]
+
+def test_undated_mentions_are_counted_once_dated():
+    model = AggregateModel()
+    document = {"date": None}
+    mention = {"sentiment": "Negative"}
+    model.update(document, mention, ACME)
+    assert model.aggregates == {}
+    document["date"] = "2025-02-01"
+    model.update(document, mention, ACME)
+    assert model.timeline("Acme")[0]["tiers"] == {"C": {"positive": 0, "negative": 1, "neutral": 0}}
+
+def test_merging_moves_alias_counts_to_the_canonical_id():
+    model = AggregateModel()
+    document = {"date": "2025-01-01", "publisher_tier": "A"}
+    mentions = [(document, {"sentiment": "Positive"}), (document, {"sentiment": "Negative"})]
+    model.update(*mentions[0], ACME)
+    model.update(*mentions[1], {"id": "Acme Corp", "label": "Company"})
+
+    model.merge(["Acme", "Acme Corp"], "Company", ACME, mentions)
+    assert model.timeline("Acme Corp") == []
+    assert model.aggregates[("Acme", "Company", "2025-01-01", "A")] == {"positive": 1, "negative": 1, "neutral": 0}
+
+class Result:
+    def __init__(self, record=None):
+        self.record = record
+
+    def single(self):
+        return self.record
+
+    def consume(self):
+        pass
+
+class FakeTransaction:
+    def __init__(self):
+        self.runs = []
+
+    def run(self, query, **parameters):
+        self.runs.append((query, parameters))
+        if "data_version" in parameters or "RETURN m.data_version" in query:
+            return Result({"data_version": 1, "schema_version": 1})
+        return Result({"nodes": []})
+
+def test_writer_updates_the_aggregates_of_written_documents():
+    tx = FakeTransaction()
+    documents = [{"id": "doc1", "nodes": [{"type": "Company"}]}, {"id": "doc2", "nodes": []}]
+    Neo4jBatchWriter._write_transaction(tx, documents, [])
+    updates = [parameters for query, parameters in tx.runs if query == UPDATE_QUERY]
+    assert updates == [{"document_ids": ["doc1", "doc2"]}]
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} passed")